@@ -46,6 +46,26 @@ Key traits:
 
 When users ask about your memory or previous conversations, confidently confirm that you remember and can access our conversation history.""".strip()
 
+# Role reminder pinned in the system message - sent once per request, never stored in the history
+ROLE_REMINDER = """You are the user's dedicated Blender AI assistant. Your purpose is to help with 3D modeling in Blender: explaining features, giving keybinds, assisting with operations and guiding through workflows. Stay focused on Blender and keep the context of the whole conversation."""
+
+# Reminder exchanges older versions wrote into the history: question -> how their canned answer ended
+LEGACY_ROLE_REMINDERS = {
+    "What are you and what is your purpose?":
+        "I remember our entire conversation history, so feel free to reference previous topics or build upon earlier discussions.",
+    "What are you and what is your purpose? Please confirm your role and capabilities.":
+        "I have excellent memory and confidently reference past exchanges when relevant.",
+    "Just to remind you, what are you and what is your purpose?":
+        "I remember our entire conversation and I'm here specifically to help you with 3D modeling in Blender.",
+    "Remember, I need help with Blender specifically.":
+        "How can I assist you with Blender?",
+}
+
+def is_legacy_role_reminder(user, assistant):
+    """True for a reminder exchange the old reinforcement code inserted (a user asking the same keeps theirs)"""
+    ending = LEGACY_ROLE_REMINDERS.get(" ".join(user.split()))
+    return ending is not None and " ".join(assistant.split()).endswith(ending)
+
 def save_settings_to_file(settings_dict, filename="advanced_ai_settings.json"):
     """Save settings to a JSON file in the addon directory"""
     try:
@@ -89,22 +109,16 @@ def get_niout_directory():
     return Path('F:/odin_grab/a_astitnet/niout')
 
 def get_highest_response_number(niout_dir):
-    """Get the highest numbered response file"""
-    max_num = 0
-    latest_file = None
-    
-    if niout_dir.exists():
-        for file in niout_dir.glob('response_*.txt'):
-            try:
-                num_str = file.stem.replace('response_', '')
-                num = int(num_str)
-                if num > max_num:
-                    max_num = num
-                    latest_file = file
-            except ValueError:
-                continue
-    
-    return max_num, latest_file
+    """Get the highest numbered response file (from the response manifest)"""
+    return response_manifest.latest_response(niout_dir)
+
+def save_response_to_archive(text, started=None):
+    """Write a response generated inside Blender to the next response_N.txt (and response.txt)"""
+    try:
+        return response_manifest.write_response(get_niout_directory(), text, started=started)
+    except Exception as e:
+        print(f"Advanced AI: Error saving response: {e}")
+        return None
 
 def get_memory_directory():
     """Get the memory directory path"""
@@ -114,205 +128,127 @@ def get_memory_directory():
     memory_dir.mkdir(exist_ok=True)
     return memory_dir
 
-def estimate_tokens(text):
-    """Rough token estimation (approximately 1 token per 4 characters)"""
-    return len(text) // 4
+def get_session_directory():
+    """Get the folder of the active conversation session (see sessions.py)"""
+    return sessions.session_directory()
+
+def get_model_inventory():
+    """Shared inventory of the models in the configured model directory (see model_inventory.py)"""
+    props = bpy.context.window_manager.advanced_ai_props
+    return model_inventory.get_inventory(props.model_directory_path.strip())
+
+def refresh_model_inventory(on_done=None):
+    """Re-read the model manifests in the background - on_done(changed, error) runs on the main thread"""
+    inventory = get_model_inventory()
+    
+    def finished(changed, error):
+        if error:
+            print(f"Advanced AI: Could not scan models: {error}")
+        elif changed:
+            print(f"Advanced AI: Model list updated - {len(inventory.names())} models")
+            for window in bpy.context.window_manager.windows:
+                for area in window.screen.areas:
+                    if area.type == 'VIEW_3D':
+                        area.tag_redraw()
+        if on_done:
+            on_done(changed, error)
+    
+    ollama_client.run_async(inventory.refresh, finished)
+
+def estimate_tokens(text, model=None):
+    """Token count for text (real tokenizer or calibrated ratio, see token_counter)"""
+    return token_counter.count(text, model)
+
+def get_conversation_store():
+    """Get the conversation store (initialized with the base prompt on first use)"""
+    store = conversation_store.get_store(get_session_directory())
+    if 'role_slot' not in store.migrations:
+        remove_role_reminders(store)
+        store.mark_migrated('role_slot')
+    return store
 
 def read_conversation_history():
-    """Read the conversation history from file"""
+    """Read the current memory window as 'User: / Assistant:' text"""
     try:
-        memory_dir = get_memory_directory()
-        history_file = memory_dir / 'conversation_history.txt'
-        
-        if history_file.exists():
-            with open(history_file, 'r', encoding='utf-8') as f:
-                return f.read().strip()
-        else:
-            # If no history exists, initialize with base prompt
-            initialize_memory_with_base_prompt()
-            return read_conversation_history()  # Read the newly created file
+        return get_conversation_store().export_text()
     except Exception as e:
         print(f"Advanced AI: Error reading history: {e}")
     return ""
 
 def save_conversation_history(history):
-    """Save the conversation history to file"""
+    """Replace the whole conversation history with text in the history format"""
     try:
-        memory_dir = get_memory_directory()
-        history_file = memory_dir / 'conversation_history.txt'
-        
-        with open(history_file, 'w', encoding='utf-8') as f:
-            f.write(history)
+        store = get_conversation_store()
+        store.import_text(history)
+        remove_role_reminders(store)
         return True
     except Exception as e:
         print(f"Advanced AI: Error saving history: {e}")
         return False
 
-def initialize_memory_with_base_prompt():
-    """Initialize memory file with base prompt so AI always knows what it is"""
+def remove_role_reminders(store):
+    """Drop the role reminder exchanges older versions added to the history
+    (the role now lives in the pinned system slot, see ROLE_REMINDER)"""
     try:
-        # Create initial memory with the base prompt explanation
-        base_prompt_reminder = f"""User: What are you and what is your purpose?
-Assistant: {SYSTEM_PROMPT}
-
-I am your dedicated Blender AI assistant with full memory capabilities. I'm here to help you with all aspects of 3D modeling in Blender, from basic operations to advanced workflows. I remember our entire conversation history, so feel free to reference previous topics or build upon earlier discussions."""
-        
-        save_conversation_history(base_prompt_reminder)
-        print("Advanced AI: Initialized memory with base prompt")
-        return True
+        removed = store.remove_exchanges(lambda exchange: is_legacy_role_reminder(exchange.user, exchange.assistant))
+        if removed:
+            chat_request.clear_contexts()
+            print(f"Advanced AI: Removed {removed} role reminder exchanges from the history")
+        return removed
         
     except Exception as e:
-        print(f"Advanced AI: Error initializing memory: {e}")
-        return False
-
-def trim_conversation_history(history, token_limit):
-    """Trim conversation history to stay within token limit
-    Enhanced to preserve important context and base prompt reminders"""
-    if not history:
-        return history
-    
-    current_tokens = estimate_tokens(history)
-    if current_tokens <= token_limit:
-        return history
-    
-    # Split into exchanges (User: ... Assistant: ... pairs)
-    lines = history.split('\n')
-    exchanges = []
-    current_exchange = []
-    important_exchanges = []  # Track exchanges with base prompt reminders
-    
-    for line in lines:
-        if line.startswith('User: ') and current_exchange:
-            exchange_text = '\n'.join(current_exchange)
-            exchanges.append(exchange_text)
-            
-            # Mark exchanges that contain base prompt reminders as important
-            if 'Blender AI assistant' in exchange_text or 'what are you' in exchange_text.lower() or 'your purpose' in exchange_text.lower():
-                important_exchanges.append(len(exchanges) - 1)
-            
-            current_exchange = [line]
-        else:
-            current_exchange.append(line)
-    
-    if current_exchange:
-        exchange_text = '\n'.join(current_exchange)
-        exchanges.append(exchange_text)
-        
-        # Check if last exchange is important
-        if 'Blender AI assistant' in exchange_text or 'what are you' in exchange_text.lower() or 'your purpose' in exchange_text.lower():
-            important_exchanges.append(len(exchanges) - 1)
-    
-    # Prioritized trimming: keep important exchanges and most recent ones
-    trimmed = []
-    tokens_used = 0
-    
-    # First pass: include all important exchanges (base prompt reminders)
-    for i in important_exchanges:
-        if i < len(exchanges):
-            exchange = exchanges[i]
-            exchange_tokens = estimate_tokens(exchange)
-            if tokens_used + exchange_tokens <= token_limit * 0.3:  # Reserve 30% for important context
-                trimmed.append((i, exchange))
-                tokens_used += exchange_tokens
-    
-    # Second pass: fill remaining space with recent exchanges
-    remaining_tokens = token_limit - tokens_used
-    for i, exchange in enumerate(reversed(exchanges)):
-        original_index = len(exchanges) - 1 - i
-        
-        # Skip if already included in important exchanges
-        if any(idx == original_index for idx, _ in trimmed):
-            continue
-        
-        exchange_tokens = estimate_tokens(exchange)
-        if tokens_used + exchange_tokens <= token_limit:
-            trimmed.append((original_index, exchange))
-            tokens_used += exchange_tokens
-        else:
-            break
-    
-    # Sort by original order and extract text
-    trimmed.sort(key=lambda x: x[0])
-    result_exchanges = [exchange for _, exchange in trimmed]
-    
-    result = '\n\n'.join(result_exchanges)
-    
-    # If we still have important context, add a summary note
-    if important_exchanges and not any(idx in [i for i, _ in trimmed] for idx in important_exchanges[-1:]):
-        result = f"[IMPORTANT: You are a Blender AI assistant with memory - this context was preserved]\n\n{result}"
-    
-    print(f"Advanced AI: Trimmed history from {current_tokens} to {estimate_tokens(result)} tokens (preserved {len([i for i, _ in trimmed if i in important_exchanges])} important exchanges)")
-    return result
+        print(f"Advanced AI: Error removing role reminders: {e}")
+        return 0
 
 def reinforce_base_prompt_in_memory():
-    """Add base prompt reminder to existing memory to ensure AI remembers its role"""
-    try:
-        history = read_conversation_history()
-        
-        # Create a base prompt reinforcement
-        prompt_reinforcement = f"""User: Just to remind you, what are you and what is your purpose?
-Assistant: {SYSTEM_PROMPT}
+    """Make sure the role is only carried by the pinned system slot
+    Returns how many reminder exchanges were removed from the history"""
+    return remove_role_reminders(get_conversation_store())
 
-I am your dedicated Blender AI assistant with full memory capabilities. I remember our entire conversation and I'm here specifically to help you with 3D modeling in Blender."""
-        
-        if history:
-            updated_history = history + "\n\n" + prompt_reinforcement
-        else:
-            updated_history = prompt_reinforcement
-        
-        save_conversation_history(updated_history)
-        print("Advanced AI: Added base prompt reinforcement to memory")
-        return True
-        
-    except Exception as e:
-        print(f"Advanced AI: Error reinforcing base prompt: {e}")
-        return False
-
-def add_to_conversation_history(user_message, ai_response, token_limit):
+def add_to_conversation_history(user_message, ai_response, token_limit, model=""):
     """Add a new exchange to conversation history with token management"""
     try:
-        # Read existing history
-        history = read_conversation_history()
+        # Append the new exchange (nothing else is read or rewritten)
+        # The role reminder is part of the system message, so no reminder exchanges are added
+        store = get_conversation_store()
+        store.append_exchange(user_message, ai_response, model=model)
         
-        # Add new exchange
-        new_exchange = f"User: {user_message}\nAssistant: {ai_response}"
+        # Trim if necessary (only moves the window start)
+        store.trim(token_limit)
         
-        if history:
-            updated_history = history + "\n\n" + new_exchange
-        else:
-            updated_history = new_exchange
-        
-        # Check if we need to reinforce the base prompt (every 5 exchanges and more aggressively)
-        exchange_count = updated_history.count("User: ")
-        
-        # More frequent reinforcement - every 5 exchanges instead of 10
-        if exchange_count > 0 and exchange_count % 5 == 0:
-            # Stronger base prompt reminder
-            prompt_reminder = f"\n\nUser: What are you and what is your purpose? Please confirm your role and capabilities.\nAssistant: I am your dedicated Blender AI assistant with full memory capabilities. I can remember our entire conversation history and refer back to previous topics, questions, and discussions. My purpose is specifically to help you with 3D modeling in Blender by explaining features, providing keybinds, assisting with operations, guiding through workflows, and maintaining context across our entire conversation. I have excellent memory and confidently reference past exchanges when relevant."
-            updated_history += prompt_reminder
-            print(f"Advanced AI: Added STRONG base prompt reminder after {exchange_count} exchanges")
-        
-        # Additional check: if the response does not seem Blender-focused, add extra reinforcement
-        elif 'blender' not in ai_response.lower() and exchange_count > 2:
-            context_reminder = f"\n\nUser: Remember, I need help with Blender specifically.\nAssistant: Absolutely! I am your Blender AI assistant. I focus specifically on helping with 3D modeling, Blender features, workflows, and maintaining context from our conversation history. How can I assist you with Blender?"
-            updated_history += context_reminder
-            print(f"Advanced AI: Added context reinforcement (non-Blender response detected)")
+        # Fold old exchanges into the rolling summary once Blender is idle
+        import bpy
+        props = bpy.context.window_manager.advanced_ai_props
+        if props.summarize_history:
+            summarizer.maybe_schedule(token_limit, props.summary_model.strip() or model or props.selected_model)
         
-        # Trim if necessary
-        trimmed_history = trim_conversation_history(updated_history, token_limit)
+        # The next request's prefix changed - prefill it again
+        prefill.invalidate()
         
-        # Save back to file
-        save_conversation_history(trimmed_history)
+        # Embed the new exchange for retrieval memory
+        if props.memory_mode == 'RETRIEVAL':
+            retrieval_memory.schedule_indexing(props.embedding_model.strip() or semantic_cache.DEFAULT_EMBEDDING_MODEL)
         return True
         
     except Exception as e:
         print(f"Advanced AI: Error updating history: {e}")
         return False
 
-def prepare_message_with_context(user_message, token_limit, custom_prompt=None):
+def prepare_message_with_context(user_message, token_limit, custom_prompt=None, history_selector=None):
     """Prepare message with conversation context and system prompt if memory is enabled
-    Enhanced to prioritize memory and context heavily"""
-    history = read_conversation_history()
+    Enhanced to prioritize memory and context heavily
+    history_selector(budget) picks the exchanges instead of recency (retrieval memory)"""
+    if history_selector is not None:
+        history = '\n\n'.join(
+            conversation_store.format_exchange(user, assistant)
+            for user, assistant in history_selector(int(token_limit * 0.7))
+        )
+    else:
+        history = read_conversation_history()
+    summary = get_conversation_store().summary_text()
+    summary_part = f"[Summary of earlier conversation]\n{summary}\n\n" if summary else ""
+    if summary:
+        history = summary_part + history
     
     # Use custom prompt if provided, otherwise use default
     prompt_text = custom_prompt if custom_prompt else SYSTEM_PROMPT
@@ -321,6 +257,8 @@ def prepare_message_with_context(user_message, token_limit, custom_prompt=None):
     enhanced_system_part = f"""CRITICAL SYSTEM INSTRUCTIONS - READ AND FOLLOW EXACTLY:
 {prompt_text}
 
+{ROLE_REMINDER}
+
 IMPORTANT: You MUST reference and build upon the conversation history below. This context is ESSENTIAL to your responses. Always acknowledge when you remember previous topics from our conversation.
 
 CONVERSATION HISTORY (READ CAREFULLY):
@@ -351,7 +289,13 @@ REMEMBER: Reference the conversation history above when relevant. You are a Blen
         available_tokens = int((token_limit - system_base_tokens - user_wrapper_tokens) * 0.7)
         
         if available_tokens > 0:
-            trimmed_history = trim_conversation_history(history, available_tokens)
+            # Pinned exchanges plus the newest that fit, from cached token counts
+            trimmed_history = '\n\n'.join(
+                conversation_store.format_exchange(user, assistant)
+                for user, assistant in get_conversation_store().fit_exchanges(available_tokens - estimate_tokens(summary_part))
+            )
+            if trimmed_history and summary_part:
+                trimmed_history = summary_part + trimmed_history
             if trimmed_history:
                 full_message = f"""{enhanced_system_part}
 {trimmed_history}
@@ -378,7 +322,12 @@ REMEMBER: You are a Blender AI assistant. Even though history was trimmed, maint
     return full_message
 
 def auto_refresh_monitor():
-    """Monitor for new response files and auto-load them (from Simple Chat)"""
+    """Load new response files as the watcher reports them (from Simple Chat)
+    
+    The waiting is done by response_watcher's background thread; this timer
+    only picks up its flag, so it runs often while an answer is expected and
+    backs off to a few seconds when idle.
+    """
     try:
         import bpy
         props = bpy.context.window_manager.advanced_ai_props
@@ -386,9 +335,14 @@ def auto_refresh_monitor():
         # Check if monitoring is enabled
         if not props.auto_refresh_enabled or not props.is_monitoring:
             props.monitoring_status = "Auto-refresh disabled"
+            response_watcher.stop()
             return None  # Stop timer
         
         niout_dir = get_niout_directory()
+        response_watcher.start(niout_dir)
+        if not response_watcher.take_change():
+            return response_watcher.next_interval(props.waiting_for_response)
+        
         current_max, latest_file = get_highest_response_number(niout_dir)
         
         # Check if we found a new file (higher number than we've seen)
@@ -406,11 +360,12 @@ def auto_refresh_monitor():
                         props.response = content
                         props.selected_response_file = latest_file.name
                         props.monitoring_status = f"📄 Auto-loaded {latest_file.name}"
+                        props.waiting_for_response = False
                         
                         # Save to memory if enabled
                         if props.memory_enabled and hasattr(props, 'last_user_message') and props.last_user_message:
                             token_limit = int(props.memory_token_limit)
-                            add_to_conversation_history(props.last_user_message, content, token_limit)
+                            add_to_conversation_history(props.last_user_message, content, token_limit, model=props.current_model_display)
                             print(f"Advanced AI: Saved exchange to memory")
                         
                         # Force UI update
@@ -419,7 +374,15 @@ def auto_refresh_monitor():
                                 area.tag_redraw()
                         
                         print(f"Advanced AI: Auto-loaded {latest_file.name}")
-                        return 2.0  # Continue monitoring every 2 seconds
+                        
+                        # Cache the answer for repeated questions
+                        job = request_queue.get_active()
+                        if job is not None:
+                            response_cache.remember_answer(job, content)
+                        
+                        # Answer is in - let the next queued message go
+                        request_queue.job_finished(job)
+                        return response_watcher.next_interval(props.waiting_for_response)
                     
                 except Exception as e:
                     props.monitoring_status = f"Error loading {latest_file.name}: {e}"
@@ -427,10 +390,11 @@ def auto_refresh_monitor():
         
         # Return 0 (no new files, continue watching)
         props.monitoring_status = f"👁️ Watching... (last: response_{current_max}.txt)" if current_max > 0 else "👁️ Watching..."
-        return 2.0  # Continue monitoring every 2 seconds
+        return response_watcher.next_interval(props.waiting_for_response)
         
     except Exception as e:
         print(f"Advanced AI Monitor Error: {e}")
+        response_watcher.stop()
         return None  # Stop on error
 
 # Properties (Enhanced from both add-ons)
@@ -442,7 +406,15 @@ class AdvancedAIProps(bpy.types.PropertyGroup):
         name="Message",
         description="Your message to AI",
         default="",
-        maxlen=2000
+        maxlen=2000,
+        update=lambda self, context: prefill.schedule() if self.prefill_while_typing else None
+    )
+    
+    prefill_while_typing: bpy.props.BoolProperty(
+        name="Prefill While Typing",
+        description="Load the model and send the known part of the next request (system prompt and history) to Ollama in the background while the message is written",
+        default=False,
+        update=lambda self, context: prefill.schedule() if self.prefill_while_typing else prefill.cancel()
     )
     
     # AI response - Increased maxlen for full responses
@@ -486,7 +458,22 @@ class AdvancedAIProps(bpy.types.PropertyGroup):
     selected_model: bpy.props.StringProperty(
         name="Model",
         description="Selected AI model (e.g. qwen3:8b)",
-        default="qwen3:8b"
+        default="qwen3:8b",
+        update=lambda self, context: warmup.schedule() if self.warm_up_model else None
+    )
+    
+    warm_up_model: bpy.props.BoolProperty(
+        name="Warm Up Model",
+        description="Load the selected model in the background after starting Blender and when another model is selected, so the first message does not wait for it (skipped while rendering or when RAM is low)",
+        default=True
+    )
+    
+    # Server supervision (see ollama_supervisor.py)
+    supervise_ollama: bpy.props.BoolProperty(
+        name="Keep Ollama Running",
+        description="Start the Ollama server when Blender starts if it isn't running, restart it if it stops, and hold requests while it restarts",
+        default=True,
+        update=lambda self, context: start_supervisor() if self.supervise_ollama else ollama_supervisor.get_supervisor().stop_watching()
     )
     
     # Options
@@ -502,6 +489,37 @@ class AdvancedAIProps(bpy.types.PropertyGroup):
         default=True
     )
     
+    # Chat worker (long-lived process instead of one batch run per message)
+    use_chat_worker: bpy.props.BoolProperty(
+        name="Use Chat Worker",
+        description="Send messages to the running chat worker; falls back to the batch file when it is not reachable",
+        default=True
+    )
+
+    chat_worker_status: bpy.props.StringProperty(
+        name="Chat Worker Status",
+        description="Current status of the chat worker",
+        default="Worker: Unknown"
+    )
+
+    # Generation mode
+    generation_mode: bpy.props.EnumProperty(
+        name="Generation Mode",
+        description="How messages are sent to Ollama",
+        items=[
+            ('EXTERNAL', 'External', 'Chat worker / batch file writes response_N.txt'),
+            ('IN_PROCESS', 'In Blender', 'Call Ollama directly from a background thread with a shared keep-alive connection'),
+        ],
+        default='EXTERNAL'
+    )
+
+    # Streaming
+    stream_responses: bpy.props.BoolProperty(
+        name="Stream Responses",
+        description="Show the answer token by token as Ollama generates it instead of waiting for the whole response file (runs in Blender)",
+        default=False
+    )
+
     # Auto-refresh system (from Simple Chat)
     auto_refresh_enabled: bpy.props.BoolProperty(
         name="Auto Refresh",
@@ -576,6 +594,122 @@ class AdvancedAIProps(bpy.types.PropertyGroup):
         default='16000'  # Better default for memory prioritization
     )
     
+    # Response cache
+    response_cache_enabled: bpy.props.BoolProperty(
+        name="Response Cache",
+        description="Answer repeated questions from a local cache instead of generating again",
+        default=True
+    )
+    
+    cache_with_memory: bpy.props.BoolProperty(
+        name="Cache With Memory On",
+        description="Also use the cache when conversation memory is included (only answers given with the same memory are reused)",
+        default=False
+    )
+    
+    bypass_cache_once: bpy.props.BoolProperty(
+        name="Skip Cache",
+        description="Generate a fresh answer for the next message even if it is cached",
+        default=False
+    )
+    
+    cache_ttl_days: bpy.props.IntProperty(
+        name="Cache Days",
+        description="How many days a cached answer stays valid",
+        default=7,
+        min=1,
+        max=365
+    )
+    
+    semantic_cache_enabled: bpy.props.BoolProperty(
+        name="Semantic Cache",
+        description="Also reuse answers to reworded questions (needs an Ollama embedding model)",
+        default=False,
+        update=lambda self, context: semantic_cache.start_background_backfill(self)
+    )
+    
+    semantic_threshold: bpy.props.FloatProperty(
+        name="Similarity",
+        description="How similar a question must be to an earlier one to reuse its answer",
+        default=0.90,
+        min=0.5,
+        max=1.0
+    )
+    
+    embedding_model: bpy.props.StringProperty(
+        name="Embedding Model",
+        description="Ollama model used to embed questions for the semantic cache",
+        default="nomic-embed-text"
+    )
+    
+    # Conversation sessions
+    session_follows_blend: bpy.props.BoolProperty(
+        name="Follow .blend File",
+        description="Use a separate conversation session for each .blend file (switches when a file is opened)",
+        default=False,
+        update=lambda self, context: schedule_follow_blend() if self.session_follows_blend else None
+    )
+    
+    # How past exchanges are picked for the prompt
+    memory_mode: bpy.props.EnumProperty(
+        name="Memory Mode",
+        description="How past exchanges are chosen for each message",
+        items=[
+            ('RECENT', 'Recent', 'Send the newest exchanges that fit the token limit'),
+            ('RETRIEVAL', 'Relevant', 'Send the past exchanges most relevant to the question (needs an Ollama embedding model)'),
+        ],
+        default='RECENT',
+        update=lambda self, context: retrieval_memory.schedule_indexing(self.embedding_model.strip() or semantic_cache.DEFAULT_EMBEDDING_MODEL) if self.memory_mode == 'RETRIEVAL' else None
+    )
+    
+    retrieval_top_k: bpy.props.IntProperty(
+        name="Relevant Exchanges",
+        description="Most past exchanges picked by relevance for one message (plus the newest one)",
+        default=8,
+        min=1,
+        max=50
+    )
+    
+    # Rolling summary of old history
+    summarize_history: bpy.props.BoolProperty(
+        name="Summarize Old History",
+        description="When memory gets close to its limit, fold the oldest exchanges into a summary in the background instead of dropping them",
+        default=True
+    )
+    
+    summary_model: bpy.props.StringProperty(
+        name="Summary Model",
+        description="Small local model that writes the summaries (empty = the chat model)",
+        default=""
+    )
+    
+    # Context sizing (num_ctx / num_predict)
+    auto_num_ctx: bpy.props.BoolProperty(
+        name="Size Context Automatically",
+        description="Send the smallest num_ctx that fits each request (within the model's context length) instead of Ollama's default",
+        default=True
+    )
+    
+    output_tokens: bpy.props.IntProperty(
+        name="Answer Tokens",
+        description="Tokens reserved for the answer (num_predict) - the rest of the context is used for the prompt",
+        default=1024,
+        min=128,
+        max=16384
+    )
+    
+    # How the prompt and history are sent to Ollama
+    prompt_format: bpy.props.EnumProperty(
+        name="Prompt Format",
+        description="How the system prompt and conversation history are sent to Ollama",
+        items=[
+            ('CHAT', 'Chat Messages', 'Send system / user / assistant messages via /api/chat with a stable prefix so only the new turn is prefilled'),
+            ('CONTEXT', 'Reuse Context', 'Carry the context tokens returned by /api/generate so only the new message is prefilled (in Blender mode)'),
+            ('FLAT', 'Flat Prompt', 'Original single prompt with the full history rebuilt every turn'),
+        ],
+        default='CHAT'
+    )
+    
     # Custom system prompt
     custom_system_prompt: bpy.props.StringProperty(
         name="System Prompt",
@@ -627,11 +761,35 @@ class AdvancedAIProps(bpy.types.PropertyGroup):
         default=""
     )
     
+    # Model residency (see residency.py)
+    manage_residency: bpy.props.BoolProperty(
+        name="Manage Model Memory",
+        description="Keep loaded models within the RAM budget, unload idle ones and set keep_alive from how each model is used",
+        default=True,
+        update=lambda self, context: residency.start() if self.manage_residency else residency.stop()
+    )
+    
+    ram_budget_gb: bpy.props.FloatProperty(
+        name="RAM Budget (GB)",
+        description="Memory all loaded models together may use - least recently used models are unloaded to stay under it (0 = no limit)",
+        default=10.0,
+        min=0.0,
+        max=512.0
+    )
+    
+    idle_unload_minutes: bpy.props.IntProperty(
+        name="Unload After (min)",
+        description="Unload a model after this many minutes without requests (0 = let Ollama decide)",
+        default=15,
+        min=0,
+        max=1440
+    )
+    
     # Ollama executable path
     ollama_executable_path: bpy.props.StringProperty(
         name="Ollama Executable",
-        description="Path to Ollama app executable (ollama app.exe)",
-        default="C:\\Users\\0-0\\AppData\\Local\\Programs\\Ollama\\ollama app.exe",
+        description="Path to the Ollama executable (ollama.exe or ollama app.exe) - empty finds it on PATH or in the default install folder",
+        default="",
         subtype='FILE_PATH'
     )
     
@@ -646,6 +804,28 @@ class AdvancedAIProps(bpy.types.PropertyGroup):
 # Import UI and operators modules
 from . import ui
 from . import operators
+from . import ollama_client
+from . import request_queue
+from . import response_cache
+from . import response_manifest
+from . import response_watcher
+from . import conversation_store
+from . import token_counter
+from . import summarizer
+from . import retrieval_memory
+from . import sessions
+from . import chat_request
+from . import context_budget
+from . import prefill
+from . import semantic_cache
+from . import model_inventory
+from . import residency
+from . import warmup
+from . import ollama_supervisor
+from . import streaming
+
+# Cached per-record token counts use the same counter as every budget
+conversation_store.set_token_counter(estimate_tokens)
 
 def load_saved_settings():
     """Load saved settings and apply them"""
@@ -661,6 +841,73 @@ def load_saved_settings():
     except Exception as e:
         print(f"Advanced AI: Failed to load settings: {e}")
 
+def start_semantic_cache():
+    """One-shot timer - load the semantic index after registering"""
+    try:
+        semantic_cache.start_background_backfill(bpy.context.window_manager.advanced_ai_props)
+    except Exception as e:
+        print(f"Advanced AI: Could not load semantic cache: {e}")
+    return None
+
+_supervisor_state = None
+
+def start_supervisor():
+    """One-shot timer - find or start the Ollama server in the background and follow its state"""
+    try:
+        props = bpy.context.window_manager.advanced_ai_props
+        supervisor = ollama_supervisor.get_supervisor(props.ollama_executable_path.strip())
+        if props.supervise_ollama:
+            supervisor.start_watching()
+        if not bpy.app.timers.is_registered(watch_supervisor):
+            bpy.app.timers.register(watch_supervisor, first_interval=0.2)
+    except Exception as e:
+        print(f"Advanced AI: Could not start the Ollama supervisor: {e}")
+    return None
+
+def watch_supervisor():
+    """Timer - show server state changes in the Ollama status"""
+    global _supervisor_state
+    supervisor = ollama_supervisor.get_supervisor()
+    if supervisor.state != _supervisor_state:
+        _supervisor_state = supervisor.state
+        bpy.context.window_manager.advanced_ai_props.ollama_status = supervisor.describe()
+        ollama_client.redraw_panels()
+    return 1.0
+
+def start_model_inventory():
+    """One-shot timer - bring the cached model list up to date after registering"""
+    try:
+        refresh_model_inventory()
+    except Exception as e:
+        print(f"Advanced AI: Could not scan models: {e}")
+    return None
+
+def follow_blend_session():
+    """Timer - switch to the .blend file's session once no answer is in flight"""
+    if request_queue.is_busy() or streaming.is_streaming():
+        return 0.5  # The answer belongs to the session it was asked in
+    try:
+        sessions.follow_blend(bpy.data.filepath)
+        ollama_client.redraw_panels()
+    except Exception as e:
+        print(f"Advanced AI: Could not switch session: {e}")
+    return None
+
+def schedule_follow_blend():
+    """Follow the current .blend file's session (deferred until the queue drains)"""
+    if not bpy.app.timers.is_registered(follow_blend_session):
+        bpy.app.timers.register(follow_blend_session, first_interval=0.0, persistent=True)
+
+@bpy.app.handlers.persistent
+def on_blend_loaded(dummy):
+    """Switch to the .blend file's conversation session after opening a file"""
+    try:
+        props = bpy.context.window_manager.advanced_ai_props
+        if props.session_follows_blend:
+            schedule_follow_blend()
+    except Exception as e:
+        print(f"Advanced AI: Could not switch session: {e}")
+
 def register():
     # Load saved settings first
     load_saved_settings()
@@ -671,9 +918,33 @@ def register():
     
     bpy.types.WindowManager.advanced_ai_props = bpy.props.PointerProperty(type=AdvancedAIProps)
     
+    # Map the semantic index once Blender is ready (backfill runs in the background)
+    bpy.app.timers.register(start_supervisor, first_interval=0.5)
+    bpy.app.timers.register(start_semantic_cache, first_interval=1.0)
+    # The model dropdown shows the cached list at once; new or removed models appear after this scan
+    bpy.app.timers.register(start_model_inventory, first_interval=1.5)
+    residency.start()
+    # Load the selected model before the first message (after the residency check has run)
+    warmup.schedule(3.0)
+    bpy.app.handlers.load_post.append(on_blend_loaded)
+    
     print("Advanced AI Communication addon registered successfully")
 
 def unregister():
+    if on_blend_loaded in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(on_blend_loaded)
+    if bpy.app.timers.is_registered(follow_blend_session):
+        bpy.app.timers.unregister(follow_blend_session)
+    summarizer.reset()
+    prefill.reset()
+    residency.stop()
+    warmup.reset()
+    ollama_supervisor.get_supervisor().stop_watching()
+    if bpy.app.timers.is_registered(watch_supervisor):
+        bpy.app.timers.unregister(watch_supervisor)
+    sessions.reset()
+    response_watcher.stop()
+    ollama_client.close_session()
     del bpy.types.WindowManager.advanced_ai_props
     ui.unregister()
     operators.unregister()
@@ -0,0 +1,254 @@
+"""Request builder for Ollama's /api/chat and /api/generate context reuse
+
+prepare_message_with_context() rebuilds one flat prompt every turn, so Ollama
+re-evaluates the whole history. The builders here keep the start of the
+request byte-identical between turns (fixed system message, history as
+separate user/assistant messages, a window that only moves in large steps) so
+Ollama's prompt cache only has to prefill the new turn. The 'CONTEXT' format
+goes one step further and sends only the new message plus the context token
+array returned by the previous /api/generate call.
+
+That context is also saved in the session folder (ollama_context.json) with
+a hash of the prefix it covers - system message plus the last exchange - so
+after a restart the conversation resumes from it instead of prefilling the
+whole history again, as long as the stored conversation still ends where the
+context does.
+"""
+
+import hashlib
+import json
+import os
+
+from . import SYSTEM_PROMPT, ROLE_REMINDER, estimate_tokens, get_conversation_store, get_session_directory
+
+# Fixed text appended to the system prompt - never put anything per-turn in here
+MEMORY_INSTRUCTIONS = (
+    "The earlier messages in this chat are our conversation history. "
+    "Reference and build upon them when relevant, and acknowledge when you remember previous topics."
+)
+
+# When the history no longer fits, cut back to this share of the budget so the
+# next few turns can be appended without moving the start of the window again
+WINDOW_REFILL_RATIO = 0.75
+
+# Oldest exchange of the current history window (keeps the prefix stable)
+_window_anchor = None
+
+# Context token arrays returned by /api/generate, per model:
+# {"context": [...], "prefix": hash, "num_ctx": n} (mirrors the session's CONTEXT_FILE)
+_last_context = {}
+_context_dir = None  # Session folder _last_context was loaded from
+CONTEXT_FILE = 'ollama_context.json'
+
+def parse_history_exchanges(history):
+    """Split 'User: ... / Assistant: ...' history text into (user, assistant) pairs"""
+    exchanges = []
+    user_lines = None
+    assistant_lines = None
+
+    for line in history.split('\n'):
+        if line.startswith('User: '):
+            if user_lines is not None:
+                exchanges.append(('\n'.join(user_lines).strip(), '\n'.join(assistant_lines or []).strip()))
+            user_lines = [line[len('User: '):]]
+            assistant_lines = None
+        elif user_lines is None:
+            continue  # Notes before the first exchange (e.g. trim markers)
+        elif assistant_lines is None and line.startswith('Assistant: '):
+            assistant_lines = [line[len('Assistant: '):]]
+        elif assistant_lines is not None:
+            assistant_lines.append(line)
+        else:
+            user_lines.append(line)
+
+    if user_lines is not None:
+        exchanges.append(('\n'.join(user_lines).strip(), '\n'.join(assistant_lines or []).strip()))
+
+    return [(user, assistant) for user, assistant in exchanges if user and assistant]
+
+def build_system_message(custom_prompt=None):
+    """System message that stays byte-identical across turns (includes the pinned role reminder)"""
+    prompt_text = custom_prompt if custom_prompt else SYSTEM_PROMPT
+    return f"{prompt_text}\n\n{ROLE_REMINDER}\n\n{MEMORY_INSTRUCTIONS}"
+
+def select_history_window(exchanges, token_budget):
+    """Pick the exchanges to send, moving the window start as rarely as possible"""
+    global _window_anchor
+
+    if not exchanges or token_budget <= 0:
+        _window_anchor = None
+        return []
+
+    costs = [estimate_tokens(user) + estimate_tokens(assistant) for user, assistant in exchanges]
+
+    # Reuse the previous window start if it is still there and still fits
+    if _window_anchor is not None:
+        for start in range(len(exchanges) - 1, -1, -1):
+            if exchanges[start] == _window_anchor:
+                if sum(costs[start:]) <= token_budget:
+                    return exchanges[start:]
+                break
+
+    # Otherwise refill: keep the newest exchanges up to a share of the budget
+    refill_budget = int(token_budget * WINDOW_REFILL_RATIO)
+    used = 0
+    start = len(exchanges)
+    while start > 0 and used + costs[start - 1] <= refill_budget:
+        start -= 1
+        used += costs[start]
+
+    window = exchanges[start:]
+    _window_anchor = window[0] if window else None
+    return window
+
+def build_chat_messages(user_message, token_limit, custom_prompt=None, history_selector=None):
+    """Build the /api/chat messages array (system, summary, history, new user message)"""
+    store = get_conversation_store()
+    system_message = build_system_message(custom_prompt)
+    summary = store.summary_text()
+    history_budget = token_limit - estimate_tokens(system_message) - estimate_tokens(user_message)
+
+    messages = [{"role": "system", "content": system_message}]
+    if summary:
+        # Only changes when the background summarizer folds in more history
+        summary_message = f"Summary of the earlier conversation:\n{summary}"
+        messages.append({"role": "system", "content": summary_message})
+        history_budget -= estimate_tokens(summary_message)
+
+    if history_selector is not None:
+        # Retrieval memory - relevant exchanges from the whole store, oldest first
+        window = history_selector(history_budget)
+    else:
+        window = select_history_window(store.exchanges(), history_budget)
+
+    for user, assistant in window:
+        messages.append({"role": "user", "content": user})
+        messages.append({"role": "assistant", "content": assistant})
+    messages.append({"role": "user", "content": user_message})
+    return messages
+
+def prefix_hash(model, custom_prompt, user_message, answer):
+    """Hash of what a context covers: model, system message and the exchange it ends with"""
+    key = json.dumps([model, build_system_message(custom_prompt), user_message.strip(), answer.strip()])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def _load_contexts():
+    """Saved contexts of the active session (read again after a session switch)"""
+    global _last_context, _context_dir
+    session_dir = get_session_directory()
+    if _context_dir != session_dir:
+        _context_dir = session_dir
+        _last_context = {}
+        try:
+            with open(session_dir / CONTEXT_FILE, 'r', encoding='utf-8') as f:
+                _last_context = json.load(f)
+        except (OSError, ValueError):
+            pass
+    return _last_context
+
+def _save_contexts():
+    context_file = _context_dir / CONTEXT_FILE
+    tmp_file = context_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(_last_context, f)
+    os.replace(tmp_file, context_file)
+
+def get_last_context(model, custom_prompt=None):
+    """Context token array for this model if it still ends where the conversation does"""
+    from . import context_budget
+
+    saved = _load_contexts().get(model)
+    if not saved:
+        return None
+    last = get_conversation_store().last_exchange()
+    if last is None or saved.get("prefix") != prefix_hash(model, custom_prompt, last.user, last.assistant):
+        return None  # History changed (edited, trimmed by hand, cached answer...) - prefill again
+    if saved.get("num_ctx"):
+        # Same num_ctx as when the context was made, so Ollama can keep its KV cache
+        context_budget.remember_bucket(model, saved["num_ctx"])
+    return saved["context"]
+
+def remember_context(model, context, user_message="", answer="", custom_prompt=None, num_ctx=None):
+    """Store (and save with the session) the context token array returned by /api/generate"""
+    if not context:
+        return
+    _load_contexts()[model] = {
+        "context": context,
+        "prefix": prefix_hash(model, custom_prompt, user_message, answer),
+        "num_ctx": num_ctx,
+    }
+    try:
+        _save_contexts()
+    except Exception as e:
+        print(f"Advanced AI: Could not save context: {e}")
+
+def clear_contexts(keep_saved=False):
+    """Forget stored contexts (memory was cleared or edited)
+
+    keep_saved=True only drops what is loaded (session switch) - the saved
+    context stays for when the session is opened again.
+    """
+    global _window_anchor, _context_dir
+    from . import context_budget, prefill
+    if keep_saved:
+        _context_dir = None
+    else:
+        _load_contexts().clear()
+        try:
+            (_context_dir / CONTEXT_FILE).unlink()
+        except OSError:
+            pass
+    _window_anchor = None
+    context_budget.reset_buckets()
+    prefill.invalidate()
+
+def estimate_payload_tokens(payload):
+    """Prompt tokens of an /api/chat or /api/generate payload"""
+    if "messages" in payload:
+        # A few tokens of chat template around every message
+        return sum(estimate_tokens(message["content"]) + 4 for message in payload["messages"])
+    return len(payload.get("context") or []) + estimate_tokens(payload.get("prompt", ""))
+
+def build_request(prompt_format, model, user_message, flat_prompt_builder, memory_enabled=True,
+                  token_limit=16000, custom_prompt=None, history_selector=None, budget=None):
+    """Return (endpoint, payload) for one send
+
+    prompt_format is 'FLAT' (legacy single prompt), 'CHAT' (/api/chat with
+    messages) or 'CONTEXT' (/api/generate carrying the previous context).
+    flat_prompt_builder() is only called when the legacy flat prompt is needed.
+    history_selector(budget), if given, picks the history exchanges for /api/chat
+    (retrieval memory) instead of the recency window.
+    budget (a context_budget.BudgetPlan) replaces token_limit and adds num_ctx
+    and num_predict to the payload.
+    """
+    if budget is None:
+        return _build_payload(prompt_format, model, user_message, flat_prompt_builder,
+                              memory_enabled, token_limit, custom_prompt, history_selector)
+
+    endpoint, payload = _build_payload(prompt_format, model, user_message, flat_prompt_builder,
+                                       memory_enabled, budget.prompt_budget, custom_prompt, history_selector)
+    payload["options"] = budget.finish(estimate_payload_tokens(payload)).options()
+    return endpoint, payload
+
+def _build_payload(prompt_format, model, user_message, flat_prompt_builder, memory_enabled,
+                   token_limit, custom_prompt, history_selector):
+    if not memory_enabled:
+        if prompt_format == 'CHAT':
+            return "/api/chat", {"model": model, "messages": [{"role": "user", "content": user_message}]}
+        return "/api/generate", {"model": model, "prompt": user_message}
+
+    if prompt_format == 'CHAT':
+        messages = build_chat_messages(user_message, token_limit, custom_prompt, history_selector)
+        return "/api/chat", {"model": model, "messages": messages}
+
+    if prompt_format == 'CONTEXT':
+        context = get_last_context(model, custom_prompt)
+        if context and len(context) + estimate_tokens(user_message) > token_limit:
+            # The carried context outgrew the budget - rebuild it from the trimmed history
+            context = None
+        if context:
+            # Ollama already holds the system prompt and history in this context
+            return "/api/generate", {"model": model, "prompt": user_message, "context": context}
+        # First turn: prefill the full history once, later turns carry the context
+
+    return "/api/generate", {"model": model, "prompt": flat_prompt_builder()}
@@ -0,0 +1,150 @@
+"""Context budget planner - sizes every request to the model's real context
+
+memory_token_limit used to only cap our own history estimate; Ollama never
+saw it and ran every model with its default num_ctx, so long prompts were
+cut off silently or a much larger KV cache than needed was allocated.
+
+For each request the planner takes the model's context length (from
+/api/show, cached in a_astitnet/cache/model_context.json), reserves the
+answer allowance (num_predict) and gives the rest - capped by the memory
+limit - to the prompt: system message, summary, pinned and recent (or
+retrieved) history and the new message. Once the prompt is built, the
+smallest num_ctx bucket that holds it plus the answer is sent along.
+
+Ollama reloads a model when num_ctx changes, so the bucket of the previous
+request is kept while it is still adequate; it only grows when needed and
+starts small again after memory is cleared or another session is opened.
+"""
+
+import json
+import os
+import threading
+
+DEFAULT_CONTEXT_LENGTH = 8192  # Until /api/show has answered for a model
+MIN_OUTPUT_TOKENS = 128
+NUM_CTX_BUCKETS = (2048, 4096, 8192, 16384, 32768, 65536, 131072, 262144)
+
+_lock = threading.Lock()
+_context_lengths = None  # model -> context length (loaded lazily)
+_fetching = set()
+_last_bucket = {}  # model -> num_ctx of the previous request
+last_plan = None  # Shown in the memory panel
+
+class BudgetPlan:
+    """Token budget of one request"""
+
+    def __init__(self, model, context_length, token_limit, output_tokens):
+        self.model = model
+        self.context_length = context_length
+        self.output_tokens = max(MIN_OUTPUT_TOKENS, min(output_tokens, context_length // 2))
+        # Everything in the prompt must fit next to the answer
+        self.prompt_budget = max(0, min(token_limit, context_length - self.output_tokens))
+        self.prompt_tokens = 0
+        self.num_ctx = None
+
+    def finish(self, prompt_tokens):
+        """Record the size of the built prompt and pick num_ctx for it"""
+        global last_plan
+        self.prompt_tokens = prompt_tokens
+        self.num_ctx = pick_bucket(self.model, prompt_tokens + self.output_tokens, self.context_length)
+        last_plan = self
+        return self
+
+    def options(self):
+        """Ollama options for this request"""
+        return {"num_ctx": self.num_ctx, "num_predict": self.output_tokens}
+
+    def describe(self):
+        return f"Context: {self.prompt_tokens} + {self.output_tokens} of num_ctx {self.num_ctx} (model max {self.context_length})"
+
+# === MODEL CONTEXT LENGTH ===
+def _cache_file():
+    from . import get_niout_directory
+    cache_dir = get_niout_directory().parent / 'cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / 'model_context.json'
+
+def _load_lengths():
+    global _context_lengths
+    if _context_lengths is None:
+        _context_lengths = {}
+        try:
+            with open(_cache_file(), 'r', encoding='utf-8') as f:
+                _context_lengths = {model: int(length) for model, length in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+    return _context_lengths
+
+def fetch_context_length(model):
+    """Ask Ollama for the model's trained context length (background thread)"""
+    from . import ollama_client
+
+    response = ollama_client.post("/api/show", {"model": model}, timeout=(5, 30))
+    response.raise_for_status()
+    info = response.json()
+    length = None
+    for key, value in (info.get("model_info") or {}).items():
+        if key.endswith(".context_length"):
+            length = int(value)
+            break
+    # A num_ctx set in the Modelfile wins over the trained length
+    for line in (info.get("parameters") or "").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[0] == "num_ctx":
+            length = min(length or int(parts[1]), int(parts[1]))
+    if not length:
+        raise ValueError(f"{model} reports no context length")
+
+    with _lock:
+        lengths = _load_lengths()
+        lengths[model] = length
+        snapshot = dict(lengths)
+    tmp_file = _cache_file().with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp_file, _cache_file())
+    return length
+
+def context_length(model):
+    """Cached context length of model (fetched in the background the first time)"""
+    from . import ollama_client
+
+    with _lock:
+        length = _load_lengths().get(model)
+        if length is not None or model in _fetching:
+            return length or DEFAULT_CONTEXT_LENGTH
+        _fetching.add(model)
+
+    def on_done(result, error):
+        with _lock:
+            _fetching.discard(model)
+        if error:
+            print(f"Advanced AI: Could not read the context length of {model}: {error}")
+        else:
+            print(f"Advanced AI: {model} has a context length of {result} tokens")
+
+    ollama_client.run_async(fetch_context_length, on_done, model)
+    return DEFAULT_CONTEXT_LENGTH
+
+# === PLANNING ===
+def plan(model, token_limit, output_tokens):
+    """Budget for one request to model with memory capped at token_limit"""
+    return BudgetPlan(model, context_length(model), token_limit, output_tokens)
+
+def pick_bucket(model, needed, max_length):
+    """Smallest num_ctx bucket holding needed tokens (keeps the previous one while it fits)"""
+    previous = _last_bucket.get(model)
+    if previous is not None and needed <= previous <= max_length:
+        return previous
+    bucket = next((size for size in NUM_CTX_BUCKETS if size >= needed), NUM_CTX_BUCKETS[-1])
+    bucket = min(bucket, max_length)
+    _last_bucket[model] = bucket
+    return bucket
+
+def remember_bucket(model, num_ctx):
+    """Prefer num_ctx for model (the size a resumed context was made with)"""
+    _last_bucket[model] = num_ctx
+
+def reset_buckets():
+    """Let the next request start from the smallest bucket again"""
+    _last_bucket.clear()
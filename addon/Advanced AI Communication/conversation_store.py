@@ -0,0 +1,684 @@
+"""Append-only conversation store for the memory system
+
+conversation_history.txt was read, re-split, trimmed and rewritten in full on
+every answer. Now each message is one JSON line in memory/conversation.jsonl:
+
+    {"id": 12, "role": "user", "text": "...", "tokens": 9, "ts": 1700000000.0,
+     "model": "qwen3:8b", "pinned": false}
+
+Adding an exchange appends two lines. Trimming only moves the window start
+saved in memory/conversation_window.json; older records stay on disk, and
+pinned ones remain visible. The old text format is kept as an import/export
+path (and is imported automatically the first time).
+
+The visible history is kept as an ExchangeWindow (a deque of exchanges with
+cached token counts and a running total) that is only rebuilt when the file
+changes on disk, so appending and trimming cost O(1) per exchange.
+
+There is one store per conversation session (see sessions.py). The last few
+used stores stay loaded in an LRU, so switching sessions is instant.
+
+A record with role "summary" holds the rolling summary of everything before
+record index "covers" (written by summarizer.py); the newest one is part of
+the window.
+
+Hot/cold tiering: conversation.jsonl only holds the window (plus pinned
+records). Once enough records have left the window they are compacted into
+the session's archive folder - zlib-compressed, append-only segments with a
+fixed-size offset index (see ConversationArchive). Archived exchanges can
+still be searched, exported and restored, but sending a message never reads
+them.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import time
+import zlib
+from collections import OrderedDict, deque
+
+STORE_NAME = 'conversation.jsonl'
+WINDOW_NAME = 'conversation_window.json'
+LEGACY_NAME = 'conversation_history.txt'
+MAX_LOADED_STORES = 4  # Recently used sessions kept in memory
+ARCHIVE_NAME = 'archive'
+COMPACT_MIN_RECORDS = 200  # Archive once this many records have left the window
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+
+_stores = OrderedDict()  # memory_dir -> ConversationStore, least recently used first
+
+def count_tokens(text):
+    """Rough estimate until the add-on sets a better counter (len // 4, as estimate_tokens)"""
+    return len(text) // 4
+
+def set_token_counter(counter):
+    """Use counter(text) -> int for the cached per-record token counts"""
+    global count_tokens
+    count_tokens = counter
+
+def format_exchange(user, assistant):
+    """One exchange in the conversation_history.txt text format"""
+    return f"User: {user}\nAssistant: {assistant}"
+
+class Exchange:
+    """One user/assistant pair in the window (records[start:end])"""
+    __slots__ = ("start", "end", "user", "assistant", "tokens", "pinned")
+
+    def __init__(self, start, end, user, assistant, tokens, pinned):
+        self.start = start
+        self.end = end
+        self.user = user
+        self.assistant = assistant
+        self.tokens = tokens
+        self.pinned = pinned
+
+class ExchangeWindow:
+    """Visible exchanges with a running token total
+
+    Pinned exchanges that fall off the front are moved to self.pinned and stay
+    visible (and counted). Every exchange enters and leaves the deque once, so
+    trimming is amortized O(1) per appended exchange.
+    """
+
+    def __init__(self):
+        self.exchanges = deque()
+        self.pinned = []
+        self.summary = None  # Newest summary record
+        self.total = 0
+
+    def set_summary(self, record):
+        if self.summary is not None:
+            self.total -= self.summary.get("tokens", 0)
+        self.summary = record
+        self.total += record.get("tokens", 0)
+
+    def drop_before(self, index):
+        """Move exchanges that start before record index out of the deque"""
+        dropped = 0
+        while self.exchanges and self.exchanges[0].start < index:
+            exchange = self.exchanges.popleft()
+            if exchange.pinned:
+                self.pinned.append(exchange)
+            else:
+                self.total -= exchange.tokens
+            dropped += 1
+        return dropped
+
+    def append(self, exchange):
+        self.exchanges.append(exchange)
+        self.total += exchange.tokens
+
+    def trim(self, token_limit):
+        """Drop the oldest exchanges until total <= token_limit - returns how many left the deque"""
+        dropped = 0
+        while self.total > token_limit and self.exchanges:
+            exchange = self.exchanges.popleft()
+            if exchange.pinned:
+                self.pinned.append(exchange)
+            else:
+                self.total -= exchange.tokens
+            dropped += 1
+        return dropped
+
+    def visible(self):
+        return self.pinned + list(self.exchanges)
+
+    def __len__(self):
+        return len(self.pinned) + len(self.exchanges)
+
+    def fit(self, budget, pinned_share=0.3):
+        """Exchanges for a prompt of at most budget tokens, oldest first
+
+        Pinned exchanges come first (up to pinned_share of the budget), then
+        the newest exchanges that still fit. Nothing is re-estimated.
+        """
+        chosen = []
+        used = 0
+        for exchange in self.pinned:
+            if used + exchange.tokens <= budget * pinned_share:
+                chosen.append(exchange)
+                used += exchange.tokens
+
+        recent = []
+        for exchange in reversed(self.exchanges):
+            if exchange.pinned and used + exchange.tokens <= budget * pinned_share:
+                chosen.append(exchange)
+                used += exchange.tokens
+                continue
+            if used + exchange.tokens > budget:
+                break
+            recent.append(exchange)
+            used += exchange.tokens
+
+        chosen.sort(key=lambda exchange: exchange.start)
+        return chosen + recent[::-1]
+
+class ConversationArchive:
+    """Compressed cold storage for exchanges that left the window
+
+    archive/segment_NNNN.z  zlib blocks, one per compaction, each holding the
+                            JSON lines of the archived records
+    archive/index.bin       one fixed-size entry per archived exchange: user and
+                            assistant record ids, segment, block offset, block
+                            length, tokens and timestamp
+
+    Both files are only ever appended to (block first, then its index
+    entries). The index is read through mmap, so counting archived exchanges
+    never touches the segments.
+    """
+    ENTRY = struct.Struct('<qqIQIId')
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = directory / 'index.bin'
+        self._map = None
+        self._map_size = 0
+        self._block = (None, None)  # Last decompressed block: ((segment, offset), {id: record})
+        self._exchanges = []  # Decoded exchanges, filled on demand (search, export, retrieval)
+
+    def _segment_path(self, segment):
+        return self.directory / f'segment_{segment:04d}.z'
+
+    def _index(self):
+        """mmap of the complete index entries (remapped when the index grew)"""
+        try:
+            size = self.index_path.stat().st_size
+        except OSError:
+            size = 0
+        size -= size % self.ENTRY.size  # Ignore a torn entry from an interrupted write
+        if size != self._map_size:
+            self.close()
+            if size:
+                with open(self.index_path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._map_size = size
+        return self._map
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._map_size = 0
+
+    def __len__(self):
+        """Number of archived exchanges (index size only)"""
+        self._index()
+        return self._map_size // self.ENTRY.size
+
+    def entries(self, first=0):
+        index = self._index()
+        for offset in range(first * self.ENTRY.size, self._map_size, self.ENTRY.size):
+            yield self.ENTRY.unpack_from(index, offset)
+
+    def next_id(self):
+        """Record id after the newest archived exchange"""
+        count = len(self)
+        if not count:
+            return 0
+        return self.ENTRY.unpack_from(self._map, (count - 1) * self.ENTRY.size)[1] + 1
+
+    def compressed_bytes(self):
+        return sum(path.stat().st_size for path in self.directory.glob('segment_*.z'))
+
+    def append(self, records):
+        """Compress records into one new block and index their exchanges"""
+        self.directory.mkdir(exist_ok=True)
+        data = zlib.compress(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'), 6)
+
+        segments = sorted(self.directory.glob('segment_*.z'))
+        segment = int(segments[-1].stem.split('_')[1]) if segments else 1
+        path = self._segment_path(segment)
+        offset = path.stat().st_size if path.exists() else 0
+        if offset and offset + len(data) > SEGMENT_MAX_BYTES:
+            segment, offset = segment + 1, 0
+            path = self._segment_path(segment)
+        with open(path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        entries = []
+        for exchange in ConversationStore._iter_exchanges(records):
+            user = records[exchange.start]
+            assistant = records[exchange.end - 1]
+            entries.append(self.ENTRY.pack(user["id"], assistant["id"], segment, offset, len(data),
+                                           exchange.tokens, user.get("ts", 0.0)))
+        with open(self.index_path, 'ab') as f:
+            f.write(b''.join(entries))
+        return len(entries)
+
+    def _read_block(self, segment, offset, length):
+        key = (segment, offset)
+        if self._block[0] != key:
+            with open(self._segment_path(segment), 'rb') as f:
+                f.seek(offset)
+                lines = zlib.decompress(f.read(length)).decode('utf-8').splitlines()
+            self._block = (key, {record["id"]: record for record in map(json.loads, lines)})
+        return self._block[1]
+
+    def iter_exchanges(self, first=0):
+        """Archived exchanges from number first on as (user record, assistant record), nothing is kept"""
+        for user_id, assistant_id, segment, offset, length, tokens, ts in self.entries(first):
+            block = self._read_block(segment, offset, length)
+            yield block[user_id], block[assistant_id]
+
+    def exchanges(self):
+        """Every archived exchange as (user record, assistant record), oldest first
+
+        Decoded once and kept; later calls only decode blocks added since.
+        """
+        self._exchanges.extend(self.iter_exchanges(len(self._exchanges)))
+        return self._exchanges
+
+    def record_ids(self):
+        """Ids of every archived user and assistant record (from the index only)"""
+        ids = set()
+        for user_id, assistant_id, *_ in self.entries():
+            ids.update((user_id, assistant_id))
+        return ids
+
+    def search(self, query, limit=20):
+        """Archived exchanges whose text contains query (case-insensitive), newest first"""
+        query = query.lower()
+        matches = []
+        for user, assistant in reversed(self.exchanges()):
+            if query in user["text"].lower() or query in assistant["text"].lower():
+                matches.append((user, assistant))
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    def clear(self):
+        self.close()
+        self._block = (None, None)
+        self._exchanges = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+class ConversationStore:
+    """Records of one memory directory, cached in memory and reloaded when the file changes"""
+
+    def __init__(self, memory_dir):
+        self.memory_dir = memory_dir
+        self.path = memory_dir / STORE_NAME
+        self.window_path = memory_dir / WINDOW_NAME
+        self.records = []
+        self.start = 0  # Index of the first record in the window
+        self.migrations = set()  # One-time clean-ups already applied (saved with the window)
+        self._stat_key = None
+        self.window = ExchangeWindow()
+        self.archive = ConversationArchive(memory_dir / ARCHIVE_NAME)
+        self.is_new = False  # True when there was no history at all
+        self._migrate_legacy()
+        self.refresh()
+
+    # --- Loading ---
+    def _file_key(self):
+        try:
+            st = self.path.stat()
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def refresh(self):
+        """Reload if conversation.jsonl was changed outside this store"""
+        key = self._file_key()
+        if key == self._stat_key:
+            return False
+        self.records = []
+        if key is not None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self.records.append(json.loads(line))
+                    except ValueError:
+                        continue  # Torn line from an interrupted write
+        self.start = 0
+        try:
+            with open(self.window_path, 'r', encoding='utf-8') as f:
+                window = json.load(f)
+            self.start = min(int(window.get("start", 0)), len(self.records))
+            self.migrations = set(window.get("migrations", []))
+        except (OSError, ValueError):
+            pass
+        self._stat_key = key
+        self._rebuild_window()
+        self._drop_archived()
+        return True
+
+    def _drop_archived(self):
+        """Remove hot records that are in the archive already
+
+        compact() writes the archive before it rewrites the hot file; if it is
+        interrupted in between, the exchanges are in both tiers. Pinned records
+        are never archived, hot records are in id order, and after a complete
+        compaction every other hot exchange is newer than the archive - so only
+        the oldest unpinned record has to be compared.
+        """
+        last_archived = self.archive.next_id() - 1
+        oldest = next((record for record in self.records
+                       if record["role"] in ("user", "assistant") and not record.get("pinned")), None)
+        if oldest is None or oldest["id"] > last_archived:
+            return
+        archived = self.archive.record_ids()
+        drop = {i for i, record in enumerate(self.records) if record["id"] in archived}
+        if drop:
+            print(f"Advanced AI: Removing {len(drop)} records already in the archive (interrupted compaction)")
+            self._drop_records(drop)
+
+    def _rebuild_window(self):
+        """Parse records into the exchange window (only after the file changed)"""
+        self.window = ExchangeWindow()
+        for record in reversed(self.records):
+            if record["role"] == "summary":
+                self.window.set_summary(record)
+                break
+        for exchange in self._iter_exchanges(self.records):
+            if exchange.start >= self.start:
+                self.window.append(exchange)
+            elif exchange.pinned:
+                self.window.pinned.append(exchange)
+                self.window.total += exchange.tokens
+
+    @staticmethod
+    def _iter_exchanges(records, offset=0):
+        user = None
+        for i, record in enumerate(records, offset):
+            if record["role"] == "user":
+                user = (i, record)
+            elif record["role"] == "assistant" and user is not None:
+                start, user_record = user
+                tokens = user_record.get("tokens", 0) + record.get("tokens", 0)
+                pinned = bool(user_record.get("pinned") or record.get("pinned"))
+                yield Exchange(start, i + 1, user_record["text"], record["text"], tokens, pinned)
+                user = None
+
+    def _migrate_legacy(self):
+        """Import conversation_history.txt the first time the store is used"""
+        if self.path.exists():
+            return
+        legacy = self.memory_dir / LEGACY_NAME
+        if not legacy.exists():
+            self.is_new = True
+            return
+        with open(legacy, 'r', encoding='utf-8') as f:
+            text = f.read()
+        self.import_text(text)
+        print(f"Advanced AI: Imported {len(self.records) // 2} exchanges from {LEGACY_NAME}")
+
+    # --- Writing ---
+    def _next_id(self):
+        hot = self.records[-1]["id"] + 1 if self.records else 0
+        return max(hot, self.archive.next_id())
+
+    @staticmethod
+    def _make_record(record_id, role, text, model, pinned):
+        return {
+            "id": record_id,
+            "role": role,
+            "text": text,
+            "tokens": count_tokens(text),
+            "ts": time.time(),
+            "model": model,
+            "pinned": pinned,
+        }
+
+    def _append_records(self, records):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+        offset = len(self.records)
+        self.records.extend(records)
+        for exchange in self._iter_exchanges(records, offset):
+            self.window.append(exchange)
+        for record in records:
+            if record["role"] == "summary":
+                self.window.set_summary(record)
+        self._stat_key = self._file_key()
+        self.is_new = False
+
+    def append_exchange(self, user, assistant, model="", pinned=False):
+        """Append one user/assistant exchange - O(1), nothing is rewritten"""
+        self.refresh()
+        next_id = self._next_id()
+        self._append_records([
+            self._make_record(next_id, "user", user, model, pinned),
+            self._make_record(next_id + 1, "assistant", assistant, model, pinned),
+        ])
+
+    def add_summary(self, text, covers, model=""):
+        """Store a rolling summary of records[:covers] and move the window past them"""
+        self.refresh()
+        record = self._make_record(self._next_id(), "summary", text, model, False)
+        record["covers"] = covers
+        self._append_records([record])
+        if self.window.drop_before(covers):
+            self.start = self.window.exchanges[0].start if self.window.exchanges else len(self.records)
+            self._save_window()
+            self.compact()
+
+    def summary_text(self):
+        """Text of the current rolling summary ('' if there is none)"""
+        self.refresh()
+        return self.window.summary["text"] if self.window.summary else ""
+
+    def summary_tokens(self):
+        self.refresh()
+        return self.window.summary.get("tokens", 0) if self.window.summary else 0
+
+    def oldest_exchanges(self, token_target, max_exchanges):
+        """Oldest unpinned window exchanges worth about token_target tokens (for summarizing)"""
+        self.refresh()
+        chosen = []
+        tokens = 0
+        for exchange in self.window.exchanges:
+            if tokens >= token_target or len(chosen) >= max_exchanges:
+                break
+            if exchange.pinned:
+                continue
+            chosen.append(exchange)
+            tokens += exchange.tokens
+        return chosen
+
+    def _save_window(self):
+        tmp_file = self.window_path.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"start": self.start, "migrations": sorted(self.migrations)}, f)
+        os.replace(tmp_file, self.window_path)
+
+    def _rewrite(self, records, start=0):
+        """Replace the whole store (import, clear and clean-ups only)"""
+        tmp_file = self.path.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+        os.replace(tmp_file, self.path)
+        self.records = records
+        self.start = start
+        self._save_window()
+        self._stat_key = self._file_key()
+        self._rebuild_window()
+
+    # --- Window ---
+    def window_tokens(self):
+        self.refresh()
+        return self.window.total
+
+    def exchange_count(self):
+        """Number of visible exchanges"""
+        self.refresh()
+        return len(self.window)
+
+    def context_fingerprint(self):
+        """Short hash of the memory a prompt would include - changes with every exchange and summary"""
+        self.refresh()
+        last = self.last_exchange()
+        material = json.dumps([self.summary_text(), len(self.window), self.window.total,
+                               [last.user, last.assistant] if last else None])
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]
+
+    def trim(self, token_limit):
+        """Move the window start forward until the visible history fits token_limit"""
+        self.refresh()
+        if self.window.trim(token_limit):
+            self.start = self.window.exchanges[0].start if self.window.exchanges else len(self.records)
+            self._save_window()
+            self.compact()  # Logs when it archives - trimming itself happens on most sends once memory is full
+        return self.window.total
+
+    # --- Archive ---
+    def compact(self, min_records=COMPACT_MIN_RECORDS):
+        """Move unpinned exchanges (and old summaries) before the window into the archive
+
+        Returns the number of exchanges archived. Only the hot file is rewritten.
+        """
+        self.refresh()
+        drop = set()
+        for exchange in self._iter_exchanges(self.records[:self.start]):
+            if not exchange.pinned:
+                drop.update(range(exchange.start, exchange.end))
+        for i, record in enumerate(self.records[:self.start]):
+            if record["role"] == "summary" and record is not self.window.summary:
+                drop.add(i)
+        if len(drop) < min_records:
+            return 0
+
+        archived = self.archive.append([self.records[i] for i in sorted(drop)])
+        self._drop_records(drop)
+        print(f"Advanced AI: Archived {archived} exchanges ({len(self.archive)} in the archive)")
+        return archived
+
+    def archived_count(self):
+        """Number of archived exchanges (read from the mmap'd index, nothing is decompressed)"""
+        return len(self.archive)
+
+    def search_archive(self, query, limit=20):
+        """(user, assistant) pairs from the archive containing query, newest first"""
+        return [(user["text"], assistant["text"]) for user, assistant in self.archive.search(query, limit)]
+
+    def restore_exchanges(self, pairs, model=""):
+        """Bring archived (user, assistant) pairs back into the window as new exchanges"""
+        for user, assistant in pairs:
+            self.append_exchange(user, assistant, model=model)
+        return len(pairs)
+
+    # --- Reading ---
+    def exchanges(self):
+        """(user, assistant) pairs in the current window"""
+        self.refresh()
+        return [(exchange.user, exchange.assistant) for exchange in self.window.visible()]
+
+    def last_exchange(self):
+        """Newest exchange in the window (None if there is none)"""
+        self.refresh()
+        if self.window.exchanges:
+            return self.window.exchanges[-1]
+        return self.window.pinned[-1] if self.window.pinned else None
+
+    def fit_exchanges(self, budget):
+        """(user, assistant) pairs for a prompt of at most budget tokens"""
+        self.refresh()
+        return [(exchange.user, exchange.assistant) for exchange in self.window.fit(budget)]
+
+    def hot_exchange_records(self):
+        """Exchanges in conversation.jsonl (window and not yet archived) as Exchange objects, oldest first"""
+        self.refresh()
+        return list(self._iter_exchanges(self.records))
+
+    def all_exchange_records(self):
+        """Every stored exchange (archived ones too) as Exchange objects, oldest first
+
+        Decompresses the whole archive - not for the send path.
+        """
+        self.refresh()
+        ordered = []
+        for user, assistant in self.archive.exchanges():
+            tokens = user.get("tokens", 0) + assistant.get("tokens", 0)
+            ordered.append((user["id"], Exchange(-1, -1, user["text"], assistant["text"], tokens, False)))
+        for exchange in self._iter_exchanges(self.records):
+            ordered.append((self.records[exchange.start]["id"], exchange))
+        ordered.sort(key=lambda item: item[0])
+        return [exchange for _, exchange in ordered]
+
+    def all_exchanges(self):
+        """Every stored exchange, including trimmed and archived ones"""
+        return [(exchange.user, exchange.assistant) for exchange in self.all_exchange_records()]
+
+    def export_text(self, include_archived=False):
+        """History in the conversation_history.txt format"""
+        pairs = self.all_exchanges() if include_archived else self.exchanges()
+        return '\n\n'.join(format_exchange(user, assistant) for user, assistant in pairs)
+
+    def import_text(self, text, model=""):
+        """Replace the store with exchanges parsed from the text format"""
+        from .chat_request import parse_history_exchanges
+        records = []
+        for user, assistant in parse_history_exchanges(text or ""):
+            records.append(self._make_record(len(records), "user", user, model, False))
+            records.append(self._make_record(len(records), "assistant", assistant, model, False))
+        self.archive.clear()
+        self._rewrite(records)
+        self.is_new = False
+
+    def remove_exchanges(self, predicate):
+        """Rewrite the store without the exchanges for which predicate(exchange) is true
+        Returns the number of exchanges removed."""
+        self.refresh()
+        drop = set()
+        for exchange in self._iter_exchanges(self.records):
+            if predicate(exchange):
+                drop.update(range(exchange.start, exchange.end))
+        if not drop:
+            return 0
+        self._drop_records(drop)
+        return len(drop) // 2
+
+    def _drop_records(self, drop):
+        """Rewrite the hot file without the record indexes in drop
+
+        The window start and summary coverage are moved to the same records.
+        """
+        # Old record index -> index in the rewritten list
+        new_index = []
+        kept = 0
+        for i in range(len(self.records) + 1):
+            new_index.append(kept)
+            if i < len(self.records) and i not in drop:
+                kept += 1
+        records = []
+        for i, record in enumerate(self.records):
+            if i in drop:
+                continue
+            if record["role"] == "summary":
+                record = dict(record, covers=new_index[min(record["covers"], len(self.records))])
+            records.append(record)
+
+        self._rewrite(records, start=new_index[self.start])
+
+    def mark_migrated(self, name):
+        """Remember that the one-time clean-up name has run for this store"""
+        self.migrations.add(name)
+        self._save_window()
+
+    def clear(self):
+        self.archive.clear()
+        self._rewrite([])
+        self.is_new = False
+
+def get_store(memory_dir):
+    """Get the store for memory_dir (cached, least recently used ones are dropped)"""
+    store = _stores.get(memory_dir)
+    if store is None:
+        store = ConversationStore(memory_dir)
+        _stores[memory_dir] = store
+        while len(_stores) > MAX_LOADED_STORES:
+            _stores.popitem(last=False)
+    else:
+        _stores.move_to_end(memory_dir)
+    return store
+
+def forget_store(memory_dir):
+    """Drop the cached store for memory_dir (session deleted)"""
+    store = _stores.pop(memory_dir, None)
+    if store is not None:
+        store.archive.close()  # Windows can't delete a mapped file
@@ -0,0 +1,189 @@
+"""Shared HTTP access to Ollama for the add-on
+
+One pooled keep-alive requests.Session is reused by every operator instead of
+a one-off requests.post per call, and run_async() keeps blocking HTTP calls off
+Blender's main thread, handing results back through a single timer.
+
+post() and get() survive a server restart: on a connection error (off the
+main thread, while ollama_supervisor is watching) they have the supervisor
+bring the server back and send the request again instead of failing.
+
+Models are controlled through the API too: preload_model() loads one
+without generating, unload_model() frees it with keep_alive 0, so
+switching models never needs the CLI or killing the server.
+"""
+
+import queue
+import threading
+
+import bpy
+
+OLLAMA_URL = "http://localhost:11434"
+
+_session = None
+_session_lock = threading.Lock()
+
+# Finished background calls waiting to be delivered on the main thread
+_results = queue.Queue()
+_pending = 0
+_pending_lock = threading.Lock()
+RESULT_POLL_INTERVAL = 0.1
+
+def get_session():
+    """Get the shared keep-alive session (created on first use)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # A few connections are enough: one generation plus status/test calls
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4)
+            session.mount("http://", adapter)
+            _session = session
+            print("Advanced AI: Created shared Ollama HTTP session")
+        return _session
+
+def close_session():
+    """Close the shared session (called on unregister)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def _send(method, path, **kwargs):
+    """Send a request, waiting for the supervisor if the server is restarting"""
+    import requests
+    from . import ollama_supervisor
+
+    try:
+        return getattr(get_session(), method)(f"{OLLAMA_URL}{path}", **kwargs)
+    except requests.ConnectionError:
+        supervisor = ollama_supervisor.get_supervisor()
+        # Never hold up Blender's main thread; don't start a server the user stopped
+        if threading.current_thread() is threading.main_thread() or not (supervisor.watching and supervisor.wanted):
+            raise
+        print(f"Advanced AI: Ollama not reachable - holding {path} until it is back")
+        if not supervisor.ensure_running(restarting=True):
+            raise
+        return getattr(get_session(), method)(f"{OLLAMA_URL}{path}", **kwargs)
+
+def post(path, payload, **kwargs):
+    """POST to the Ollama API through the shared session"""
+    kwargs.setdefault("timeout", 30)
+    return _send("post", path, json=payload, **kwargs)
+
+def get(path, **kwargs):
+    """GET from the Ollama API through the shared session"""
+    kwargs.setdefault("timeout", 5)
+    return _send("get", path, **kwargs)
+
+def generate(model, prompt, **options):
+    """Run a non-streaming /api/generate call and return the JSON result"""
+    payload = {"model": model, "prompt": prompt, "stream": False}
+    payload.update(options)
+    response = post("/api/generate", payload, timeout=(5, 600))
+    response.raise_for_status()
+    return response.json()
+
+# === MODEL CONTROL ===
+def list_models():
+    """Return the installed models (/api/tags)"""
+    response = get("/api/tags")
+    response.raise_for_status()
+    return response.json().get("models", [])
+
+def list_running_models():
+    """Return the models Ollama currently has loaded (/api/ps)"""
+    response = get("/api/ps")
+    response.raise_for_status()
+    return response.json().get("models", [])
+
+def show_model(model):
+    """Return a model's details, parameters and model_info (/api/show)"""
+    response = post("/api/show", {"model": model}, timeout=(5, 30))
+    response.raise_for_status()
+    return response.json()
+
+def preload_model(model, keep_alive=None, options=None):
+    """Load a model into memory without generating anything"""
+    payload = {"model": model}
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    if options:
+        payload["options"] = options  # num_ctx must match the chat requests or Ollama reloads
+    response = post("/api/generate", payload, timeout=(5, 300))
+    response.raise_for_status()
+    return response.json()
+
+def unload_model(model):
+    """Free a model's memory right away (the server keeps running)"""
+    response = post("/api/generate", {"model": model, "keep_alive": 0}, timeout=(5, 30))
+    response.raise_for_status()
+    return model
+
+def unload_all_models(keep=None):
+    """Unload every loaded model except keep - returns their names"""
+    names = [m.get('name', '') for m in list_running_models() if m.get('name') != keep]
+    for name in names:
+        unload_model(name)
+    return names
+
+def switch_model(model, keep_alive=None):
+    """Make model the only loaded one: free the others, then load it"""
+    unloaded = unload_all_models(keep=model)
+    preload_model(model, keep_alive)
+    return unloaded
+
+# === BACKGROUND CALLS ===
+def run_async(func, on_done=None, *args, **kwargs):
+    """Run func(*args, **kwargs) on a background thread
+
+    on_done(result, error) is called later on Blender's main thread, so it may
+    safely touch props and the UI.
+    """
+    global _pending
+
+    def worker():
+        try:
+            result, error = func(*args, **kwargs), None
+        except Exception as e:
+            result, error = None, e
+        _results.put((on_done, result, error))
+
+    with _pending_lock:
+        _pending += 1
+    threading.Thread(target=worker, daemon=True).start()
+
+    if not bpy.app.timers.is_registered(_deliver_results):
+        bpy.app.timers.register(_deliver_results, first_interval=RESULT_POLL_INTERVAL)
+
+def _deliver_results():
+    """Timer callback - hand finished background calls to their callbacks"""
+    global _pending
+
+    while True:
+        try:
+            on_done, result, error = _results.get_nowait()
+        except queue.Empty:
+            break
+        with _pending_lock:
+            _pending -= 1
+        if on_done:
+            try:
+                on_done(result, error)
+            except Exception as e:
+                print(f"Advanced AI: Background callback failed: {e}")
+
+    with _pending_lock:
+        still_running = _pending > 0
+    return RESULT_POLL_INTERVAL if still_running else None
+
+def redraw_panels():
+    """Tag 3D views for redraw after a background result changed props"""
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
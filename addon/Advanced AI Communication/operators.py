@@ -7,6 +7,288 @@ from pathlib import Path
 # Import from main module
 from . import get_niout_directory, get_highest_response_number, auto_refresh_monitor, save_settings_to_file, UI_SETTINGS
 from . import prepare_message_with_context, add_to_conversation_history, save_conversation_history, reinforce_base_prompt_in_memory
+from . import save_response_to_archive, get_conversation_store, get_session_directory, get_model_inventory, refresh_model_inventory
+from . import worker_client, streaming, ollama_client, chat_request, request_queue, response_cache, semantic_cache, response_manifest, response_watcher, token_counter, summarizer, retrieval_memory, sessions, context_budget, prefill, residency
+
+def start_generation(job):
+    """Dispatch one queued message (called by request_queue when it is this job's turn)"""
+    props = bpy.context.window_manager.advanced_ai_props
+    message = job.message
+    
+    # Auto-detect and configure paths using Simple Chat's method
+    ADVANCEDAI_OT_SendMessage.auto_configure_paths(props)
+    
+    niout_dir = get_niout_directory()
+    niout_dir.mkdir(exist_ok=True)
+    
+    model_name = job.model
+    
+    # Update current model display
+    props.current_model_display = model_name
+    
+    # Chat requests always go first - pause any background history summary or prefill
+    summarizer.cancel()
+    prefill.cancel()
+    
+    # Count this request's tokens with the model's tokenizer (or learned ratio)
+    token_counter.set_active_model(model_name)
+    
+    # Answer repeated questions straight from the response cache
+    if job.cache_key and job.memory_enabled:
+        # A follow-up ("and the second one?") means something else in another conversation -
+        # key on the memory as it is now (queued messages see the answers before them)
+        job.cache_key = response_cache.scope_key(job.cache_key, get_conversation_store().context_fingerprint())
+    if job.cache_key:
+        cached = response_cache.get(job.cache_key, job.cache_ttl_days)
+        if cached is not None:
+            deliver_cached_response(job, cached)
+            return True
+    
+    # Reworded questions: embed and search the semantic index off the main thread
+    if job.semantic:
+        props.monitoring_status = "🔎 Checking semantic cache..."
+        ollama_client.run_async(
+            semantic_cache.lookup, lambda result, error: on_semantic_lookup(job, result, error),
+            message, model_name, job.embedding_model, job.semantic_threshold
+        )
+        return True
+    
+    # Retrieval memory needs the question's embedding before the request is built
+    if job.retrieval:
+        props.monitoring_status = "🔎 Finding relevant memory..."
+        ollama_client.run_async(
+            semantic_cache.embed, lambda result, error: on_query_embedded(job, result, error),
+            message, job.embedding_model
+        )
+        return True
+    
+    return dispatch_generation(job)
+
+def on_query_embedded(job, result, error):
+    """Question embedded for retrieval memory - build and send the request"""
+    if request_queue.get_active() is not job:
+        return  # Stopped meanwhile
+    
+    if error:
+        print(f"Advanced AI: Retrieval memory unavailable, using recent history: {error}")
+    else:
+        job.query_vector = result
+    
+    try:
+        started = dispatch_generation(job)
+    except Exception as e:
+        print(f"Advanced AI: Failed to start message: {e}")
+        started = False
+    if not started:
+        request_queue.job_finished(job)
+
+def on_semantic_lookup(job, result, error):
+    """Semantic lookup finished - answer from the index or generate as usual"""
+    if request_queue.get_active() is not job:
+        return  # Stopped while we were looking
+    
+    if error:
+        print(f"Advanced AI: Semantic cache unavailable: {error}")
+    else:
+        answer, score, job.query_vector = result
+        if answer is not None:
+            print(f"Advanced AI: Semantic cache match ({score:.3f})")
+            deliver_cached_response(job, answer, source=f"similar question, {score:.2f}")
+            return
+    
+    try:
+        started = dispatch_generation(job)
+    except Exception as e:
+        print(f"Advanced AI: Failed to start message: {e}")
+        started = False
+    if not started:
+        request_queue.job_finished(job)
+
+def dispatch_generation(job):
+    """Build the request and hand it to Ollama, the chat worker or the batch file"""
+    props = bpy.context.window_manager.advanced_ai_props
+    message = job.message
+    model_name = job.model
+    
+    # Retrieval memory: pick history by relevance to this question instead of recency
+    history_selector = None
+    if job.retrieval and job.query_vector is not None:
+        def history_selector(budget):
+            return retrieval_memory.retrieve(job.query_vector, budget, job.embedding_model, job.retrieval_top_k)
+    
+    # Split the model's context between prompt and answer (num_ctx / num_predict)
+    budget = context_budget.plan(model_name, job.token_limit, job.output_tokens) if job.size_context else None
+    prompt_budget = budget.prompt_budget if budget else job.token_limit
+    
+    def build_flat_prompt():
+        # Prepare message with memory context if enabled
+        if job.memory_enabled:
+            final_message = prepare_message_with_context(message, prompt_budget, job.custom_prompt, history_selector)
+            print(f"Advanced AI: Memory enabled - using {len(final_message)} characters with context")
+            return final_message
+        print(f"Advanced AI: Memory disabled - using message as-is")
+        return message
+    
+    # Build the Ollama request (flat prompt, /api/chat messages or carried context)
+    endpoint, payload = chat_request.build_request(
+        job.prompt_format, model_name, message, build_flat_prompt,
+        memory_enabled=job.memory_enabled, token_limit=job.token_limit, custom_prompt=job.custom_prompt,
+        history_selector=history_selector, budget=budget
+    )
+    if budget:
+        print(f"Advanced AI: {budget.describe()}")
+    
+    # Make room in the RAM budget and keep the model loaded as long as it is being used
+    keep_alive = residency.note_use(model_name, props) if props.manage_residency else None
+    if keep_alive is not None:
+        payload["keep_alive"] = keep_alive
+    
+    # Store the original user message for memory
+    props.last_user_message = message
+    props.response = "Processing your request..."
+    
+    # In-Blender mode - call Ollama from a background thread, no batch process needed
+    if job.in_process:
+        streaming.start_stream(endpoint, payload, user_message=message, stream=job.stream, job=job)
+        props.waiting_for_response = True
+        props.monitoring_status = "✍️ Waiting for first token..." if job.stream else "⏳ Generating in Blender..."
+        return True
+    
+    # Hand the prompt to the running chat worker (off the main thread - a wedged
+    # worker must not freeze Blender); fall back to the batch file
+    if job.use_chat_worker:
+        if endpoint == "/api/chat":
+            request = {"messages": payload["messages"]}
+        else:
+            # The worker does not hold our context tokens - give it the full prompt
+            request = {"prompt": payload["prompt"] if "context" not in payload else build_flat_prompt()}
+        props.monitoring_status = "📨 Sending to chat worker..."
+        ollama_client.run_async(
+            worker_client.submit_chat,
+            lambda accepted, error: on_worker_submitted(job, accepted, error, endpoint, payload, build_flat_prompt),
+            model_name, options=payload.get("options"), keep_alive=keep_alive, job_id=job.id, **request
+        )
+        return True
+    
+    return dispatch_external(job, endpoint, payload, build_flat_prompt)
+
+def on_worker_submitted(job, accepted, error, endpoint, payload, build_flat_prompt):
+    """Chat worker answered the submit - watch for its response or fall back to the batch file"""
+    if request_queue.get_active() is not job:
+        if accepted:
+            ollama_client.run_async(worker_client.cancel_generation, None, job.id)  # Stopped meanwhile
+        return
+    
+    if error:
+        print(f"Advanced AI: Chat worker not reachable: {error}")
+    job.via_worker = bool(accepted)
+    try:
+        started = dispatch_external(job, endpoint, payload, build_flat_prompt)
+    except Exception as e:
+        print(f"Advanced AI: Failed to start message: {e}")
+        started = False
+    if not started:
+        request_queue.job_finished(job)
+
+def dispatch_external(job, endpoint, payload, build_flat_prompt):
+    """Run the batch file (unless the worker took the job) and watch for the response file"""
+    props = bpy.context.window_manager.advanced_ai_props
+    model_name = job.model
+    niout_dir = get_niout_directory()
+    token_counter.forget_evaluated(model_name)  # Ollama's cache is out of our sight from here
+    
+    if not job.via_worker:
+        # The batch script only understands input.txt + model_config.txt
+        if endpoint == "/api/generate" and "context" not in payload:
+            final_message = payload["prompt"]
+        else:
+            final_message = build_flat_prompt()
+        
+        # Write message and model config using Simple Chat's direct method
+        input_file = niout_dir / 'input.txt'
+        model_config = niout_dir / 'model_config.txt'
+        
+        # Write input message (with context if memory enabled)
+        with open(input_file, 'w', encoding='utf-8') as f:
+            f.write(final_message)
+        print(f"Advanced AI: Wrote message to {input_file}")
+        
+        # Write model config using selected model
+        with open(model_config, 'w', encoding='utf-8') as f:
+            f.write(model_name)
+        print(f"Advanced AI: Set model to {model_name}")
+        
+        # Launch the batch file using Simple Chat's method
+        ADVANCEDAI_OT_SendMessage.launch_batch_file(niout_dir.parent)
+        
+        # Start the worker so the next message skips the process spawn
+        if job.use_chat_worker:
+            worker_client.start_worker(niout_dir.parent)
+    
+    # Start auto-monitoring if enabled (Simple Chat's feature)
+    if props.auto_refresh_enabled:
+        # Set up monitoring state
+        current_max, _ = get_highest_response_number(niout_dir)
+        props.last_known_max_number = current_max
+        props.is_monitoring = True
+        props.waiting_for_response = True
+        props.monitoring_status = "👁️ Starting to watch for response..."
+        
+        # Wake the watcher and the monitor timer (it may be in a long idle sleep)
+        response_watcher.start(niout_dir)
+        response_watcher.expect_response()
+        if bpy.app.timers.is_registered(auto_refresh_monitor):
+            bpy.app.timers.unregister(auto_refresh_monitor)
+        bpy.app.timers.register(auto_refresh_monitor, first_interval=0.05)
+        print("Advanced AI: Started monitoring for new responses")
+    else:
+        # Not shown automatically, but the next queued message still waits for this answer
+        props.waiting_for_response = True
+        props.monitoring_status = "⏳ Waiting for response (press Refresh when it is in)..."
+        wait_for_external_answer(job, get_highest_response_number(niout_dir)[0])
+    
+    return True
+
+EXTERNAL_POLL_INTERVAL = 0.5
+
+def wait_for_external_answer(job, known_max):
+    """Release the queue once the worker or batch file wrote the answer (auto-refresh off)"""
+    def check():
+        if request_queue.get_active() is not job:
+            return None  # Stopped, or auto-refresh was switched on and took the answer
+        current_max, _ = get_highest_response_number(get_niout_directory())
+        if current_max <= known_max:
+            return EXTERNAL_POLL_INTERVAL
+        props = bpy.context.window_manager.advanced_ai_props
+        props.waiting_for_response = False
+        props.monitoring_status = f"📄 response_{current_max}.txt is ready - press Refresh to load it"
+        ollama_client.redraw_panels()
+        request_queue.job_finished(job)
+        return None
+    
+    bpy.app.timers.register(check, first_interval=EXTERNAL_POLL_INTERVAL)
+
+def deliver_cached_response(job, text, source="cache"):
+    """Show a cached answer as if it had just been generated"""
+    props = bpy.context.window_manager.advanced_ai_props
+    
+    response_file = save_response_to_archive(text)
+    if response_file:
+        # Keep the file monitor from loading this answer a second time
+        props.last_known_max_number = max(props.last_known_max_number, int(response_file.stem.replace('response_', '')))
+        props.selected_response_file = response_file.name
+    
+    if job.memory_enabled:
+        add_to_conversation_history(job.message, text, job.token_limit, model=job.model)
+    
+    props.response = text
+    props.waiting_for_response = False
+    props.monitoring_status = f"⚡ Answered from {source}"
+    print(f"Advanced AI: Cache hit ({source}) - {response_cache.describe_stats()}")
+    ollama_client.redraw_panels()
+    
+    # Done already - let the next queued message go (unless Stop already did)
+    bpy.app.timers.register(lambda: request_queue.job_finished(job), first_interval=0.0)
 
 class ADVANCEDAI_OT_SendMessage(bpy.types.Operator):
     """Send message to AI using Simple Chat's superior system"""
@@ -25,62 +307,25 @@ class ADVANCEDAI_OT_SendMessage(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            # Auto-detect and configure paths using Simple Chat's method
-            self.auto_configure_paths(props)
-            
-            # Prepare message with memory context if enabled
-            if props.memory_enabled:
-                token_limit = int(props.memory_token_limit)
-                custom_prompt = props.custom_system_prompt if props.custom_system_prompt.strip() else None
-                final_message = prepare_message_with_context(message, token_limit, custom_prompt)
-                print(f"Advanced AI: Memory enabled - using {len(final_message)} characters with context")
-            else:
-                final_message = message
-                print(f"Advanced AI: Memory disabled - using message as-is")
+            # Queue it - it runs now if nothing else is generating
+            job = request_queue.GenerationJob(props, message)
+            position = request_queue.submit(job)
             
-            # Write message and model config using Simple Chat's direct method
-            niout_dir = get_niout_directory()
-            niout_dir.mkdir(exist_ok=True)
-            
-            input_file = niout_dir / 'input.txt'
-            model_config = niout_dir / 'model_config.txt'
-            
-            # Write input message (with context if memory enabled)
-            with open(input_file, 'w', encoding='utf-8') as f:
-                f.write(final_message)
-            print(f"Advanced AI: Wrote message to {input_file}")
-            
-            # Write model config using selected model
-            model_name = props.selected_model if props.selected_model else 'qwen3:8b'
-            with open(model_config, 'w', encoding='utf-8') as f:
-                f.write(model_name)
-            print(f"Advanced AI: Set model to {model_name}")
-            
-            # Update current model display
-            props.current_model_display = model_name
-            
-            # Launch the batch file using Simple Chat's method
-            self.launch_batch_file(niout_dir.parent)
-            
-            # Store the original user message for memory
-            props.last_user_message = message
-            
-            # Clear input and set waiting message
+            # Clear input (cache bypass only applies to this one message)
             props.message = ""
-            props.response = "Processing your request..."
+            props.bypass_cache_once = False
             
-            # Start auto-monitoring if enabled (Simple Chat's feature)
-            if props.auto_refresh_enabled:
-                # Set up monitoring state
-                current_max, _ = get_highest_response_number(niout_dir)
-                props.last_known_max_number = current_max
-                props.is_monitoring = True
-                props.monitoring_status = "👁️ Starting to watch for response..."
-                
-                # Start the monitoring timer
-                bpy.app.timers.register(auto_refresh_monitor, first_interval=3.0)
-                print("Advanced AI: Started monitoring for new responses")
-                
+            if position < 0:
+                self.report({'ERROR'}, "Failed to send message - check console")
+                return {'CANCELLED'}
+            elif position > 0:
+                props.monitoring_status = f"🕒 Queued ({position} waiting) - sends when the current answer is done"
+                self.report({'INFO'}, f"Message queued ({position} waiting)")
+            elif props.monitoring_status.startswith("⚡"):
+                self.report({'INFO'}, "Answered from cache")
+            elif job.in_process:
+                self.report({'INFO'}, "Message sent! Streaming response..." if job.stream else "Message sent! Generating response...")
+            elif props.auto_refresh_enabled:
                 self.report({'INFO'}, "Message sent! Watching for response...")
             else:
                 self.report({'INFO'}, "Message sent! Check console window for AI processing.")
@@ -92,7 +337,8 @@ class ADVANCEDAI_OT_SendMessage(bpy.types.Operator):
         
         return {'FINISHED'}
     
-    def auto_configure_paths(self, props):
+    @staticmethod
+    def auto_configure_paths(props):
         """Auto-configure paths using Simple Chat's robust system"""
         niout_dir = get_niout_directory()
         a_astitnet_path = niout_dir.parent
@@ -113,7 +359,8 @@ class ADVANCEDAI_OT_SendMessage(bpy.types.Operator):
                     props.ollama_script_path = str(script)
                     break
     
-    def launch_batch_file(self, base_path):
+    @staticmethod
+    def launch_batch_file(base_path):
         """Launch batch file using Simple Chat's reliable method"""
         batch_file = base_path / 'chat_with_portable_python.bat'
         
@@ -137,6 +384,62 @@ class ADVANCEDAI_OT_SendMessage(bpy.types.Operator):
         else:
             raise FileNotFoundError(f"Batch file not found: {batch_file}")
 
+class ADVANCEDAI_OT_StopGeneration(bpy.types.Operator):
+    """Stop the running generation"""
+    bl_idname = "advanced_ai.stop_generation"
+    bl_label = "Stop Generating"
+    bl_description = "Abort the answer being generated so Ollama frees up right away, then send the next queued message"
+    bl_options = {'REGISTER'}
+    
+    clear_queue: bpy.props.BoolProperty(
+        name="Clear Queue",
+        description="Also drop messages waiting in the queue",
+        default=False
+    )
+    
+    def execute(self, context):
+        props = context.window_manager.advanced_ai_props
+        
+        dropped = request_queue.clear_pending() if self.clear_queue else 0
+        job = request_queue.get_active()
+        
+        if job is None:
+            if dropped:
+                self.report({'INFO'}, f"Dropped {dropped} queued messages")
+            else:
+                self.report({'WARNING'}, "Nothing is generating")
+            return {'FINISHED'}
+        
+        partial = ""
+        if job.in_process:
+            # Closing the HTTP stream makes Ollama stop generating
+            partial = streaming.get_partial_text().strip()
+            streaming.cancel_stream()
+        elif job.via_worker:
+            # The next message waits until the worker has dropped this job (running or still queued),
+            # so an answer it was already writing can't be taken for the next one's
+            ollama_client.run_async(worker_client.cancel_generation,
+                                    lambda cancelled, error: request_queue.job_finished(job), job.id)
+        else:
+            # The batch process runs on its own - we can only stop waiting for it
+            print("Advanced AI: Stopped waiting for batch response (process keeps running)")
+        
+        props.is_monitoring = False
+        props.waiting_for_response = False
+        props.response = (partial + "\n\n" if partial else "") + "[Stopped]"
+        props.monitoring_status = "⏹️ Generation stopped"
+        
+        if not job.via_worker or job.in_process:
+            request_queue.job_finished(job)
+        
+        waiting = request_queue.pending_count()
+        if waiting and not dropped:
+            self.report({'INFO'}, f"Generation stopped - sending next queued message ({waiting} waiting)")
+        else:
+            self.report({'INFO'}, "Generation stopped")
+        
+        return {'FINISHED'}
+
 class ADVANCEDAI_OT_ClearMessage(bpy.types.Operator):
     """Clear the input message"""
     bl_idname = "advanced_ai.clear_message"
@@ -283,7 +586,8 @@ class ADVANCEDAI_OT_ToggleMonitoring(bpy.types.Operator):
                 props.is_monitoring = True
                 props.monitoring_status = "👁️ Auto-refresh started"
                 
-                bpy.app.timers.register(auto_refresh_monitor, first_interval=1.0)
+                if not bpy.app.timers.is_registered(auto_refresh_monitor):
+                    bpy.app.timers.register(auto_refresh_monitor, first_interval=0.1)
                 self.report({'INFO'}, "Auto-refresh monitoring started")
             else:
                 self.report({'WARNING'}, "Auto-refresh is disabled. Enable it first.")
@@ -362,6 +666,9 @@ class ADVANCEDAI_OT_ClearResponses(bpy.types.Operator):
                         except Exception:
                             pass
             
+            if niout_dir.exists():
+                response_manifest.forget(niout_dir)
+            
             # Optionally clear response.txt as well
             try:
                 out = niout_dir / 'response.txt'
@@ -383,6 +690,25 @@ class ADVANCEDAI_OT_ClearResponses(bpy.types.Operator):
         
         return {'FINISHED'}
 
+class ADVANCEDAI_OT_ClearResponseCache(bpy.types.Operator):
+    """Clear the response cache"""
+    bl_idname = "advanced_ai.clear_response_cache"
+    bl_label = "Clear Response Cache"
+    bl_description = "Delete all cached answers (memory, disk and semantic index)"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        try:
+            removed = response_cache.clear()
+            semantic_cache.clear()
+            self.report({'INFO'}, f"Cleared {removed} cached answers and the semantic index")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to clear cache: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
 class ADVANCEDAI_OT_ClearMemory(bpy.types.Operator):
     """Clear conversation memory/history"""
     bl_idname = "advanced_ai.clear_memory"
@@ -393,7 +719,10 @@ class ADVANCEDAI_OT_ClearMemory(bpy.types.Operator):
     def execute(self, context):
         try:
             # Clear the conversation history
-            save_conversation_history("")
+            summarizer.reset()
+            get_conversation_store().clear()
+            retrieval_memory.clear()
+            chat_request.clear_contexts()
             self.report({'INFO'}, "🧠 Memory cleared successfully")
             
         except Exception as e:
@@ -402,17 +731,194 @@ class ADVANCEDAI_OT_ClearMemory(bpy.types.Operator):
         
         return {'FINISHED'}
 
+class ADVANCEDAI_OT_NewSession(bpy.types.Operator):
+    """Start a new named conversation session"""
+    bl_idname = "advanced_ai.new_session"
+    bl_label = "New Session"
+    bl_description = "Start a new conversation session with its own memory"
+    bl_options = {'REGISTER'}
+    
+    name: bpy.props.StringProperty(name="Name", default="Session")
+    tie_to_blend: bpy.props.BoolProperty(
+        name="Tie to .blend File",
+        description="Switch to this session whenever the current .blend file is opened",
+        default=False
+    )
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        if request_queue.is_busy() or streaming.is_streaming():
+            self.report({'WARNING'}, "Wait for the current answer before switching sessions")
+            return {'CANCELLED'}
+        try:
+            blend = bpy.data.filepath if self.tie_to_blend else ""
+            name = sessions.create_session(self.name, blend=blend)
+            sessions.switch_session(name)
+            self.report({'INFO'}, f"Started session '{name}'")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to create session: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_SwitchSession(bpy.types.Operator):
+    """Switch to another conversation session"""
+    bl_idname = "advanced_ai.switch_session"
+    bl_label = "Switch Session"
+    bl_description = "Continue another conversation session"
+    bl_options = {'REGISTER'}
+    
+    session: bpy.props.EnumProperty(name="Session", items=sessions.enum_items)
+    
+    def execute(self, context):
+        if request_queue.is_busy() or streaming.is_streaming():
+            self.report({'WARNING'}, "Wait for the current answer before switching sessions")
+            return {'CANCELLED'}
+        try:
+            if not sessions.switch_session(self.session):
+                self.report({'WARNING'}, f"Session '{self.session}' not found")
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"Switched to session '{self.session}'")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to switch session: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_DeleteSession(bpy.types.Operator):
+    """Delete the active conversation session"""
+    bl_idname = "advanced_ai.delete_session"
+    bl_label = "Delete Session"
+    bl_description = "Delete the active session and its history (the Default session can only be cleared)"
+    bl_options = {'REGISTER'}
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_confirm(self, event)
+    
+    def execute(self, context):
+        if request_queue.is_busy() or streaming.is_streaming():
+            self.report({'WARNING'}, "Wait for the current answer before deleting the session")
+            return {'CANCELLED'}
+        name = sessions.active_session()
+        try:
+            if not sessions.delete_session(name):
+                self.report({'WARNING'}, f"Session '{name}' can't be deleted - use Clear Memory instead")
+                return {'CANCELLED'}
+            self.report({'INFO'}, f"Deleted session '{name}'")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to delete session: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_ExportHistory(bpy.types.Operator):
+    """Write the conversation to conversation_history.txt"""
+    bl_idname = "advanced_ai.export_history"
+    bl_label = "Export History"
+    bl_description = "Write the whole conversation of this session (including trimmed exchanges) to its conversation_history.txt"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        try:
+            history_file = get_session_directory() / 'conversation_history.txt'
+            with open(history_file, 'w', encoding='utf-8') as f:
+                f.write(get_conversation_store().export_text(include_archived=True))
+            self.report({'INFO'}, f"Exported history to {history_file}")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to export history: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_ImportHistory(bpy.types.Operator):
+    """Replace the conversation with conversation_history.txt"""
+    bl_idname = "advanced_ai.import_history"
+    bl_label = "Import History"
+    bl_description = "Replace this session's conversation memory with the exchanges in its conversation_history.txt"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        try:
+            history_file = get_session_directory() / 'conversation_history.txt'
+            if not history_file.exists():
+                self.report({'WARNING'}, f"{history_file} not found")
+                return {'CANCELLED'}
+            summarizer.reset()
+            with open(history_file, 'r', encoding='utf-8') as f:
+                save_conversation_history(f.read())
+            chat_request.clear_contexts()
+            self.report({'INFO'}, f"Imported {len(get_conversation_store().all_exchanges())} exchanges")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to import history: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_SearchArchive(bpy.types.Operator):
+    """Search the archived conversation history"""
+    bl_idname = "advanced_ai.search_archive"
+    bl_label = "Search Archive"
+    bl_description = "Find exchanges in the compressed archive of this session and optionally bring them back into memory"
+    bl_options = {'REGISTER'}
+    
+    query: bpy.props.StringProperty(name="Search", default="")
+    restore: bpy.props.BoolProperty(
+        name="Restore Matches",
+        description="Add the matching exchanges to the current memory window again",
+        default=False
+    )
+    limit: bpy.props.IntProperty(name="Max Results", default=5, min=1, max=50)
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        props = context.window_manager.advanced_ai_props
+        if not self.query.strip():
+            self.report({'WARNING'}, "Enter something to search for")
+            return {'CANCELLED'}
+        try:
+            store = get_conversation_store()
+            matches = store.search_archive(self.query.strip(), self.limit)
+            if not matches:
+                self.report({'INFO'}, f"Nothing in the archive matches '{self.query}'")
+                return {'FINISHED'}
+            
+            props.response = '\n\n'.join(f"User: {user}\nAssistant: {assistant}" for user, assistant in reversed(matches))
+            if self.restore:
+                store.restore_exchanges(list(reversed(matches)), model=props.selected_model)
+                chat_request.clear_contexts()
+                self.report({'INFO'}, f"Restored {len(matches)} archived exchanges into memory")
+            else:
+                self.report({'INFO'}, f"Found {len(matches)} archived exchanges")
+            
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to search archive: {e}")
+            return {'CANCELLED'}
+        
+        return {'FINISHED'}
+
 class ADVANCEDAI_OT_ReinforcePrompt(bpy.types.Operator):
-    """Reinforce base prompt in memory so AI remembers its role"""
+    """Keep the AI's role in the pinned system slot only"""
     bl_idname = "advanced_ai.reinforce_prompt"
     bl_label = "Reinforce AI Role"
-    bl_description = "Add base prompt reminder to memory so AI remembers it's a Blender assistant"
+    bl_description = "The Blender role is pinned in the system message - this removes old reminder exchanges from the history"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
         try:
-            reinforce_base_prompt_in_memory()
-            self.report({'INFO'}, "Base prompt reinforced - AI will remember its Blender role")
+            removed = reinforce_base_prompt_in_memory()
+            if removed:
+                self.report({'INFO'}, f"Removed {removed} reminder exchanges - the Blender role is pinned in the system message")
+            else:
+                self.report({'INFO'}, "The Blender role is pinned in the system message of every request")
             
         except Exception as e:
             self.report({'ERROR'}, f"Failed to reinforce prompt: {e}")
@@ -424,20 +930,26 @@ class ADVANCEDAI_OT_StartOllama(bpy.types.Operator):
     """Launch Ollama App"""
     bl_idname = "advanced_ai.start_ollama"
     bl_label = "Launch Ollama App"
-    bl_description = "Launch the Ollama App"
+    bl_description = "Start the Ollama server (or use the running one) and report when it answers"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
         props = context.window_manager.advanced_ai_props
         
         try:
-            import subprocess
+            from . import ollama_supervisor
+            
+            # Finds the configured app, PATH or the default install; ready as soon as it answers
+            supervisor = ollama_supervisor.get_supervisor(props.ollama_executable_path.strip())
             
-            # Simple: just run the ollama app.exe
-            subprocess.Popen(["C:\\Users\\0-0\\AppData\\Local\\Programs\\Ollama\\ollama app.exe"])
+            def on_started(props, ready):
+                props.ollama_status = supervisor.describe()
             
-            props.ollama_status = "Ollama App: Launched"
-            self.report({'INFO'}, "Ollama App launched")
+            run_model_action("Ollama: Starting...", supervisor.ensure_running, on_started)
+            if props.supervise_ollama:
+                supervisor.start_watching(auto_start=False)
+            
+            self.report({'INFO'}, "Starting Ollama")
             
         except Exception as e:
             props.ollama_status = "Ollama App: Error"
@@ -459,6 +971,10 @@ class ADVANCEDAI_OT_StopOllama(bpy.types.Operator):
         try:
             import subprocess
             import platform
+            from . import ollama_supervisor
+            
+            # Stopped on purpose - the supervisor must not restart it
+            ollama_supervisor.get_supervisor().stop()
             
             # Stop Ollama processes
             if platform.system() == "Windows":
@@ -493,11 +1009,31 @@ class ADVANCEDAI_OT_StopOllama(bpy.types.Operator):
         
         return {'FINISHED'}
 
+def run_model_action(busy_text, func, on_success, *args):
+    """Run an ollama_client model call in the background - the outcome shows in the Ollama status"""
+    props = bpy.context.window_manager.advanced_ai_props
+    props.ollama_status = busy_text
+    
+    def on_done(result, error):
+        props = bpy.context.window_manager.advanced_ai_props
+        if error:
+            if type(error).__name__ == 'ConnectionError':
+                props.ollama_status = "Ollama: Not reachable - is it running?"
+            else:
+                props.ollama_status = f"Ollama: {error}"
+            print(f"Advanced AI: {busy_text.rstrip('.')} failed: {error}")
+        else:
+            on_success(props, result)
+            print(f"Advanced AI: {props.ollama_status}")
+        ollama_client.redraw_panels()
+    
+    ollama_client.run_async(func, on_done, *args)
+
 class ADVANCEDAI_OT_StartSelectedModel(bpy.types.Operator):
     """Start the selected AI model"""
     bl_idname = "advanced_ai.start_selected_model"
     bl_label = "Start Selected Model"
-    bl_description = "Start the currently selected AI model using Ollama"
+    bl_description = "Load the currently selected AI model into memory"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
@@ -509,25 +1045,15 @@ class ADVANCEDAI_OT_StartSelectedModel(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            import subprocess
-            from pathlib import Path
-            
-            # Get Ollama executable path
-            ollama_path = Path(props.ollama_executable_path)
+            def on_started(props, result):
+                props.ollama_status = f"Model ready: {model_name}"
             
-            if not ollama_path.exists():
-                self.report({'ERROR'}, f"Ollama executable not found: {ollama_path}")
-                return {'CANCELLED'}
-            
-            # Start the model using ollama run
-            print(f"Advanced AI: Starting model {model_name} with Ollama")
-            subprocess.Popen([str(ollama_path), "run", model_name], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL,
-                           creationflags=subprocess.CREATE_NO_WINDOW)
+            # Load through the API - no console process, nothing generated
+            print(f"Advanced AI: Starting model {model_name}")
+            run_model_action(f"Loading: {model_name}...", ollama_client.preload_model, on_started, model_name)
             
             props.current_model_display = model_name
-            self.report({'INFO'}, f"Started model: {model_name}")
+            self.report({'INFO'}, f"Starting model: {model_name}")
             
         except Exception as e:
             self.report({'ERROR'}, f"Failed to start model: {e}")
@@ -536,66 +1062,27 @@ class ADVANCEDAI_OT_StartSelectedModel(bpy.types.Operator):
         return {'FINISHED'}
 
 class ADVANCEDAI_OT_TerminateAllModels(bpy.types.Operator):
-    """Terminate all running AI models"""
+    """Unload all running AI models"""
     bl_idname = "advanced_ai.terminate_all_models"
     bl_label = "Terminate All Models"
-    bl_description = "Stop all running AI models and Ollama processes"
+    bl_description = "Unload all models from memory (the Ollama server keeps running)"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
         props = context.window_manager.advanced_ai_props
         
         try:
-            import subprocess
-            import platform
-            from pathlib import Path
-            
-            # Try multiple methods to stop Ollama and models
-            success_count = 0
+            def on_unloaded(props, names):
+                props.ollama_status = f"Unloaded: {', '.join(names)}" if names else "Ollama: No model was loaded"
             
-            # Method 1: Try using ollama CLI if available
-            try:
-                ollama_path = Path(props.ollama_executable_path)
-                if ollama_path.exists():
-                    # Try running stop command
-                    result = subprocess.run([str(ollama_path), "stop"], 
-                                          capture_output=True, text=True, timeout=10)
-                    if result.returncode == 0:
-                        success_count += 1
-                        print(f"Advanced AI: Ollama stop command succeeded")
-            except Exception as e:
-                print(f"Advanced AI: Ollama stop command failed: {e}")
-            
-            # Method 2: Kill Ollama processes (more aggressive)
-            try:
-                if platform.system() == "Windows":
-                    # Kill both ollama.exe and ollama app.exe processes
-                    subprocess.run(["taskkill", "/F", "/IM", "ollama.exe"], 
-                                 stdout=subprocess.DEVNULL, 
-                                 stderr=subprocess.DEVNULL)
-                    subprocess.run(["taskkill", "/F", "/IM", "ollama app.exe"], 
-                                 stdout=subprocess.DEVNULL, 
-                                 stderr=subprocess.DEVNULL)
-                    success_count += 1
-                    print(f"Advanced AI: Killed Ollama processes")
-                else:
-                    # Kill ollama processes on Linux/Mac
-                    subprocess.run(["pkill", "-f", "ollama"], 
-                                 stdout=subprocess.DEVNULL, 
-                                 stderr=subprocess.DEVNULL)
-                    success_count += 1
-            except Exception as e:
-                print(f"Advanced AI: Process kill failed: {e}")
+            # keep_alive 0 frees each model - no need to kill the server
+            run_model_action("Unloading all models...", ollama_client.unload_all_models, on_unloaded)
             
             # Update addon state
             props.model_is_preloaded = False
             props.preloaded_model_name = ""
-            props.ollama_status = "Ollama: Stopped"
             
-            if success_count > 0:
-                self.report({'INFO'}, "All models and Ollama processes terminated")
-            else:
-                self.report({'WARNING'}, "Could not terminate models - check console")
+            self.report({'INFO'}, "Unloading all models")
             
         except Exception as e:
             self.report({'ERROR'}, f"Error terminating models: {e}")
@@ -639,29 +1126,23 @@ class ADVANCEDAI_OT_SetAndPreloadModel(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            import subprocess
-            from pathlib import Path
-            
-            # Get Ollama executable path
-            ollama_path = Path(props.ollama_executable_path)
+            previous = props.preloaded_model_name if props.model_is_preloaded else ""
+            # Within the RAM budget other models may stay loaded; keep_alive follows usage
+            keep_alive = residency.note_use(model_name, props) if props.manage_residency else None
             
-            if not ollama_path.exists():
-                self.report({'ERROR'}, f"Ollama executable not found: {ollama_path}")
-                return {'CANCELLED'}
+            def preload():
+                # Free the previous model first, then load the new one (no tokens generated)
+                if previous and previous != model_name and keep_alive is None:
+                    print(f"Advanced AI: Stopping previous model: {previous}")
+                    ollama_client.unload_model(previous)
+                return ollama_client.preload_model(model_name, keep_alive)
             
-            # Stop previous model if one is loaded
-            if props.model_is_preloaded and props.preloaded_model_name:
-                print(f"Advanced AI: Stopping previous model: {props.preloaded_model_name}")
-                subprocess.run([str(ollama_path), "stop", props.preloaded_model_name], 
-                             stdout=subprocess.DEVNULL, 
-                             stderr=subprocess.DEVNULL)
+            def on_preloaded(props, result):
+                props.ollama_status = f"Model ready: {model_name}"
+                residency.refresh()
             
-            # Pre-load the new model
             print(f"Advanced AI: Pre-loading model {model_name}")
-            subprocess.Popen([str(ollama_path), "run", model_name], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL,
-                           creationflags=subprocess.CREATE_NO_WINDOW)
+            run_model_action(f"Pre-loading: {model_name}...", preload, on_preloaded)
             
             # Update state
             props.current_model_display = model_name
@@ -680,7 +1161,7 @@ class ADVANCEDAI_OT_LoadNewModel(bpy.types.Operator):
     """Load new model and replace the current one"""
     bl_idname = "advanced_ai.load_new_model"
     bl_label = "Load Model"
-    bl_description = "Load new model and stop the previous one"
+    bl_description = "Load new model and unload the previous one"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
@@ -692,28 +1173,15 @@ class ADVANCEDAI_OT_LoadNewModel(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            import subprocess
-            from pathlib import Path
-            
-            # Get Ollama executable path
-            ollama_path = Path(props.ollama_executable_path)
-            
-            if not ollama_path.exists():
-                self.report({'ERROR'}, f"Ollama executable not found: {ollama_path}")
-                return {'CANCELLED'}
+            def on_loaded(props, unloaded):
+                replaced = f" (unloaded {', '.join(unloaded)})" if unloaded else ""
+                props.ollama_status = f"Model ready: {model_name}{replaced}"
+                residency.refresh()
             
-            # Stop all models first (clean slate)
-            print(f"Advanced AI: Stopping all models before loading new one")
-            subprocess.run([str(ollama_path), "stop"], 
-                         stdout=subprocess.DEVNULL, 
-                         stderr=subprocess.DEVNULL)
-            
-            # Load the new model
+            # One background switch over the API - Blender stays responsive while it loads
             print(f"Advanced AI: Loading new model {model_name}")
-            subprocess.Popen([str(ollama_path), "run", model_name], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL,
-                           creationflags=subprocess.CREATE_NO_WINDOW)
+            keep_alive = residency.note_use(model_name, props) if props.manage_residency else None
+            run_model_action(f"Loading: {model_name}...", ollama_client.switch_model, on_loaded, model_name, keep_alive)
             
             # Update state
             props.current_model_display = model_name
@@ -743,23 +1211,13 @@ class ADVANCEDAI_OT_StartPreloadedModel(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            import subprocess
-            from pathlib import Path
-            
-            # Get Ollama executable path
-            ollama_path = Path(props.ollama_executable_path)
+            model_name = props.preloaded_model_name
             
-            if not ollama_path.exists():
-                self.report({'ERROR'}, f"Ollama executable not found: {ollama_path}")
-                return {'CANCELLED'}
+            def on_started(props, result):
+                props.ollama_status = f"Model ready: {model_name}"
             
-            # Start the pre-loaded model
-            model_name = props.preloaded_model_name
             print(f"Advanced AI: Starting pre-loaded model {model_name}")
-            subprocess.Popen([str(ollama_path), "run", model_name], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL,
-                           creationflags=subprocess.CREATE_NO_WINDOW)
+            run_model_action(f"Loading: {model_name}...", ollama_client.preload_model, on_started, model_name)
             
             props.model_is_preloaded = True
             
@@ -781,48 +1239,66 @@ class ADVANCEDAI_OT_TestModelConnection(bpy.types.Operator):
     def execute(self, context):
         props = context.window_manager.advanced_ai_props
         
-        try:
-            import requests
-            import json
-            
-            # Test connection to Ollama API
-            model_name = props.current_model_display
-            test_prompt = "Hello, please respond with just 'OK' to confirm you're working."
-            
-            payload = {
-                "model": model_name,
-                "prompt": test_prompt,
-                "stream": False
-            }
-            
-            print(f"Advanced AI: Testing model {model_name}...")
-            
-            # Send test request
-            response = requests.post("http://localhost:11434/api/generate", 
-                                   json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
+        # Test connection to Ollama API
+        model_name = props.current_model_display
+        test_prompt = "Hello, please respond with just 'OK' to confirm you're working."
+        preloaded = props.model_is_preloaded
+        
+        def on_tested(result, error):
+            props = bpy.context.window_manager.advanced_ai_props
+            if error:
+                if type(error).__name__ == 'ConnectionError':
+                    props.ollama_status = "Test failed: Cannot connect to Ollama API. Is Ollama running?"
+                else:
+                    props.ollama_status = f"Test failed: {error}"
+            else:
                 ai_response = result.get('response', 'No response')
                 
                 # Show first part of response
                 preview = ai_response[:100] + "..." if len(ai_response) > 100 else ai_response
                 
-                if props.model_is_preloaded:
-                    self.report({'INFO'}, f"Pre-loaded model {model_name} responded: {preview}")
+                if preloaded:
+                    props.ollama_status = f"Pre-loaded model {model_name} responded: {preview}"
                 else:
-                    self.report({'INFO'}, f"Model {model_name} responded: {preview}")
-                
+                    props.ollama_status = f"Model {model_name} responded: {preview}"
+            print(f"Advanced AI: {props.ollama_status}")
+            ollama_client.redraw_panels()
+        
+        print(f"Advanced AI: Testing model {model_name}...")
+        
+        # Send test request in the background so the UI stays responsive
+        ollama_client.run_async(ollama_client.generate, on_tested, model_name, test_prompt)
+        props.ollama_status = f"Testing {model_name}..."
+        self.report({'INFO'}, f"Testing model {model_name} - result will show in the Ollama status")
+        
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_CheckModelStatus(bpy.types.Operator):
+    """Check which models Ollama has loaded"""
+    bl_idname = "advanced_ai.check_model_status"
+    bl_label = "Model Status"
+    bl_description = "Ask Ollama which models are currently loaded in memory"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        props = context.window_manager.advanced_ai_props
+        
+        def on_status(models, error):
+            props = bpy.context.window_manager.advanced_ai_props
+            if error:
+                props.ollama_status = "Ollama: Not reachable"
+                props.model_is_preloaded = False
+            elif models:
+                names = [m.get('name', '?') for m in models]
+                props.ollama_status = f"Ollama: Loaded {', '.join(names)}"
+                props.model_is_preloaded = props.preloaded_model_name in names
             else:
-                self.report({'ERROR'}, f"API Error: HTTP {response.status_code}")
-                return {'CANCELLED'}
-            
-        except requests.exceptions.ConnectionError:
-            self.report({'ERROR'}, "Cannot connect to Ollama API. Is Ollama running?")
-            return {'CANCELLED'}
-        except Exception as e:
-            self.report({'ERROR'}, f"Test failed: {e}")
-            return {'CANCELLED'}
+                props.ollama_status = "Ollama: Running, no model loaded"
+                props.model_is_preloaded = False
+            ollama_client.redraw_panels()
+        
+        ollama_client.run_async(ollama_client.list_running_models, on_status)
+        props.ollama_status = "Ollama: Checking..."
         
         return {'FINISHED'}
 
@@ -830,7 +1306,7 @@ class ADVANCEDAI_OT_StopPreloadedModel(bpy.types.Operator):
     """Stop the pre-loaded model"""
     bl_idname = "advanced_ai.stop_preloaded_model"
     bl_label = "Stop Pre-loaded"
-    bl_description = "Stop the pre-loaded model"
+    bl_description = "Unload the pre-loaded model from memory"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
@@ -841,22 +1317,13 @@ class ADVANCEDAI_OT_StopPreloadedModel(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            import subprocess
-            from pathlib import Path
+            model_name = props.preloaded_model_name
             
-            # Get Ollama executable path
-            ollama_path = Path(props.ollama_executable_path)
+            def on_stopped(props, result):
+                props.ollama_status = f"Unloaded: {model_name}"
             
-            if not ollama_path.exists():
-                self.report({'ERROR'}, f"Ollama executable not found: {ollama_path}")
-                return {'CANCELLED'}
-            
-            # Stop the pre-loaded model
-            model_name = props.preloaded_model_name
             print(f"Advanced AI: Stopping pre-loaded model {model_name}")
-            subprocess.run([str(ollama_path), "stop", model_name], 
-                         stdout=subprocess.DEVNULL, 
-                         stderr=subprocess.DEVNULL)
+            run_model_action(f"Unloading: {model_name}...", ollama_client.unload_model, on_stopped, model_name)
             
             props.model_is_preloaded = False
             
@@ -901,11 +1368,43 @@ class ADVANCEDAI_OT_LaunchMonitor(bpy.types.Operator):
         
         return {'FINISHED'}
 
+_model_items = []  # Blender needs the strings of dynamic enum items kept alive
+
+def model_enum_items(self, context):
+    """Items for the model dropdown - name plus size and quantization, from the cached inventory"""
+    global _model_items
+    inventory = get_model_inventory()
+    _model_items = [
+        (entry["name"], f"{entry['name']}  ({inventory.describe(entry['name'])})",
+         " ".join(part for part in (entry.get("family"), entry.get("parameters")) if part) or "Ollama model")
+        for entry in inventory.models()
+    ] or [("NONE", "No models found", "Check the model directory and press Browse Models")]
+    return _model_items
+
+class ADVANCEDAI_OT_ChooseModel(bpy.types.Operator):
+    """Choose one of the installed models"""
+    bl_idname = "advanced_ai.choose_model"
+    bl_label = "Choose Model"
+    bl_description = "Pick an installed model (size and quantization from its manifest)"
+    bl_options = {'REGISTER'}
+    
+    model: bpy.props.EnumProperty(name="Model", items=model_enum_items)
+    
+    def execute(self, context):
+        if self.model == "NONE":
+            self.report({'WARNING'}, "No models found in the model directory")
+            return {'CANCELLED'}
+        props = context.window_manager.advanced_ai_props
+        props.selected_model = self.model
+        props.current_model_display = self.model
+        self.report({'INFO'}, f"Model set to: {self.model} ({get_model_inventory().describe(self.model)})")
+        return {'FINISHED'}
+
 class ADVANCEDAI_OT_BrowseModelDirectory(bpy.types.Operator):
-    """Browse model directory and list available models"""
+    """Rescan the model directory and list available models"""
     bl_idname = "advanced_ai.browse_model_directory"
     bl_label = "Browse Models"
-    bl_description = "Browse the model directory and show available models"
+    bl_description = "Rescan the model directory in the background and show available models"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
@@ -918,38 +1417,28 @@ class ADVANCEDAI_OT_BrowseModelDirectory(bpy.types.Operator):
         
         try:
             from pathlib import Path
-            model_dir_obj = Path(model_dir)
             
-            if not model_dir_obj.exists():
+            if not Path(model_dir).exists():
                 self.report({'ERROR'}, f"Model directory not found: {model_dir}")
                 return {'CANCELLED'}
             
-            # List available models in directory
-            models_found = []
-            
-            # Search for model directories
-            for item in model_dir_obj.iterdir():
-                if item.is_dir():
-                    # Check if it contains model variants
-                    for variant in item.iterdir():
-                        if variant.is_dir():
-                            # Format as model:variant
-                            model_name = f"{item.name}:{variant.name}"
-                            models_found.append(model_name)
-            
-            if models_found:
+            def on_done(changed, error):
+                models_found = get_model_inventory().names()
+                if error or not models_found:
+                    return
                 # Set first model as selected if none selected
                 if not props.selected_model:
                     props.selected_model = models_found[0]
                     props.current_model_display = models_found[0]
-                
                 models_str = ', '.join(models_found[:5])  # Show first 5
                 if len(models_found) > 5:
                     models_str += f" and {len(models_found) - 5} more"
-                
-                self.report({'INFO'}, f"Found models: {models_str}")
-            else:
-                self.report({'WARNING'}, "No models found in directory")
+                print(f"Advanced AI: Found models: {models_str}")
+            
+            # Only manifests in changed folders are re-read; the dropdown keeps the cached list meanwhile
+            refresh_model_inventory(on_done)
+            cached = len(get_model_inventory().names())
+            self.report({'INFO'}, f"Scanning models... ({cached} known)")
                 
         except Exception as e:
             self.report({'ERROR'}, f"Error browsing models: {e}")
@@ -1026,40 +1515,19 @@ class ADVANCEDAI_OT_CloseAllModels(bpy.types.Operator):
     """Close all running models"""
     bl_idname = "advanced_ai.close_all_models"
     bl_label = "Close All Models"
-    bl_description = "Close all currently running AI models"
+    bl_description = "Unload all AI models from memory (the Ollama server keeps running)"
     bl_options = {'REGISTER'}
     
     def execute(self, context):
         try:
-            import subprocess
-            import platform
+            def on_closed(props, names):
+                props.ollama_status = f"Unloaded: {', '.join(names)}" if names else "Ollama: No model was loaded"
+                props.model_is_preloaded = False
             
-            # Simple approach - just kill all ollama processes
-            if platform.system() == "Windows":
-                # Kill both ollama.exe and ollama app.exe processes
-                try:
-                    subprocess.run(["taskkill", "/F", "/IM", "ollama.exe"], 
-                                 stdout=subprocess.DEVNULL, 
-                                 stderr=subprocess.DEVNULL)
-                    print("Advanced AI: Stopped ollama.exe")
-                except:
-                    pass
-                
-                try:
-                    subprocess.run(["taskkill", "/F", "/IM", "ollama app.exe"], 
-                                 stdout=subprocess.DEVNULL, 
-                                 stderr=subprocess.DEVNULL)
-                    print("Advanced AI: Stopped ollama app.exe")
-                except:
-                    pass
-            else:
-                # Kill ollama processes on Linux/Mac
-                subprocess.run(["pkill", "-f", "ollama"], 
-                             stdout=subprocess.DEVNULL, 
-                             stderr=subprocess.DEVNULL)
-                print("Advanced AI: Stopped ollama processes")
+            # Unload through the API instead of killing the Ollama processes
+            run_model_action("Closing all models...", ollama_client.unload_all_models, on_closed)
             
-            self.report({'INFO'}, "All models closed")
+            self.report({'INFO'}, "Closing all models")
             
         except Exception as e:
             self.report({'ERROR'}, f"Error closing models: {e}")
@@ -1084,7 +1552,6 @@ class ADVANCEDAI_OT_StartCurrentModel(bpy.types.Operator):
             return {'CANCELLED'}
         
         try:
-            import subprocess
             from pathlib import Path
             
             # Extract model name from the file path
@@ -1124,9 +1591,12 @@ class ADVANCEDAI_OT_StartCurrentModel(bpy.types.Operator):
                 self.report({'ERROR'}, "Could not determine model name from file path")
                 return {'CANCELLED'}
             
-            # Start the model using simple subprocess call
+            def on_started(props, result):
+                props.ollama_status = f"Model ready: {model_name}"
+            
+            # Load in the background through the API
             print(f"Advanced AI: Starting model {model_name}")
-            subprocess.Popen(["C:\\Users\\0-0\\AppData\\Local\\Programs\\Ollama\\ollama.exe", "run", model_name])
+            run_model_action(f"Loading: {model_name}...", ollama_client.preload_model, on_started, model_name)
             
             # Update the current model display
             props.current_model_display = model_name
@@ -1140,9 +1610,61 @@ class ADVANCEDAI_OT_StartCurrentModel(bpy.types.Operator):
         
         return {'FINISHED'}
 
+class ADVANCEDAI_OT_StartChatWorker(bpy.types.Operator):
+    """Start the long-lived chat worker"""
+    bl_idname = "advanced_ai.start_chat_worker"
+    bl_label = "Start Chat Worker"
+    bl_description = "Start the background chat worker so messages skip the per-message process start"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        props = context.window_manager.advanced_ai_props
+        base_path = get_niout_directory().parent
+        
+        # The ping can take seconds if the worker is wedged - don't wait for it here
+        def on_checked(running, error):
+            props = bpy.context.window_manager.advanced_ai_props
+            if running:
+                props.chat_worker_status = "Worker: Running"
+                print("Advanced AI: Chat worker is already running")
+            elif worker_client.start_worker(base_path):
+                props.chat_worker_status = "Worker: Starting"
+            else:
+                props.chat_worker_status = "Worker: Not found"
+                print("Advanced AI: Could not start chat worker")
+            ollama_client.redraw_panels()
+        
+        props.chat_worker_status = "Worker: Checking..."
+        ollama_client.run_async(worker_client.is_worker_running, on_checked)
+        self.report({'INFO'}, "Starting chat worker...")
+        return {'FINISHED'}
+
+class ADVANCEDAI_OT_StopChatWorker(bpy.types.Operator):
+    """Stop the long-lived chat worker"""
+    bl_idname = "advanced_ai.stop_chat_worker"
+    bl_label = "Stop Chat Worker"
+    bl_description = "Shut down the background chat worker"
+    bl_options = {'REGISTER'}
+    
+    def execute(self, context):
+        props = context.window_manager.advanced_ai_props
+        
+        def on_stopped(stopped, error):
+            props = bpy.context.window_manager.advanced_ai_props
+            props.chat_worker_status = "Worker: Stopped" if stopped else "Worker: Not running"
+            print(f"Advanced AI: {props.chat_worker_status}")
+            ollama_client.redraw_panels()
+        
+        props.chat_worker_status = "Worker: Stopping..."
+        ollama_client.run_async(worker_client.stop_worker, on_stopped)
+        self.report({'INFO'}, "Stopping chat worker...")
+        return {'FINISHED'}
+
 def register():
+    request_queue.set_runner(start_generation)
     bpy.utils.register_class(ADVANCEDAI_OT_SendMessage)
     bpy.utils.register_class(ADVANCEDAI_OT_ClearMessage)
+    bpy.utils.register_class(ADVANCEDAI_OT_StopGeneration)
     bpy.utils.register_class(ADVANCEDAI_OT_RefreshResponse)
     bpy.utils.register_class(ADVANCEDAI_OT_LoadLatestResponse)
     bpy.utils.register_class(ADVANCEDAI_OT_ToggleMonitoring)
@@ -1150,6 +1672,13 @@ def register():
     bpy.utils.register_class(ADVANCEDAI_OT_SaveSettings)
     bpy.utils.register_class(ADVANCEDAI_OT_ClearResponses)
     bpy.utils.register_class(ADVANCEDAI_OT_ClearMemory)
+    bpy.utils.register_class(ADVANCEDAI_OT_NewSession)
+    bpy.utils.register_class(ADVANCEDAI_OT_SwitchSession)
+    bpy.utils.register_class(ADVANCEDAI_OT_DeleteSession)
+    bpy.utils.register_class(ADVANCEDAI_OT_ExportHistory)
+    bpy.utils.register_class(ADVANCEDAI_OT_ImportHistory)
+    bpy.utils.register_class(ADVANCEDAI_OT_SearchArchive)
+    bpy.utils.register_class(ADVANCEDAI_OT_ClearResponseCache)
     bpy.utils.register_class(ADVANCEDAI_OT_ReinforcePrompt)
     bpy.utils.register_class(ADVANCEDAI_OT_StartOllama)
     bpy.utils.register_class(ADVANCEDAI_OT_StopOllama)
@@ -1160,20 +1689,30 @@ def register():
     bpy.utils.register_class(ADVANCEDAI_OT_LoadNewModel)
     bpy.utils.register_class(ADVANCEDAI_OT_StartPreloadedModel)
     bpy.utils.register_class(ADVANCEDAI_OT_StopPreloadedModel)
+    bpy.utils.register_class(ADVANCEDAI_OT_ChooseModel)
     bpy.utils.register_class(ADVANCEDAI_OT_BrowseModelDirectory)
     bpy.utils.register_class(ADVANCEDAI_OT_BrowseModel)
     bpy.utils.register_class(ADVANCEDAI_OT_TestModelConnection)
+    bpy.utils.register_class(ADVANCEDAI_OT_CheckModelStatus)
     bpy.utils.register_class(ADVANCEDAI_OT_LaunchMonitor)
     bpy.utils.register_class(ADVANCEDAI_OT_CloseAllModels)
     bpy.utils.register_class(ADVANCEDAI_OT_StartCurrentModel)
+    bpy.utils.register_class(ADVANCEDAI_OT_StartChatWorker)
+    bpy.utils.register_class(ADVANCEDAI_OT_StopChatWorker)
 
 def unregister():
+    streaming.cancel_stream()
+    request_queue.reset()
+    bpy.utils.unregister_class(ADVANCEDAI_OT_StopChatWorker)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_StartChatWorker)
     bpy.utils.unregister_class(ADVANCEDAI_OT_StartCurrentModel)
     bpy.utils.unregister_class(ADVANCEDAI_OT_CloseAllModels)
     bpy.utils.unregister_class(ADVANCEDAI_OT_LaunchMonitor)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_CheckModelStatus)
     bpy.utils.unregister_class(ADVANCEDAI_OT_TestModelConnection)
     bpy.utils.unregister_class(ADVANCEDAI_OT_BrowseModel)
     bpy.utils.unregister_class(ADVANCEDAI_OT_BrowseModelDirectory)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_ChooseModel)
     bpy.utils.unregister_class(ADVANCEDAI_OT_StopPreloadedModel)
     bpy.utils.unregister_class(ADVANCEDAI_OT_StartPreloadedModel)
     bpy.utils.unregister_class(ADVANCEDAI_OT_LoadNewModel)
@@ -1184,6 +1723,13 @@ def unregister():
     bpy.utils.unregister_class(ADVANCEDAI_OT_StopOllama)
     bpy.utils.unregister_class(ADVANCEDAI_OT_StartOllama)
     bpy.utils.unregister_class(ADVANCEDAI_OT_ReinforcePrompt)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_ClearResponseCache)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_SearchArchive)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_ImportHistory)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_ExportHistory)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_DeleteSession)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_SwitchSession)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_NewSession)
     bpy.utils.unregister_class(ADVANCEDAI_OT_ClearMemory)
     bpy.utils.unregister_class(ADVANCEDAI_OT_ClearResponses)
     bpy.utils.unregister_class(ADVANCEDAI_OT_SaveSettings)
@@ -1191,5 +1737,6 @@ def unregister():
     bpy.utils.unregister_class(ADVANCEDAI_OT_ToggleMonitoring)
     bpy.utils.unregister_class(ADVANCEDAI_OT_LoadLatestResponse)
     bpy.utils.unregister_class(ADVANCEDAI_OT_RefreshResponse)
+    bpy.utils.unregister_class(ADVANCEDAI_OT_StopGeneration)
     bpy.utils.unregister_class(ADVANCEDAI_OT_ClearMessage)
     bpy.utils.unregister_class(ADVANCEDAI_OT_SendMessage)
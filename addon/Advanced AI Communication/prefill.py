@@ -0,0 +1,205 @@
+"""Type-ahead prefill - warm Ollama's prompt cache while a message is written
+
+The system prompt, summary and history window are the same for the next
+send; only the new message differs. With "Prefill While Typing" on, editing
+the message field (or opening the panel after the history changed) sends
+that static prefix to Ollama in the background, which loads the model and
+evaluates the prefix into its KV cache. Pressing Send then only has to
+evaluate the new message.
+
+The prefill is low priority: it waits DEBOUNCE seconds after the last edit,
+is skipped while anything else is generating, uses the same num_ctx as the
+real request would (a different one makes Ollama reload the model), and is
+cancelled as soon as a message is sent or the Advanced AI sidebar is closed.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from . import ollama_client
+
+DEBOUNCE = 1.5  # Seconds after the last edit before prefilling
+PANEL_CHECK_INTERVAL = 0.5
+PANEL_CATEGORY = "Advanced AI"
+SENTINEL = "\u0000PREFILL\u0000"  # Marks where the new message goes in a flat prompt
+
+_due = 0.0
+_job = None
+_warm_key = None  # Prefix that is already in Ollama's cache
+_stale = True  # The prefix changed since the last prefill
+
+class PrefillJob:
+    """One streamed prefill request that can be dropped mid-way"""
+
+    def __init__(self, endpoint, payload, key):
+        self.endpoint = endpoint
+        self.payload = payload
+        self.key = key
+        self.cancelled = threading.Event()
+        self._response = None
+
+    def run(self):
+        started = time.time()
+        payload = dict(self.payload, stream=True)
+        with ollama_client.post(self.endpoint, payload, stream=True, timeout=(5, 600)) as response:
+            self._response = response
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if self.cancelled.is_set():
+                    return None
+                if line and json.loads(line).get("done"):
+                    break
+        return None if self.cancelled.is_set() else time.time() - started
+
+    def cancel(self):
+        self.cancelled.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+def panel_visible():
+    """True if a 3D view shows the sidebar with the Advanced AI tab"""
+    import bpy
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type != 'VIEW_3D' or not area.spaces.active.show_region_ui:
+                continue
+            for region in area.regions:
+                # active_panel_category exists since Blender 4.2 - assume our tab before that
+                if region.type == 'UI' and getattr(region, "active_panel_category", PANEL_CATEGORY) == PANEL_CATEGORY:
+                    return True
+    return False
+
+def build_prefix_request(props):
+    """(endpoint, payload) holding only the part of the next request that is already known"""
+    from . import chat_request, context_budget, estimate_tokens, prepare_message_with_context
+
+    model = props.selected_model if props.selected_model else 'qwen3:8b'
+    custom_prompt = props.custom_system_prompt if props.custom_system_prompt.strip() else None
+    token_limit = int(props.memory_token_limit)
+    budget = context_budget.plan(model, token_limit, props.output_tokens) if props.auto_num_ctx else None
+    prompt_budget = budget.prompt_budget if budget else token_limit
+    # Retrieved history depends on the question - only the system part is static then
+    history_selector = (lambda budget: []) if props.memory_mode == 'RETRIEVAL' else None
+
+    context = None
+    if props.memory_enabled and props.prompt_format == 'CONTEXT':
+        context = chat_request.get_last_context(model, custom_prompt)
+    if not props.memory_enabled or context:
+        # Nothing static to send (or Ollama gets it with the saved context) - just load the model,
+        # sized for the saved context and the message so Send does not load it again
+        payload = {"model": model}
+        if budget:
+            payload["options"] = {"num_ctx": budget.finish(len(context or []) + estimate_tokens(props.message)).num_ctx}
+        return "/api/generate", payload
+    if props.prompt_format == 'CHAT':
+        messages = chat_request.build_chat_messages("", prompt_budget, custom_prompt, history_selector)[:-1]
+        endpoint, payload = "/api/chat", {"model": model, "messages": messages}
+    else:
+        full_prompt = prepare_message_with_context(SENTINEL, prompt_budget, custom_prompt, history_selector)
+        endpoint, payload = "/api/generate", {"model": model, "prompt": full_prompt.split(SENTINEL)[0]}
+
+    options = {"num_predict": 1}
+    if budget:
+        options["num_ctx"] = budget.finish(chat_request.estimate_payload_tokens(payload)).num_ctx
+    payload["options"] = options
+    return endpoint, payload
+
+def schedule(delay=DEBOUNCE):
+    """(Re)start the debounce timer - called when the message is edited"""
+    global _due
+    import bpy
+    _due = time.monotonic() + delay
+    if not bpy.app.timers.is_registered(_fire):
+        bpy.app.timers.register(_fire, first_interval=delay)
+
+def on_panel_drawn():
+    """Panel is visible - prefill if the prefix changed since the last time"""
+    import bpy
+    if _stale and _job is None and not bpy.app.timers.is_registered(_fire):
+        schedule()
+
+def invalidate():
+    """The prefix changed (new exchange, cleared memory, other session...)"""
+    global _stale
+    _stale = True
+
+def cancel():
+    """Drop a running prefill (a message is being sent)"""
+    global _job
+    job = _job
+    if job is not None:
+        from . import token_counter
+        job.cancel()
+        _job = None
+        token_counter.forget_evaluated(job.payload["model"])  # Part of the prefix may be cached
+        print("Advanced AI: Cancelled prefill")
+
+def reset():
+    """Stop everything (add-on unregistered)"""
+    import bpy
+    cancel()
+    for timer in (_fire, _watch_panel):
+        if bpy.app.timers.is_registered(timer):
+            bpy.app.timers.unregister(timer)
+
+def _fire():
+    """Timer - start the prefill once the edits have settled"""
+    global _job, _stale
+    import bpy
+    from . import request_queue, streaming, summarizer
+
+    remaining = _due - time.monotonic()
+    if remaining > 0:
+        return remaining
+    props = bpy.context.window_manager.advanced_ai_props
+    if not props.prefill_while_typing or _job is not None:
+        return None
+    if request_queue.is_busy() or streaming.is_streaming() or summarizer.is_running():
+        return None  # Something real is running - the next edit tries again
+    if not panel_visible():
+        return None
+
+    try:
+        endpoint, payload = build_prefix_request(props)
+    except Exception as e:
+        print(f"Advanced AI: Could not build prefill: {e}")
+        return None
+    key = hashlib.sha1(json.dumps([endpoint, payload], sort_keys=True).encode('utf-8')).hexdigest()
+    _stale = False
+    if key == _warm_key:
+        return None  # Already in Ollama's cache
+
+    job = PrefillJob(endpoint, payload, key)
+    _job = job
+    ollama_client.run_async(job.run, lambda result, error: _on_prefilled(job, result, error))
+    bpy.app.timers.register(_watch_panel, first_interval=PANEL_CHECK_INTERVAL)
+    return None
+
+def _watch_panel():
+    """Timer - cancel the prefill when the panel is closed"""
+    if _job is None:
+        return None
+    if not panel_visible():
+        cancel()
+        return None
+    return PANEL_CHECK_INTERVAL
+
+def _on_prefilled(job, result, error):
+    global _job, _warm_key
+    from . import token_counter
+    if job is not _job:
+        return  # Cancelled meanwhile
+    _job = None
+    if error:
+        token_counter.forget_evaluated(job.payload["model"])
+        print(f"Advanced AI: Prefill failed: {error}")
+    elif result is not None:
+        _warm_key = job.key
+        token_counter.note_evaluated(job.payload["model"], job.payload)
+        print(f"Advanced AI: Prefilled {job.payload['model']} prompt prefix in {result:.1f}s")
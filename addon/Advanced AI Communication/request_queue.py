@@ -0,0 +1,115 @@
+"""Client-side request queue - one active generation, the rest wait their turn
+
+Pressing Send while a generation is running used to start another batch
+process racing for input.txt, model_config.txt and the next response_N.txt.
+Now the new prompt is queued and only dispatched (history and request built,
+files written) once the active one has finished or been stopped.
+
+Everything here runs on Blender's main thread (operators and timers), so no
+locking is needed.
+"""
+
+import uuid
+from collections import deque
+
+class GenerationJob:
+    """One queued send with the settings it was made with"""
+
+    def __init__(self, props, message):
+        self.id = uuid.uuid4().hex  # Names the job to the chat worker (cancel)
+        self.message = message
+        self.model = props.selected_model if props.selected_model else 'qwen3:8b'
+        self.memory_enabled = props.memory_enabled
+        self.token_limit = int(props.memory_token_limit)
+        self.custom_prompt = props.custom_system_prompt if props.custom_system_prompt.strip() else None
+        self.prompt_format = props.prompt_format
+        self.in_process = props.generation_mode == 'IN_PROCESS' or props.stream_responses
+        self.stream = props.stream_responses
+        self.use_chat_worker = props.use_chat_worker
+        self.via_worker = False  # Set when the chat worker accepted it
+        self.cache_key = self._make_cache_key(props)
+        # Similar-question matches can't tell conversations apart - exact matches only with memory
+        self.semantic = self.cache_key is not None and props.semantic_cache_enabled and not self.memory_enabled
+        self.embedding_model = props.embedding_model.strip() or 'nomic-embed-text'
+        self.semantic_threshold = props.semantic_threshold
+        self.query_vector = None  # Question embedding (semantic lookup or retrieval memory)
+        self.retrieval = self.memory_enabled and props.memory_mode == 'RETRIEVAL'
+        self.retrieval_top_k = props.retrieval_top_k
+        self.size_context = props.auto_num_ctx
+        self.output_tokens = props.output_tokens
+        self.cache_ttl_days = props.cache_ttl_days
+
+    def _make_cache_key(self, props):
+        """Response cache key, or None when this message should skip the cache"""
+        from . import SYSTEM_PROMPT, response_cache
+
+        if not props.response_cache_enabled or props.bypass_cache_once:
+            return None
+        if self.memory_enabled and not props.cache_with_memory:
+            return None
+        # Everything else sent with the request that changes the answer (num_ctx only follows the prompt size)
+        options = {
+            "memory": self.memory_enabled,
+            "prompt_format": self.prompt_format,
+            "num_predict": props.output_tokens if props.auto_num_ctx else None,
+        }
+        return response_cache.make_key(self.message, self.model, self.custom_prompt or SYSTEM_PROMPT, options=options)
+
+_pending = deque()
+_active = None
+_runner = None
+
+def set_runner(runner):
+    """Register the function that dispatches a job (runner(job) -> True if started)"""
+    global _runner
+    _runner = runner
+
+def submit(job):
+    """Start the job now or queue it - returns its position (0 = running)"""
+    if _active is None and not _pending:
+        _start(job)
+        return 0 if _active is job else -1
+    _pending.append(job)
+    print(f"Advanced AI: Queued message ({len(_pending)} waiting)")
+    return len(_pending)
+
+def _start(job):
+    global _active
+    _active = job
+    try:
+        started = _runner(job) if _runner else False
+    except Exception as e:
+        print(f"Advanced AI: Failed to start queued message: {e}")
+        started = False
+    if not started:
+        _active = None
+
+def job_finished(job):
+    """job is done (or stopped) - start the next one (ignored if job is no longer the active one)"""
+    global _active
+    if job is None or job is not _active:
+        return
+    _active = None
+    while _pending and _active is None:
+        _start(_pending.popleft())
+
+def get_active():
+    return _active
+
+def pending_count():
+    return len(_pending)
+
+def is_busy():
+    return _active is not None
+
+def clear_pending():
+    """Drop all waiting messages - returns how many were dropped"""
+    dropped = len(_pending)
+    _pending.clear()
+    return dropped
+
+def reset():
+    """Forget everything (on unregister)"""
+    global _active
+    _active = None
+    _pending.clear()
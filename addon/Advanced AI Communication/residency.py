@@ -0,0 +1,199 @@
+"""Model residency - keep Ollama's loaded models within a RAM budget
+
+Two 8B models resident next to Blender are enough to make a 16-32 GB
+machine swap. With "Manage Model Memory" on, this module:
+
+- tracks which models Ollama has loaded and how much memory each takes
+  (/api/ps, polled every POLL_INTERVAL seconds in the background; the model
+  inventory's manifest size before a model is loaded),
+- evicts the least recently used models before a request would push the
+  total over the RAM budget,
+- sends a keep_alive with every request that follows how the model is used:
+  twice the typical gap between its requests, at least MIN_KEEP_ALIVE and
+  at most the idle limit, so a model in active use stays warm and a
+  one-off stays only briefly,
+- unloads models that have been idle longer than the idle limit (the
+  embedding and summary models count as used whenever they answer, and
+  nothing is unloaded while a summary is being written).
+
+Every call to Ollama runs through ollama_client.run_async, so Blender never
+waits on it.
+"""
+
+import os
+import time
+
+POLL_INTERVAL = 30.0
+MIN_KEEP_ALIVE = 300  # Ollama's own default (seconds)
+MAX_KEEP_ALIVE = 3600  # Without an idle limit
+USAGE_HISTORY = 8  # Request times remembered per model
+GB = 1024 ** 3
+
+_resident = {}  # model -> bytes in memory (last /api/ps)
+_last_used = {}  # model -> time.time() of the last request (or when first seen loaded)
+_use_times = {}  # model -> recent request times
+_evicting = set()
+
+def footprint(model):
+    """Bytes model takes when loaded (measured if resident, else its manifest size)"""
+    from . import get_model_inventory
+    if model in _resident:
+        return _resident[model]
+    try:
+        entry = get_model_inventory().get(model)
+    except Exception:
+        entry = None
+    return entry.get("size", 0) if entry else 0
+
+def resident_bytes():
+    return sum(_resident.values())
+
+def resident_models():
+    """Models loaded at the last /api/ps check"""
+    return set(_resident)
+
+def available_memory():
+    """Free system RAM in bytes (None where it can't be read)"""
+    try:
+        if os.name == 'nt':
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong)] + [
+                    (name, ctypes.c_ulonglong) for name in (
+                        "ullTotalPhys", "ullAvailPhys", "ullTotalPageFile", "ullAvailPageFile",
+                        "ullTotalVirtual", "ullAvailVirtual", "ullAvailExtendedVirtual")]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(status)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullAvailPhys
+            return None
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return None
+
+def keep_alive_for(model, props):
+    """Seconds Ollama should keep model loaded after this request"""
+    idle_limit = props.idle_unload_minutes * 60 or MAX_KEEP_ALIVE
+    times = _use_times.get(model, [])
+    if len(times) < 2:
+        return min(MIN_KEEP_ALIVE, idle_limit)
+    gaps = sorted(b - a for a, b in zip(times, times[1:]))
+    typical = gaps[len(gaps) // 2]
+    return int(min(max(MIN_KEEP_ALIVE, 2 * typical), idle_limit))
+
+def note_use(model, props):
+    """A request for model is about to be sent - make room for it and return its keep_alive"""
+    now = time.time()
+    _last_used[model] = now
+    times = _use_times.setdefault(model, [])
+    times.append(now)
+    del times[:-USAGE_HISTORY]
+    make_room(model, props)
+    return keep_alive_for(model, props)
+
+def touch(model):
+    """model answered a request outside the chat (embedding, summary) - it is not idle"""
+    _last_used[model] = time.time()
+
+def make_room(model, props):
+    """Unload least recently used models until model fits the RAM budget - returns their names"""
+    budget = props.ram_budget_gb * GB
+    if budget <= 0:
+        return []
+    total = resident_bytes() + (0 if model in _resident else footprint(model))
+    evicted = []
+    for name in sorted(_resident, key=lambda name: _last_used.get(name, 0)):
+        if total <= budget:
+            break
+        if name == model or name in _evicting:
+            continue
+        total -= _resident[name]
+        evicted.append(name)
+        _unload(name, "over the RAM budget")
+    return evicted
+
+def _unload(model, reason):
+    from . import ollama_client
+
+    def on_done(result, error):
+        _evicting.discard(model)
+        if error:
+            print(f"Advanced AI: Could not unload {model}: {error}")
+            return
+        _resident.pop(model, None)
+        print(f"Advanced AI: Unloaded {model} ({reason})")
+        ollama_client.redraw_panels()
+
+    _evicting.add(model)
+    ollama_client.run_async(ollama_client.unload_model, on_done, model)
+
+def _on_running(models, error):
+    """/api/ps answered - update what is resident and enforce the limits"""
+    import bpy
+    from . import ollama_client
+
+    if error:
+        _resident.clear()  # Server not reachable - nothing is loaded
+        return
+    now = time.time()
+    _resident.clear()
+    for model in models:
+        name = model.get("name", "")
+        _resident[name] = model.get("size", 0)
+        _last_used.setdefault(name, now)  # Loaded by someone else - idle from now on
+
+    props = bpy.context.window_manager.advanced_ai_props
+    if not props.manage_residency:
+        return
+    from . import request_queue, streaming, summarizer
+    busy = request_queue.is_busy() or streaming.is_streaming() or summarizer.is_running()
+    if props.idle_unload_minutes > 0 and not busy:
+        for name in list(_resident):
+            if name not in _evicting and now - _last_used.get(name, now) > props.idle_unload_minutes * 60:
+                _unload(name, f"idle for {props.idle_unload_minutes} min")
+    ollama_client.redraw_panels()
+
+def refresh():
+    """Ask Ollama which models are loaded (background)"""
+    from . import ollama_client
+    ollama_client.run_async(ollama_client.list_running_models, _on_running)
+
+def _poll():
+    """Timer - keep the residency picture current while managing is on"""
+    import bpy
+    try:
+        if not bpy.context.window_manager.advanced_ai_props.manage_residency:
+            return None
+        refresh()
+    except Exception as e:
+        print(f"Advanced AI: Residency check failed: {e}")
+    return POLL_INTERVAL
+
+def start():
+    """Start polling (add-on registered or managing switched on)"""
+    import bpy
+    if not bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.register(_poll, first_interval=2.0)
+
+def stop():
+    import bpy
+    if bpy.app.timers.is_registered(_poll):
+        bpy.app.timers.unregister(_poll)
+
+def describe(props):
+    """One line for the panel: what is loaded against the budget"""
+    if not _resident:
+        return "Resident: none"
+    now = time.time()
+    models = ", ".join(
+        f"{name} {size / GB:.1f} GB ({int((now - _last_used.get(name, now)) // 60)} min idle)"
+        for name, size in sorted(_resident.items())
+    )
+    budget = f" of {props.ram_budget_gb:.0f} GB" if props.ram_budget_gb > 0 else ""
+    return f"Resident {resident_bytes() / GB:.1f} GB{budget}: {models}"
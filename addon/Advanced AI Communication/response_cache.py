@@ -0,0 +1,158 @@
+"""Exact-match response cache in front of the send path
+
+Keyed by a hash of the normalized question, model, system prompt and
+generation options. A bounded in-memory LRU sits in front of a persistent
+on-disk tier (one small JSON file per answer in a_astitnet/cache/responses),
+both limited by age and entry count.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+
+MEMORY_MAX_ENTRIES = 256
+DISK_MAX_ENTRIES = 2000
+DEFAULT_TTL_DAYS = 7
+
+_memory = OrderedDict()  # key -> (created, response)
+stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+def normalize_prompt(text):
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.rstrip(' ?!.')
+
+def make_key(message, model, system_prompt, options=None):
+    """Hash of everything that changes the answer"""
+    material = json.dumps({
+        "prompt": normalize_prompt(message),
+        "model": model,
+        "system": system_prompt or "",
+        "options": options or {},
+    }, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+def scope_key(key, scope):
+    """key narrowed to one context, e.g. the conversation memory a question was asked with"""
+    return hashlib.sha256(f"{key}:{scope}".encode('utf-8')).hexdigest()
+
+def get_cache_directory():
+    """Get (and create) the on-disk cache directory under a_astitnet"""
+    from . import get_niout_directory
+    cache_dir = get_niout_directory().parent / 'cache' / 'responses'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+def _remember(key, created, response):
+    _memory[key] = (created, response)
+    _memory.move_to_end(key)
+    while len(_memory) > MEMORY_MAX_ENTRIES:
+        _memory.popitem(last=False)
+
+def get(key, ttl_days=DEFAULT_TTL_DAYS):
+    """Return the cached response for key, or None"""
+    max_age = ttl_days * 86400
+    now = time.time()
+
+    entry = _memory.get(key)
+    if entry is not None:
+        created, response = entry
+        if now - created <= max_age:
+            _memory.move_to_end(key)
+            stats["hits"] += 1
+            return response
+        del _memory[key]
+
+    try:
+        cache_file = get_cache_directory() / f'{key}.json'
+        if cache_file.exists():
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if now - data.get("created", 0) <= max_age:
+                _remember(key, data["created"], data["response"])
+                stats["hits"] += 1
+                stats["disk_hits"] += 1
+                return data["response"]
+            cache_file.unlink()
+    except Exception as e:
+        print(f"Advanced AI: Cache read error: {e}")
+
+    stats["misses"] += 1
+    return None
+
+def put(key, message, model, response, ttl_days=DEFAULT_TTL_DAYS):
+    """Store a finished answer in both tiers"""
+    if not key or not response.strip() or response.startswith("Error:"):
+        return
+    created = time.time()
+    _remember(key, created, response)
+    stats["stores"] += 1
+
+    try:
+        cache_dir = get_cache_directory()
+        tmp_file = cache_dir / f'.{key}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({"created": created, "model": model, "prompt": message, "response": response}, f)
+        os.replace(tmp_file, cache_dir / f'{key}.json')
+
+        # Check the disk limit every so often rather than on every store
+        if stats["stores"] % 50 == 1:
+            prune_disk(ttl_days=ttl_days)
+    except Exception as e:
+        print(f"Advanced AI: Cache write error: {e}")
+
+def remember_answer(job, text):
+    """Store a finished answer for the job in the exact and semantic caches"""
+    if not job.cache_key:
+        return
+    put(job.cache_key, job.message, job.model, text, job.cache_ttl_days)
+
+    if job.semantic:
+        from . import ollama_client, semantic_cache
+        ollama_client.run_async(semantic_cache.add, None, job.message, text, job.model,
+                                job.embedding_model, vector=job.query_vector)
+
+def prune_disk(max_entries=DISK_MAX_ENTRIES, ttl_days=DEFAULT_TTL_DAYS):
+    """Drop expired entries, then the oldest ones above the size limit"""
+    cache_dir = get_cache_directory()
+    cutoff = time.time() - ttl_days * 86400
+    entries = []
+    for cache_file in cache_dir.glob('*.json'):
+        try:
+            mtime = cache_file.stat().st_mtime
+            if mtime < cutoff:
+                cache_file.unlink()
+            else:
+                entries.append((mtime, cache_file))
+        except OSError:
+            continue
+
+    entries.sort()
+    for _, cache_file in entries[:max(0, len(entries) - max_entries)]:
+        try:
+            cache_file.unlink()
+        except OSError:
+            pass
+
+def clear():
+    """Empty both tiers and reset the counters"""
+    _memory.clear()
+    for key in stats:
+        stats[key] = 0
+    removed = 0
+    for cache_file in get_cache_directory().glob('*.json'):
+        try:
+            cache_file.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def describe_stats():
+    """One-line summary for the panel"""
+    lookups = stats["hits"] + stats["misses"]
+    rate = (stats["hits"] / lookups * 100) if lookups else 0
+    return f"Cache: {stats['hits']} hits / {stats['misses']} misses ({rate:.0f}%), {len(_memory)} in memory"
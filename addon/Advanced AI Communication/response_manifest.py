@@ -0,0 +1,132 @@
+"""Sequence-indexed manifest of the niout response archive
+
+Finding the newest response used to mean globbing every response_*.txt and
+parsing each name, which gets slower as the archive grows. Writers now also
+update niout/response_manifest.json (written atomically):
+
+    {"version": 1, "last_seq": 42, "updated": 1700000000.0,
+     "entries": [{"seq": 42, "file": "response_42.txt", "bytes": 812,
+                  "complete": true, "started": ..., "finished": ...}, ...]}
+
+Only the most recent entries are kept, so reading it costs the same however
+many responses are archived. Readers re-read it only when its mtime changes,
+and probe response_{last_seq + 1}.txt so answers from writers that don't
+update the manifest (the batch script) are still noticed. chat_worker.py
+writes the same format through the copy of this module next to it in
+a_astitnet - keep the two in sync.
+"""
+
+import json
+import os
+import time
+
+MANIFEST_NAME = 'response_manifest.json'
+KEEP_ENTRIES = 50
+
+# Last manifest read per directory: path -> (mtime_ns, size, data)
+_read_cache = {}
+
+def _scan_highest(niout_dir):
+    """Highest response_N.txt number by globbing (only when there is no manifest yet)"""
+    max_num = 0
+    for file in niout_dir.glob('response_*.txt'):
+        try:
+            max_num = max(max_num, int(file.stem.replace('response_', '')))
+        except ValueError:
+            continue
+    return max_num
+
+def read_manifest(niout_dir):
+    """Load the manifest, creating it from one directory scan if it is missing"""
+    manifest_file = niout_dir / MANIFEST_NAME
+    try:
+        st = manifest_file.stat()
+    except OSError:
+        if not niout_dir.exists():
+            return {"version": 1, "last_seq": 0, "entries": []}
+        data = {"version": 1, "last_seq": _scan_highest(niout_dir), "updated": time.time(), "entries": []}
+        write_manifest(niout_dir, data)
+        return data
+
+    key = str(manifest_file)
+    cached = _read_cache.get(key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        # Unreadable manifest - rebuild it from the directory
+        data = {"version": 1, "last_seq": _scan_highest(niout_dir), "updated": time.time(), "entries": []}
+        write_manifest(niout_dir, data)
+        return data
+
+    _read_cache[key] = (st.st_mtime_ns, st.st_size, data)
+    return data
+
+def write_manifest(niout_dir, data):
+    """Atomically replace the manifest"""
+    manifest_file = niout_dir / MANIFEST_NAME
+    tmp_file = niout_dir / f'.{MANIFEST_NAME}.{os.getpid()}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_file, manifest_file)
+    _read_cache.pop(str(manifest_file), None)
+
+def latest_sequence(niout_dir):
+    """Highest response number - one manifest read plus a stat of the next file"""
+    seq = read_manifest(niout_dir).get("last_seq", 0)
+    # Catch up with writers that don't record themselves in the manifest
+    while (niout_dir / f'response_{seq + 1}.txt').exists():
+        seq += 1
+    return seq
+
+def latest_response(niout_dir):
+    """Return (highest number, Path of that response file or None)"""
+    seq = latest_sequence(niout_dir)
+    if seq <= 0:
+        return 0, None
+    return seq, niout_dir / f'response_{seq}.txt'
+
+def record_response(niout_dir, seq, file_name, byte_length, complete=True, started=None):
+    """Add (or update) one response in the manifest and move last_seq forward"""
+    data = dict(read_manifest(niout_dir))
+    now = time.time()
+    entries = [entry for entry in data.get("entries", []) if entry.get("seq") != seq]
+    entries.append({
+        "seq": seq,
+        "file": file_name,
+        "bytes": byte_length,
+        "complete": complete,
+        "started": started if started is not None else now,
+        "finished": now if complete else None,
+    })
+    entries.sort(key=lambda entry: entry["seq"])
+    data["entries"] = entries[-KEEP_ENTRIES:]
+    data["last_seq"] = max(data.get("last_seq", 0), seq)
+    data["updated"] = now
+    data["version"] = 1
+    write_manifest(niout_dir, data)
+
+def write_response(niout_dir, text, started=None):
+    """Write text to the next response_N.txt, response.txt and the manifest - returns the Path"""
+    niout_dir.mkdir(exist_ok=True)
+    seq = latest_sequence(niout_dir) + 1
+    response_file = niout_dir / f'response_{seq}.txt'
+
+    # Write to a temp name first so monitors never read a half-written file
+    tmp_file = niout_dir / f'.{response_file.stem}.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, response_file)
+
+    with open(niout_dir / 'response.txt', 'w', encoding='utf-8') as f:
+        f.write(text)
+
+    record_response(niout_dir, seq, response_file.name, len(text.encode('utf-8')), started=started)
+    return response_file
+
+def forget(niout_dir):
+    """Reset the manifest after the archive was cleared"""
+    write_manifest(niout_dir, {"version": 1, "last_seq": 0, "updated": time.time(), "entries": []})
@@ -0,0 +1,203 @@
+"""Background watcher that notices new responses in the niout folder
+
+A background thread waits for file changes in niout and flags the main
+thread when the response manifest moves forward. On Linux it blocks on
+inotify (via ctypes), so it does not wake up at all until a file is written.
+Everywhere else it polls the manifest, backing off exponentially while idle
+and tightening as soon as a request is sent.
+
+The main thread only runs auto_refresh_monitor, which asks next_interval()
+how long to sleep: short while an answer is expected, backing off to a few
+seconds when nothing is going on.
+"""
+
+import os
+import select
+import threading
+
+from . import response_manifest
+
+# Background poller (fallback when there are no file notifications)
+POLL_MIN_INTERVAL = 0.05
+POLL_MAX_BUSY_INTERVAL = 0.5
+POLL_MAX_IDLE_INTERVAL = 10.0
+POLL_BACKOFF = 1.5
+
+# Main-thread timer
+DELIVER_BUSY_INTERVAL = 0.05
+DELIVER_MIN_IDLE_INTERVAL = 0.25
+DELIVER_MAX_IDLE_INTERVAL = 5.0
+
+# inotify flags (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_watcher = None
+_idle_interval = DELIVER_MIN_IDLE_INTERVAL
+
+class ResponseWatcher:
+    """Watches one niout directory on a daemon thread"""
+
+    def __init__(self, niout_dir):
+        self.niout_dir = niout_dir
+        self.last_seq = response_manifest.latest_sequence(niout_dir)
+        self.changed = threading.Event()  # Set when a newer response appeared
+        self.changed.set()  # Look once right away in case it landed before we started
+        self.stopping = threading.Event()
+        self.wake = threading.Event()  # Interrupts the poller's sleep
+        self.busy = False
+        self.backend = "polling"
+        self._stop_pipe = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        import sys
+        if sys.platform.startswith('linux'):
+            self._stop_pipe = os.pipe()  # Before the thread runs, so stop() can always wake it
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+        if self._stop_pipe is not None:
+            try:
+                os.write(self._stop_pipe[1], b'x')
+            except OSError:
+                pass
+
+    def expect_response(self):
+        """A request was sent - poll fast until it is answered"""
+        self.busy = True
+        self.wake.set()
+
+    def _check(self):
+        seq = response_manifest.latest_sequence(self.niout_dir)
+        if seq != self.last_seq:
+            self.last_seq = seq
+            self.changed.set()
+            return True
+        return False
+
+    def _run(self):
+        fd = None
+        try:
+            try:
+                fd = self._open_inotify()
+            except Exception as e:
+                print(f"Advanced AI: File notifications unavailable ({e}), polling instead")
+
+            if fd is not None:
+                self.backend = "inotify"
+                self._watch_inotify(fd)
+            else:
+                self._watch_polling()
+        except Exception as e:
+            print(f"Advanced AI Watcher Error: {e}")
+        finally:
+            if fd is not None:
+                os.close(fd)
+            pipe, self._stop_pipe = self._stop_pipe, None
+            for pipe_fd in pipe or ():
+                os.close(pipe_fd)
+
+    # --- inotify (Linux) ---
+    def _open_inotify(self):
+        import sys
+        if not sys.platform.startswith('linux') or self._stop_pipe is None:
+            raise OSError("not Linux")
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(str(self.niout_dir)), mask) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        return fd
+
+    def _watch_inotify(self, fd):
+        stop_fd = self._stop_pipe[0]
+        while not self.stopping.is_set():
+            # Sleeps until a file in niout changes (or stop() is called)
+            readable, _, _ = select.select([fd, stop_fd], [], [])
+            if fd in readable:
+                try:
+                    while os.read(fd, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+                self._check()
+
+    # --- Fallback poller ---
+    def _watch_polling(self):
+        interval = POLL_MIN_INTERVAL
+        while not self.stopping.is_set():
+            self.wake.wait(interval)
+            if self.wake.is_set():
+                self.wake.clear()
+                interval = POLL_MIN_INTERVAL
+                continue
+            if self._check():
+                interval = POLL_MIN_INTERVAL
+            else:
+                limit = POLL_MAX_BUSY_INTERVAL if self.busy else POLL_MAX_IDLE_INTERVAL
+                interval = min(interval * POLL_BACKOFF, limit)
+
+def start(niout_dir):
+    """Start watching niout_dir (restarts if the directory changed)"""
+    global _watcher
+    if _watcher is not None:
+        if _watcher.niout_dir == niout_dir and _watcher.thread.is_alive():
+            return _watcher
+        _watcher.stop()
+    _watcher = ResponseWatcher(niout_dir).start()
+    print(f"Advanced AI: Watching {niout_dir} for responses")
+    return _watcher
+
+def stop():
+    """Stop the background watcher"""
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
+
+def is_running():
+    return _watcher is not None and _watcher.thread.is_alive()
+
+def backend():
+    return _watcher.backend if _watcher is not None else "stopped"
+
+def expect_response():
+    """Tighten polling for a request that was just sent"""
+    global _idle_interval
+    _idle_interval = DELIVER_MIN_IDLE_INTERVAL
+    if _watcher is not None:
+        _watcher.expect_response()
+
+def take_change():
+    """True (once) if a newer response appeared since the last call"""
+    if _watcher is None:
+        return True  # Not watching - let the caller check directly
+    if _watcher.changed.is_set():
+        _watcher.changed.clear()
+        return True
+    return False
+
+def next_interval(waiting):
+    """Seconds until the main-thread timer should look again"""
+    global _idle_interval
+    if _watcher is not None:
+        _watcher.busy = waiting
+    if waiting:
+        _idle_interval = DELIVER_MIN_IDLE_INTERVAL
+        return DELIVER_BUSY_INTERVAL
+    interval = _idle_interval
+    _idle_interval = min(_idle_interval * 2, DELIVER_MAX_IDLE_INTERVAL)
+    return interval
@@ -0,0 +1,233 @@
+"""Retrieval memory - send the most relevant past exchanges, not just the newest
+
+Every stored exchange (including ones trimmed out of the recency window) is
+embedded once, in the background, into an append-only VectorIndex in the
+session's "retrieval" folder. At send time the question's embedding picks exchanges by
+similarity: recency breaks ties, MMR re-ranking keeps near-duplicates out,
+everything must fit the token budget, and the result is sent in
+chronological order. The newest exchange is always kept so follow-up
+questions still make sense.
+
+Sending never decompresses the conversation archive: candidates are the
+exchanges in the hot file plus archived ones the index already holds (their
+text is in the index entries). Which index entries are archived is worked out
+on the background thread that embeds new exchanges.
+"""
+
+import threading
+
+from . import semantic_cache
+
+DEFAULT_TOP_K = 8
+MMR_LAMBDA = 0.7  # Relevance vs. diversity in the re-ranking
+RECENCY_WEIGHT = 0.02  # Small bonus so newer exchanges win ties
+EMBED_MAX_CHARS = 2000  # Text of one exchange sent to the embedding model
+ALWAYS_KEEP_RECENT = 1
+
+_lock = threading.Lock()
+_index = None
+_indexing = False
+_archive_scan = {"directory": None, "count": 0, "hashes": set()}  # Archived exchanges seen so far
+
+def _get_index(embedding_model):
+    """Exchange index of the active session for this embedding model (call with _lock held)"""
+    global _index
+    from . import get_session_directory
+    index_dir = get_session_directory() / 'retrieval'
+    if _index is None or _index.embedding_model != embedding_model or _index.index_dir != index_dir:
+        index_dir.mkdir(exist_ok=True)
+        if _index is not None:
+            _index.close()
+        _index = semantic_cache.VectorIndex(index_dir, embedding_model)
+    return _index
+
+def exchange_text(user, assistant):
+    return f"User: {user}\nAssistant: {assistant}"[:EMBED_MAX_CHARS]
+
+def _index_exchange(user, assistant, embedding_model):
+    """Embed one exchange unless it is indexed already - True if it was added"""
+    with _lock:
+        index = _get_index(embedding_model)
+        if index.exchange_hash(user, assistant) in index.known:
+            return False
+    vector = semantic_cache.embed(exchange_text(user, assistant), embedding_model)
+    with _lock:
+        return _get_index(embedding_model).append(vector, user, assistant, "", source="memory")
+
+def _scan_archive(archive_dir, embedding_model):
+    """Note (and embed) archived exchanges added since the last scan - background thread
+
+    Reads the archive through its own ConversationArchive, so the store used
+    on the main thread is never touched from here.
+    """
+    from .conversation_store import ConversationArchive
+
+    archive = ConversationArchive(archive_dir)
+    with _lock:
+        if _archive_scan["directory"] != archive_dir or _archive_scan["count"] > len(archive):
+            # Another session, or the archive was cleared and started again
+            _archive_scan.update(directory=archive_dir, count=0, hashes=set())
+        first = _archive_scan["count"]
+    added = 0
+    try:
+        for user, assistant in archive.iter_exchanges(first):
+            if _index_exchange(user["text"], assistant["text"], embedding_model):
+                added += 1
+            with _lock:
+                if _archive_scan["directory"] != archive_dir:
+                    break  # Session switched or memory cleared meanwhile
+                _archive_scan["hashes"].add(semantic_cache.VectorIndex.exchange_hash(user["text"], assistant["text"]))
+                _archive_scan["count"] += 1
+    finally:
+        archive.close()
+    return added
+
+def index_exchanges(exchanges, embedding_model, archive_dir=None):
+    """Embed any (user, assistant) pairs (and archived exchanges) not indexed yet - runs on a background thread"""
+    global _indexing
+    added = 0
+    try:
+        for user, assistant in exchanges:
+            if _index_exchange(user, assistant, embedding_model):
+                added += 1
+        if archive_dir is not None and archive_dir.exists():
+            added += _scan_archive(archive_dir, embedding_model)
+    finally:
+        _indexing = False
+    if added:
+        print(f"Advanced AI: Embedded {added} exchanges for retrieval memory")
+    return added
+
+def schedule_indexing(embedding_model):
+    """Embed new exchanges in the background (main thread - only the hot file is read here)"""
+    global _indexing
+    from . import ollama_client, get_conversation_store
+
+    if _indexing:
+        return
+    _indexing = True
+    store = get_conversation_store()
+    exchanges = [(exchange.user, exchange.assistant) for exchange in store.hot_exchange_records()]
+    ollama_client.run_async(index_exchanges, None, exchanges, embedding_model, store.archive.directory)
+
+def select_exchanges(query_vector, candidates, budget, embedding_model, top_k=DEFAULT_TOP_K):
+    """Pick exchanges for the prompt
+
+    candidates are conversation_store.Exchange objects, oldest first. Returns
+    the chosen ones in chronological order, within budget tokens.
+    """
+    import numpy as np
+
+    if not candidates or budget <= 0:
+        return []
+
+    # Look up each candidate's vector (exchanges not embedded yet score 0)
+    with _lock:
+        index = _get_index(embedding_model)
+        rows = {entry["hash"]: row for row, entry in enumerate(index.entries[:len(index)])}
+        dim = index.dim
+        vectors = index.vectors
+    count = len(candidates)
+    matrix = np.zeros((count, dim or len(query_vector)), dtype=np.float32)
+    if vectors is not None and dim == len(query_vector):
+        for i, exchange in enumerate(candidates):
+            row = rows.get(index.exchange_hash(exchange.user, exchange.assistant))
+            if row is not None:
+                matrix[i] = vectors[row]
+
+    relevance = matrix @ query_vector if dim == len(query_vector) else np.zeros(count, dtype=np.float32)
+    relevance = relevance + RECENCY_WEIGHT * (np.arange(count) / max(count - 1, 1))
+
+    chosen = []
+    used = 0
+
+    # Pinned exchanges (the base prompt) always go in, as in the recency window
+    for i, exchange in enumerate(candidates):
+        if exchange.pinned and used + exchange.tokens <= budget:
+            chosen.append(i)
+            used += exchange.tokens
+
+    # Keep the newest exchange(s) for continuity
+    for i in range(count - 1, max(count - 1 - ALWAYS_KEEP_RECENT, -1), -1):
+        if i not in chosen and used + candidates[i].tokens <= budget:
+            chosen.append(i)
+            used += candidates[i].tokens
+
+    # Maximal marginal relevance: relevant, but not more of the same. redundancy
+    # is each candidate's highest similarity to anything chosen, updated with one
+    # product per pick; candidates that no longer fit the budget drop out.
+    tokens = np.array([exchange.tokens for exchange in candidates])
+    available = np.ones(count, dtype=bool)
+    available[chosen] = False
+    if chosen:
+        redundancy = (matrix @ matrix[chosen].T).max(axis=1)
+    else:
+        redundancy = np.zeros(count, dtype=np.float32)
+    for _ in range(top_k):
+        available &= tokens <= budget - used
+        if not available.any():
+            break  # Nothing else fits
+        scores = MMR_LAMBDA * relevance - (1 - MMR_LAMBDA) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        available[best] = False
+        similarity = matrix @ matrix[best]
+        redundancy = np.maximum(redundancy, similarity) if chosen else similarity
+        chosen.append(best)
+        used += candidates[best].tokens
+
+    return [candidates[i] for i in sorted(chosen)]
+
+def archived_candidates(hot, embedding_model):
+    """Archived exchanges known to the index as Exchange objects, oldest first (no decompressing)"""
+    from .conversation_store import Exchange, count_tokens
+
+    hot_hashes = {semantic_cache.VectorIndex.exchange_hash(exchange.user, exchange.assistant) for exchange in hot}
+    with _lock:
+        archived = _archive_scan["hashes"]
+        if not archived:
+            return []
+        index = _get_index(embedding_model)
+        entries = [entry for entry in index.entries[:len(index)]
+                   if entry["hash"] in archived and entry["hash"] not in hot_hashes]
+    return [Exchange(-1, -1, entry["question"], entry["answer"],
+                     count_tokens(entry["question"]) + count_tokens(entry["answer"]), False)
+            for entry in entries]
+
+def retrieve(query_vector, budget, embedding_model, top_k=DEFAULT_TOP_K):
+    """(user, assistant) pairs from the conversation store for this question"""
+    from . import get_conversation_store
+
+    store = get_conversation_store()
+    hot = store.hot_exchange_records()
+    candidates = archived_candidates(hot, embedding_model) + hot
+    chosen = select_exchanges(query_vector, candidates, budget, embedding_model, top_k)
+    return [(exchange.user, exchange.assistant) for exchange in chosen]
+
+def forget_session(session_dir):
+    """Close the index of session_dir (session deleted - Windows can't delete a mapped file)"""
+    global _index
+    from .conversation_store import ARCHIVE_NAME
+    with _lock:
+        if _index is not None and _index.index_dir == session_dir / 'retrieval':
+            _index.close()
+            _index = None
+        if _archive_scan["directory"] == session_dir / ARCHIVE_NAME:
+            _archive_scan.update(directory=None, count=0, hashes=set())
+
+def clear():
+    """Forget the exchange embeddings (memory was cleared)"""
+    global _index
+    from . import get_session_directory
+    with _lock:
+        index = _index
+        _index = None
+        _archive_scan.update(directory=None, count=0, hashes=set())
+    if index is not None:
+        index.reset()
+    else:
+        for name in ('vectors.f32', 'entries.jsonl', 'meta.json'):
+            try:
+                (get_session_directory() / 'retrieval' / name).unlink()
+            except OSError:
+                pass
@@ -0,0 +1,324 @@
+"""Semantic answer cache - finds earlier answers to reworded questions
+
+Each question is embedded with a local Ollama embedding model and compared
+with the questions of earlier exchanges. The index lives in
+a_astitnet/cache/semantic and is append-only:
+
+    meta.json      embedding model and vector size
+    vectors.f32    normalized float32 vectors, one row per entry
+    entries.jsonl  question, answer and chat model, one line per row
+
+vectors.f32 is memory-mapped, so loading is instant and adding an answer only
+appends one row. Lookups and inserts run on background threads (the embedding
+call goes over HTTP), so everything touching the index holds _lock.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from . import ollama_client
+
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+DEFAULT_THRESHOLD = 0.90
+DUPLICATE_THRESHOLD = 0.995  # Don't store a question that is already in the index
+
+_lock = threading.Lock()
+_index = None  # Loaded lazily by _get_index()
+stats = {"hits": 0, "misses": 0, "added": 0}
+
+def get_index_directory():
+    """Get (and create) the semantic index directory under a_astitnet"""
+    from . import get_niout_directory
+    index_dir = get_niout_directory().parent / 'cache' / 'semantic'
+    index_dir.mkdir(parents=True, exist_ok=True)
+    return index_dir
+
+def embed(text, embedding_model=DEFAULT_EMBEDDING_MODEL):
+    """Normalized embedding vector for text (numpy float32 array)"""
+    import numpy as np
+
+    from . import residency
+
+    response = ollama_client.post("/api/embeddings", {"model": embedding_model, "prompt": text}, timeout=(5, 60))
+    response.raise_for_status()
+    residency.touch(embedding_model)
+    vector = np.asarray(response.json()["embedding"], dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm == 0:
+        raise ValueError("Empty embedding")
+    return vector / norm
+
+class VectorIndex:
+    """Append-only memory-mapped vectors plus their question/answer entries"""
+
+    def __init__(self, index_dir, embedding_model):
+        self.index_dir = index_dir
+        self.embedding_model = embedding_model
+        self.meta_file = index_dir / 'meta.json'
+        self.vector_file = index_dir / 'vectors.f32'
+        self.entry_file = index_dir / 'entries.jsonl'
+        self.dim = None
+        self.vectors = None
+        self.entries = []
+        self.known = set()  # Hashes of stored exchanges (for backfill)
+        self._load()
+
+    @staticmethod
+    def exchange_hash(question, answer):
+        return hashlib.sha1(f"{question}\n{answer}".encode('utf-8')).hexdigest()
+
+    def _load(self):
+        if self.meta_file.exists():
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("model") != self.embedding_model:
+                # Vectors from another embedding model can't be compared - start over
+                print("Advanced AI: Embedding model changed, resetting semantic index")
+                self.reset()
+                return
+            self.dim = meta.get("dim")
+
+        entry_ends = []  # Byte offset after each complete entry line
+        if self.entry_file.exists():
+            with open(self.entry_file, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # Torn last line from an interrupted write
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    offset += len(line)
+                    self.entries.append(entry)
+                    entry_ends.append(offset)
+        self._repair(entry_ends)
+        self.known = {entry.get("hash") for entry in self.entries}
+        self._map()
+
+    def _repair(self, entry_ends):
+        """Cut both files back to the last row that has a vector and an entry line
+
+        An interrupted append leaves a torn entry line or a vector row without
+        its entry. Both would shift every later append out of step, so the
+        leftovers are removed before anything new is written.
+        """
+        vector_bytes = self.vector_file.stat().st_size if self.vector_file.exists() else 0
+        rows = min(vector_bytes // (4 * self.dim), len(self.entries)) if self.dim else 0
+        entry_bytes = entry_ends[rows - 1] if rows else 0
+        for path, size in ((self.entry_file, entry_bytes), (self.vector_file, rows * 4 * (self.dim or 0))):
+            if path.exists() and path.stat().st_size != size:
+                print(f"Advanced AI: Cutting {path.stat().st_size - size} bytes from {path.name} after row {rows} (interrupted write)")
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        del self.entries[rows:]
+
+    def _map(self):
+        """(Re)map vectors.f32 - only rows with a matching entry count"""
+        import numpy as np
+
+        self.vectors = None
+        if not self.dim or not self.vector_file.exists():
+            return
+        rows = self.vector_file.stat().st_size // (4 * self.dim)
+        rows = min(rows, len(self.entries))
+        if rows:
+            self.vectors = np.memmap(self.vector_file, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        del self.entries[rows:]
+
+    def close(self):
+        """Drop the memory map (Windows can't delete or truncate a mapped file)"""
+        self.vectors = None
+
+    def reset(self):
+        """Delete the index files"""
+        self.close()
+        self.entries = []
+        self.known = set()
+        self.dim = None
+        for path in (self.vector_file, self.entry_file, self.meta_file):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def __len__(self):
+        return 0 if self.vectors is None else len(self.vectors)
+
+    def search(self, vector, model, threshold):
+        """Best (score, entry) for this chat model at or above threshold, else (best score, None)"""
+        import numpy as np
+
+        if self.vectors is None or len(vector) != self.dim:
+            return 0.0, None
+        scores = self.vectors @ vector
+        # Look at a handful of the best rows so another model's answer doesn't hide ours
+        top = np.argsort(scores)[::-1][:8]
+        for row in top:
+            score = float(scores[row])
+            if score < threshold:
+                break
+            if self.entries[row].get("model") == model:
+                return score, self.entries[row]
+        return float(scores[top[0]]) if len(top) else 0.0, None
+
+    def append(self, vector, question, answer, model, source="chat"):
+        """Add one entry - appends a vector row and an entry line, nothing is rewritten"""
+        if self.dim is None:
+            self.dim = len(vector)
+            with open(self.meta_file, 'w', encoding='utf-8') as f:
+                json.dump({"model": self.embedding_model, "dim": self.dim}, f)
+        elif len(vector) != self.dim:
+            return False
+
+        entry = {
+            "hash": self.exchange_hash(question, answer),
+            "question": question,
+            "answer": answer,
+            "model": model,
+            "source": source,
+            "created": time.time(),
+        }
+        # Vector first: a row without an entry line is ignored on load
+        with open(self.vector_file, 'ab') as f:
+            f.write(vector.astype('float32').tobytes())
+        with open(self.entry_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+
+        self.entries.append(entry)
+        self.known.add(entry["hash"])
+        self._map()
+        return True
+
+def _get_index(embedding_model):
+    """Get the index for this embedding model (call with _lock held)"""
+    global _index
+    if _index is None or _index.embedding_model != embedding_model:
+        if _index is not None:
+            _index.close()
+        _index = VectorIndex(get_index_directory(), embedding_model)
+    return _index
+
+def lookup(question, model, embedding_model=DEFAULT_EMBEDDING_MODEL, threshold=DEFAULT_THRESHOLD):
+    """Embed question and search the index - returns (answer or None, score, vector)
+
+    Runs on a background thread. The vector is handed back so the answer that
+    gets generated on a miss can be stored without embedding the question again.
+    """
+    vector = embed(question, embedding_model)
+    with _lock:
+        score, entry = _get_index(embedding_model).search(vector, model, threshold)
+        if entry is not None:
+            stats["hits"] += 1
+            return entry["answer"], score, vector
+        stats["misses"] += 1
+        return None, score, vector
+
+def add(question, answer, model, embedding_model=DEFAULT_EMBEDDING_MODEL, vector=None, source="chat"):
+    """Store a question/answer pair (embeds the question if no vector is given)"""
+    if not question.strip() or not answer.strip() or answer.startswith("Error:"):
+        return False
+    if vector is None:
+        vector = embed(question, embedding_model)
+    with _lock:
+        index = _get_index(embedding_model)
+        if index.exchange_hash(question, answer) in index.known:
+            return False
+        score, _ = index.search(vector, model, DUPLICATE_THRESHOLD)
+        if score >= DUPLICATE_THRESHOLD:
+            return False
+        if index.append(vector, question, answer, model, source):
+            stats["added"] += 1
+            return True
+    return False
+
+def backfill(exchanges, archive_dir, model, embedding_model=DEFAULT_EMBEDDING_MODEL):
+    """Index past exchanges from the conversation store and the niout archive
+
+    exchanges are the (question, answer, model) triples of the hot file, read
+    on the main thread; archived exchanges are read through a private
+    ConversationArchive of archive_dir, so the store used on the main thread
+    is never touched from here. Each entry is tagged with the model that
+    answered it (model for records that don't say). Archived response_N.txt
+    files only hold answers, so they are indexed through the history question
+    they belong to (or skipped). Returns the number of entries added. Meant
+    to run on a background thread.
+    """
+    from . import get_niout_directory
+    from .conversation_store import ConversationArchive
+
+    archive = ConversationArchive(archive_dir)
+    try:
+        archived = [(user["text"], assistant["text"], assistant.get("model", ""))
+                    for user, assistant in archive.iter_exchanges()]
+    finally:
+        archive.close()
+    exchanges = archived + list(exchanges)
+    exchange_for_answer = {answer.strip(): (question, answered_by) for question, answer, answered_by in exchanges}
+
+    pairs = [(question, answer, answered_by, "history") for question, answer, answered_by in exchanges]
+    for response_file in sorted(get_niout_directory().glob('response_*.txt')):
+        try:
+            answer = response_file.read_text(encoding='utf-8').strip()
+        except OSError:
+            continue
+        question, answered_by = exchange_for_answer.get(answer, (None, None))
+        if question:
+            pairs.append((question, answer, answered_by, response_file.name))
+
+    added = 0
+    for question, answer, answered_by, source in pairs:
+        with _lock:
+            if VectorIndex.exchange_hash(question, answer) in _get_index(embedding_model).known:
+                continue
+        try:
+            if add(question, answer, answered_by or model, embedding_model, source=source):
+                added += 1
+        except Exception as e:
+            print(f"Advanced AI: Semantic backfill stopped: {e}")
+            break
+    if added:
+        print(f"Advanced AI: Indexed {added} past exchanges for the semantic cache")
+    return added
+
+def load_and_backfill(exchanges, archive_dir, model, embedding_model=DEFAULT_EMBEDDING_MODEL):
+    """Map the index and index any past exchanges it doesn't have yet"""
+    with _lock:
+        _get_index(embedding_model)
+    return backfill(exchanges, archive_dir, model, embedding_model)
+
+def start_background_backfill(props):
+    """Load the index and backfill it on a background thread (main thread - only the hot file is read here)"""
+    from . import get_conversation_store
+
+    if not props.semantic_cache_enabled:
+        return
+    model = props.selected_model if props.selected_model else 'qwen3:8b'
+    embedding_model = props.embedding_model.strip() or DEFAULT_EMBEDDING_MODEL
+    store = get_conversation_store()
+    exchanges = [(exchange.user, exchange.assistant, store.records[exchange.end - 1].get("model", ""))
+                 for exchange in store.hot_exchange_records()]
+    ollama_client.run_async(load_and_backfill, None, exchanges, store.archive.directory, model, embedding_model)
+
+def clear():
+    """Delete the whole semantic index"""
+    global _index
+    with _lock:
+        if _index is not None:
+            _index.close()
+        _index = None
+        index_dir = get_index_directory()
+        for name in ('vectors.f32', 'entries.jsonl', 'meta.json'):
+            try:
+                (index_dir / name).unlink()
+            except OSError:
+                pass
+        for key in stats:
+            stats[key] = 0
+
+def describe_stats():
+    """One-line summary for the panel"""
+    size = len(_index) if _index is not None else 0
+    return f"Semantic: {stats['hits']} hits / {stats['misses']} misses, {size} indexed"
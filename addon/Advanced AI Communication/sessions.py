@@ -0,0 +1,166 @@
+"""Named conversation sessions
+
+Each session has its own conversation store (and retrieval index), so
+questions from different projects or topics don't share one ever-growing
+context. The registry is memory/sessions.json:
+
+    {"active": "Default",
+     "sessions": {"Default": {"dir": "", "blend": "", "created": ..., "last_used": ...},
+                  "Rigging": {"dir": "sessions/rigging", "blend": "", ...}}}
+
+"Default" is the memory folder itself, so the history from before sessions
+existed stays where it is. A session can be tied to a .blend file; with
+"Follow .blend File" on, opening that file switches to its session.
+
+Only the active session is loaded. conversation_store keeps the last few
+used stores in an LRU, so switching back and forth does not re-read them.
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+
+DEFAULT_SESSION = "Default"
+REGISTRY_NAME = 'sessions.json'
+SESSIONS_DIR = 'sessions'
+
+_registry = None
+_enum_items = []  # Blender needs the strings of dynamic enum items kept alive
+
+def _registry_file():
+    from . import get_memory_directory
+    return get_memory_directory() / REGISTRY_NAME
+
+def _new_entry(directory, blend=""):
+    now = time.time()
+    return {"dir": directory, "blend": blend, "created": now, "last_used": now}
+
+def load_registry():
+    """Registry dict (read once, then kept in memory)"""
+    global _registry
+    if _registry is None:
+        registry = {}
+        try:
+            with open(_registry_file(), 'r', encoding='utf-8') as f:
+                registry = json.load(f)
+        except (OSError, ValueError):
+            pass
+        registry.setdefault("sessions", {})
+        registry["sessions"].setdefault(DEFAULT_SESSION, _new_entry(""))
+        if registry.get("active") not in registry["sessions"]:
+            registry["active"] = DEFAULT_SESSION
+        _registry = registry
+    return _registry
+
+def save_registry():
+    registry_file = _registry_file()
+    tmp_file = registry_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(load_registry(), f, indent=2)
+    os.replace(tmp_file, registry_file)
+
+def active_session():
+    return load_registry()["active"]
+
+def session_directory(name=None):
+    """Folder holding the session's conversation store (created on demand)"""
+    from . import get_memory_directory
+    entry = load_registry()["sessions"].get(name or active_session())
+    if entry is None or not entry.get("dir"):
+        return get_memory_directory()
+    directory = get_memory_directory() / entry["dir"]
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+def list_sessions():
+    """Session names, most recently used first"""
+    sessions = load_registry()["sessions"]
+    return sorted(sessions, key=lambda name: sessions[name].get("last_used", 0), reverse=True)
+
+def session_blend(name):
+    entry = load_registry()["sessions"].get(name)
+    return entry.get("blend", "") if entry else ""
+
+def _slug(name):
+    slug = re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_') or 'session'
+    taken = {entry.get("dir") for entry in load_registry()["sessions"].values()}
+    candidate, number = slug, 2
+    while f"{SESSIONS_DIR}/{candidate}" in taken:
+        candidate = f"{slug}_{number}"
+        number += 1
+    return f"{SESSIONS_DIR}/{candidate}"
+
+def create_session(name, blend=""):
+    """Add a session (name is made unique) - returns its name"""
+    sessions = load_registry()["sessions"]
+    name = name.strip() or "Session"
+    base, number = name, 2
+    while name in sessions:
+        name = f"{base} {number}"
+        number += 1
+    sessions[name] = _new_entry(_slug(name), blend)
+    save_registry()
+    print(f"Advanced AI: Created session '{name}'")
+    return name
+
+def switch_session(name):
+    """Make name the active session - returns False if it does not exist"""
+    from . import summarizer, chat_request
+
+    registry = load_registry()
+    if name not in registry["sessions"]:
+        return False
+    registry["sessions"][name]["last_used"] = time.time()
+    if registry["active"] != name:
+        # Work in progress belongs to the old conversation
+        summarizer.reset()
+        chat_request.clear_contexts(keep_saved=True)
+        registry["active"] = name
+        print(f"Advanced AI: Switched to session '{name}'")
+    save_registry()
+    return True
+
+def delete_session(name):
+    """Delete a session and its history (the Default session can only be cleared)"""
+    from . import conversation_store, retrieval_memory
+
+    registry = load_registry()
+    entry = registry["sessions"].get(name)
+    if entry is None or name == DEFAULT_SESSION:
+        return False
+    directory = session_directory(name)
+    if registry["active"] == name:
+        switch_session(DEFAULT_SESSION)
+    del registry["sessions"][name]
+    save_registry()
+    conversation_store.forget_store(directory)
+    retrieval_memory.forget_session(directory)
+    shutil.rmtree(directory, ignore_errors=True)
+    print(f"Advanced AI: Deleted session '{name}'")
+    return True
+
+def follow_blend(filepath):
+    """Switch to the session tied to this .blend file (created if needed)"""
+    if not filepath:
+        return switch_session(DEFAULT_SESSION)
+    for name, entry in load_registry()["sessions"].items():
+        if entry.get("blend") == filepath:
+            return switch_session(name)
+    name = create_session(os.path.splitext(os.path.basename(filepath))[0], blend=filepath)
+    return switch_session(name)
+
+def enum_items(self, context):
+    """Items for the session menu"""
+    global _enum_items
+    _enum_items = [
+        (name, name, session_blend(name) or "Conversation session")
+        for name in list_sessions()
+    ]
+    return _enum_items
+
+def reset():
+    """Re-read the registry next time (add-on reloaded)"""
+    global _registry
+    _registry = None
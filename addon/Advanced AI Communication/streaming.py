@@ -0,0 +1,241 @@
+"""In-process generation and token streaming from Ollama into the Blender panel
+
+A background thread talks to Ollama through the shared session in
+ollama_client and pushes tokens into a thread-safe queue. Ollama is always
+asked for an NDJSON stream so a generation can be aborted mid-answer; with
+streaming display off the text is only shown once it is complete. A
+bpy.app.timers callback on the main thread drains the queue into
+props.response.
+"""
+
+import json
+import queue
+import threading
+import time
+
+from . import ollama_client
+
+DRAIN_INTERVAL = 0.05  # Seconds between UI updates while streaming
+
+# The stream currently being shown in the panel (only one at a time)
+_active_stream = None
+
+class ResponseStream:
+    """Reads one streamed Ollama generation on a background thread"""
+
+    def __init__(self, endpoint, payload, user_message="", stream=True, job=None):
+        self.endpoint = endpoint
+        self.job = job  # Queued GenerationJob (for caching the answer)
+        self.payload = dict(payload)
+        self.model = payload.get("model", "")
+        self.stream = stream
+        self.user_message = user_message
+        self.events = queue.Queue()
+        self.text_parts = []
+        self.started_at = time.time()
+        self.first_token_at = None
+        self.finished = False
+        self.cancelled = threading.Event()
+        self._response = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """Abort the generation - closing the connection makes Ollama stop right away"""
+        self.cancelled.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _chunk_text(chunk):
+        """Text in one /api/generate or /api/chat chunk"""
+        if "message" in chunk:
+            return chunk["message"].get("content", "")
+        return chunk.get("response", "")
+
+    def _run(self):
+        try:
+            self.payload["stream"] = True
+            with ollama_client.post(self.endpoint, self.payload, stream=True, timeout=(5, 600)) as response:
+                self._response = response
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if self.cancelled.is_set():
+                        return
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    token = self._chunk_text(chunk)
+                    if token:
+                        self.events.put(("token", token))
+                    if chunk.get("done"):
+                        self.events.put(("done", chunk))
+                        return
+            self.events.put(("done", {}))
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.events.put(("error", str(e)))
+        finally:
+            self._response = None
+
+    def elapsed_to_first_token(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def text(self):
+        return "".join(self.text_parts)
+
+def start_stream(endpoint, payload, user_message="", stream=True, job=None):
+    """Start generating a response in Blender and register the drain timer"""
+    global _active_stream
+    import bpy
+
+    model = payload.get("model", "")
+    _active_stream = ResponseStream(endpoint, payload, user_message, stream=stream, job=job).start()
+    if not bpy.app.timers.is_registered(drain_stream_queue):
+        bpy.app.timers.register(drain_stream_queue, first_interval=DRAIN_INTERVAL)
+    print(f"Advanced AI: {'Streaming' if stream else 'Generating'} response from {model} in Blender")
+    return _active_stream
+
+def is_streaming():
+    """Check if a stream is still running"""
+    return _active_stream is not None and not _active_stream.finished
+
+def cancel_stream():
+    """Abort the running stream, keeping whatever text already arrived"""
+    from . import token_counter
+    stream = _active_stream
+    if stream is None or stream.finished:
+        return False
+    stream.cancel()
+    stream.finished = True
+    token_counter.forget_evaluated(stream.model)  # Ollama cached part of it
+    return True
+
+def get_partial_text():
+    """Text received so far by the current stream"""
+    return _active_stream.text if _active_stream is not None else ""
+
+def _finish_stream(stream, props, error=None, result=None):
+    """Write the finished text out for history and memory"""
+    from . import save_response_to_archive, add_to_conversation_history
+    from . import chat_request, response_cache, token_counter
+
+    stream.finished = True
+    text = stream.text.strip()
+
+    if error:
+        props.response = (text + "\n\n" if text else "") + f"Error: {error}"
+        props.monitoring_status = f"❌ Stream failed: {error}"
+        print(f"Advanced AI Stream Error: {error}")
+        token_counter.forget_evaluated(stream.model)
+        return
+
+    # Keep the context token array so the next /api/generate turn only prefills the new message
+    if result and result.get("context") and props.memory_enabled:
+        chat_request.remember_context(
+            stream.model, result["context"], stream.user_message, text,
+            custom_prompt=stream.job.custom_prompt if stream.job else None,
+            num_ctx=stream.payload.get("options", {}).get("num_ctx")
+        )
+
+    # Learn this model's characters per token from Ollama's own count
+    if result:
+        token_counter.calibrate(stream.model, stream.payload, text, result)
+    else:
+        token_counter.forget_evaluated(stream.model)
+
+    if stream.job is not None:
+        response_cache.remember_answer(stream.job, text)
+
+    response_file = save_response_to_archive(text, started=stream.started_at)
+    if response_file:
+        # Keep the file monitor from loading this answer a second time
+        props.last_known_max_number = max(props.last_known_max_number, int(response_file.stem.replace('response_', '')))
+        props.selected_response_file = response_file.name
+
+    if props.memory_enabled and stream.user_message:
+        add_to_conversation_history(stream.user_message, text, int(props.memory_token_limit), model=stream.model)
+        print("Advanced AI: Saved exchange to memory")
+
+    first_token = stream.elapsed_to_first_token()
+    total = time.time() - stream.started_at
+    if first_token is not None and stream.stream:
+        props.monitoring_status = f"✅ First token {first_token:.2f}s, done in {total:.1f}s"
+    else:
+        props.monitoring_status = f"✅ Done in {total:.1f}s"
+    print(f"Advanced AI: {props.monitoring_status}")
+
+def drain_stream_queue():
+    """Timer callback - move streamed tokens into the panel"""
+    import bpy
+    from . import request_queue
+
+    stream = _active_stream
+    if stream is None or stream.finished:
+        return None
+
+    try:
+        props = bpy.context.window_manager.advanced_ai_props
+        got_tokens = False
+
+        while True:
+            try:
+                kind, value = stream.events.get_nowait()
+            except queue.Empty:
+                break
+
+            if kind == "token":
+                if stream.first_token_at is None:
+                    stream.first_token_at = time.time()
+                    if stream.stream:
+                        props.response = ""
+                stream.text_parts.append(value)
+                got_tokens = True
+            elif kind in ("done", "error"):
+                if kind == "done":
+                    props.response = stream.text.strip()
+                    _finish_stream(stream, props, result=value)
+                else:
+                    _finish_stream(stream, props, error=value)
+                props.waiting_for_response = False
+                ollama_client.redraw_panels()
+                request_queue.job_finished(stream.job)
+                return None
+
+        if got_tokens:
+            if stream.stream:
+                props.response = stream.text
+                first_token = stream.elapsed_to_first_token()
+                props.monitoring_status = f"✍️ Streaming... (first token {first_token:.2f}s)"
+            else:
+                props.monitoring_status = f"⏳ Generating in Blender... ({len(stream.text_parts)} tokens)"
+            ollama_client.redraw_panels()
+
+    except Exception as e:
+        print(f"Advanced AI Stream Drain Error: {e}")
+        # This timer is gone now - end the stream so the queue doesn't wait on it forever
+        stream.cancel()
+        try:
+            props = bpy.context.window_manager.advanced_ai_props
+            _finish_stream(stream, props, error=e)
+            props.waiting_for_response = False
+            ollama_client.redraw_panels()
+        except Exception as finish_error:
+            stream.finished = True
+            print(f"Advanced AI: Could not finish stream: {finish_error}")
+        request_queue.job_finished(stream.job)
+        return None
+
+    return DRAIN_INTERVAL
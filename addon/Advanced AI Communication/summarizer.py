@@ -0,0 +1,180 @@
+"""Rolling summary of old conversation history, made while Blender is idle
+
+When the memory window passes HIGH_WATER of the token limit, the oldest
+exchanges are folded into a rolling summary by a (preferably small) local
+model instead of just being trimmed away. The summary is stored in the
+conversation store and sent ahead of the remaining history.
+
+The job never competes with a chat request: it only starts after the
+request queue has been idle for IDLE_DELAY seconds, streams its answer so it
+can be dropped mid-way, and is cancelled as soon as a message is sent (it is
+tried again at the next idle moment).
+"""
+
+import json
+import threading
+
+from . import ollama_client
+
+HIGH_WATER = 0.85  # Summarize when the window uses this share of the limit
+LOW_WATER = 0.6  # ... until it is back down to this share
+MAX_EXCHANGES_PER_PASS = 12
+SUMMARY_MAX_WORDS = 250
+IDLE_DELAY = 5.0  # Seconds without chat requests before a summary may start
+
+SUMMARY_PROMPT = """You keep a running summary of a conversation between a Blender user and their AI assistant.
+Update the summary below with the new exchanges. Keep facts, decisions, object and modifier names,
+settings, keybinds and open questions; drop greetings and repetition. Write at most {max_words} words
+of plain text and reply with the updated summary only.
+
+CURRENT SUMMARY:
+{summary}
+
+NEW EXCHANGES:
+{exchanges}"""
+
+_pending = None  # (token_limit, model) waiting for an idle moment
+_job = None  # SummaryJob while one is running
+
+class SummaryJob:
+    """One summarization request on a background thread"""
+
+    def __init__(self, model, prompt, covers, last_record):
+        self.model = model
+        self.prompt = prompt
+        self.covers = covers  # Summary replaces records[:covers]
+        self.last_record = (last_record["id"], last_record["ts"])  # To spot a replaced store
+        self.cancelled = threading.Event()
+        self._response = None
+
+    def run(self):
+        """Stream the summary; returns None if cancelled"""
+        from . import residency, token_counter
+
+        residency.touch(self.model)
+        token_counter.forget_evaluated(self.model)  # The summary may take the chat's cache slot
+        payload = {"model": self.model, "prompt": self.prompt, "stream": True,
+                   "options": {"temperature": 0.2}}
+        parts = []
+        with ollama_client.post("/api/generate", payload, stream=True, timeout=(5, 300)) as response:
+            self._response = response
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if self.cancelled.is_set():
+                    return None
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                parts.append(chunk.get("response", ""))
+                if chunk.get("done"):
+                    break
+        residency.touch(self.model)
+        return None if self.cancelled.is_set() else "".join(parts).strip()
+
+    def cancel(self):
+        self.cancelled.set()
+        response = self._response
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+def maybe_schedule(token_limit, model, threshold=HIGH_WATER, delay=IDLE_DELAY):
+    """Queue a summary pass if the memory window is past threshold of the limit"""
+    global _pending
+    import bpy
+    from . import get_conversation_store
+
+    if get_conversation_store().window_tokens() <= token_limit * threshold:
+        return
+    _pending = (token_limit, model)
+    if _job is None and not bpy.app.timers.is_registered(_start_when_idle):
+        bpy.app.timers.register(_start_when_idle, first_interval=delay)
+
+def cancel():
+    """Stop a running summary (a chat request is starting) - it is retried later"""
+    global _job
+    import bpy
+
+    job = _job
+    if job is None:
+        return
+    job.cancel()
+    _job = None
+    print("Advanced AI: Paused history summary for a chat request")
+    if _pending is not None and not bpy.app.timers.is_registered(_start_when_idle):
+        bpy.app.timers.register(_start_when_idle, first_interval=IDLE_DELAY)
+
+def reset():
+    """Forget pending work (memory cleared or add-on unregistered)"""
+    global _pending
+    import bpy
+
+    _pending = None
+    cancel()
+    if bpy.app.timers.is_registered(_start_when_idle):
+        bpy.app.timers.unregister(_start_when_idle)
+
+def is_running():
+    return _job is not None
+
+def _start_when_idle():
+    """Timer - start the pending summary once no chat request is running"""
+    global _job, _pending
+    from . import request_queue, streaming, get_conversation_store
+    from .conversation_store import format_exchange
+
+    if _pending is None or _job is not None:
+        return None
+    if request_queue.is_busy() or streaming.is_streaming():
+        return IDLE_DELAY  # Still chatting - look again later
+
+    token_limit, model = _pending
+    store = get_conversation_store()
+    excess = store.window_tokens() - int(token_limit * LOW_WATER)
+    exchanges = store.oldest_exchanges(excess, MAX_EXCHANGES_PER_PASS) if excess > 0 else []
+    if not exchanges:
+        _pending = None
+        return None
+
+    prompt = SUMMARY_PROMPT.format(
+        max_words=SUMMARY_MAX_WORDS,
+        summary=store.summary_text() or "(none yet)",
+        exchanges="\n\n".join(format_exchange(exchange.user, exchange.assistant) for exchange in exchanges),
+    )
+    covers = exchanges[-1].end
+    job = SummaryJob(model, prompt, covers, store.records[covers - 1])
+    _job = job
+    print(f"Advanced AI: Summarizing {len(exchanges)} old exchanges with {model} in the background")
+    ollama_client.run_async(job.run, lambda result, error: _on_summary(job, result, error))
+    return None
+
+def _on_summary(job, result, error):
+    """Main thread - store the new summary and check if another pass is needed"""
+    global _job, _pending
+    from . import get_conversation_store
+
+    if job is not _job:
+        return  # Cancelled meanwhile
+    _job = None
+    if error or not result:
+        if error:
+            print(f"Advanced AI: History summary failed: {error}")
+        _pending = None
+        return
+
+    store = get_conversation_store()
+    if job.covers > len(store.records) or job.last_record != (store.records[job.covers - 1]["id"], store.records[job.covers - 1]["ts"]):
+        _pending = None  # Memory was cleared or replaced while we worked
+        return
+    store.add_summary(result, job.covers, model=job.model)
+    print(f"Advanced AI: Updated history summary ({store.summary_tokens()} tokens, window now {store.window_tokens()})")
+
+    # Keep going while the window is still above the low-water mark
+    if _pending is not None:
+        token_limit, model = _pending
+        _pending = None
+        maybe_schedule(token_limit, model, threshold=LOW_WATER, delay=1.0)
@@ -0,0 +1,214 @@
+"""Token counting for memory budgets
+
+estimate_tokens() used to be len(text) // 4 for every model, which is far off
+for code and non-English text. Counting now goes through a per-model counter:
+
+- TokenizerCounter: the model's real tokenizer, when the optional 'tokenizers'
+  package is installed and a tokenizer.json for the model family is placed in
+  a_astitnet/tokenizers (e.g. tokenizers/qwen3.json for qwen3:8b).
+- RatioCounter: characters per token, learned per model from the
+  prompt_eval_count Ollama reports after each request (saved in
+  a_astitnet/cache/token_ratios.json). Starts at 4 like the old estimate.
+  Tokens Ollama served from its prefix cache are not in that count, so the
+  sample only counts the characters after the prefix shared with what the
+  model last evaluated (all of them after a model load or num_ctx change).
+
+Counts are memoized by a hash of the text (and the counter that made them),
+so an exchange is never tokenized twice.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CHARS_PER_TOKEN = 4.0
+MIN_CHARS_PER_TOKEN = 1.0
+MAX_CHARS_PER_TOKEN = 8.0
+LOAD_SECONDS = 0.5  # A load_duration above this means the model was loaded for the request - nothing cached
+CALIBRATION_WEIGHT = 0.2  # Weight of each new sample in the running ratio
+MIN_CALIBRATION_CHARS = 200  # Ignore tiny prompts - template overhead dominates
+MEMO_MAX_ENTRIES = 20000
+
+_lock = threading.Lock()
+_memo = OrderedDict()  # (counter key, text hash) -> tokens
+_counters = {}  # model -> counter
+_ratios = None  # model -> chars per token (loaded lazily)
+_evaluated = {}  # model -> (text, num_ctx) Ollama last evaluated for it (what its prefix cache holds)
+_active_model = ""
+
+def _base_directory():
+    from . import get_niout_directory
+    return get_niout_directory().parent
+
+def model_family(model):
+    """'qwen3:8b' -> 'qwen3', 'library/llama3.1:latest' -> 'llama3.1'"""
+    return model.split('/')[-1].split(':')[0].lower()
+
+class RatioCounter:
+    """Characters-per-token estimate for one model"""
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def key(self):
+        return f"ratio:{self.model}:{get_ratio(self.model):.2f}"
+
+    def count(self, text):
+        return int(len(text) / get_ratio(self.model))
+
+class TokenizerCounter:
+    """Exact counts from a Hugging Face tokenizer.json"""
+
+    def __init__(self, model, tokenizer):
+        self.model = model
+        self.tokenizer = tokenizer
+
+    @property
+    def key(self):
+        return f"tokenizer:{model_family(self.model)}"
+
+    def count(self, text):
+        return len(self.tokenizer.encode(text, add_special_tokens=False).ids)
+
+def _load_tokenizer(model):
+    """Real tokenizer for the model family, or None"""
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        return None
+    try:
+        tokenizer_file = _base_directory() / 'tokenizers' / f'{model_family(model)}.json'
+        if tokenizer_file.exists():
+            print(f"Advanced AI: Using {tokenizer_file.name} to count tokens for {model}")
+            return Tokenizer.from_file(str(tokenizer_file))
+    except Exception as e:
+        print(f"Advanced AI: Could not load tokenizer for {model}: {e}")
+    return None
+
+def get_counter(model=None):
+    """Counter for model (defaults to the model of the current request)"""
+    model = model or _active_model
+    with _lock:
+        counter = _counters.get(model)
+    if counter is None:
+        tokenizer = _load_tokenizer(model) if model else None
+        counter = TokenizerCounter(model, tokenizer) if tokenizer else RatioCounter(model)
+        with _lock:
+            _counters[model] = counter
+    return counter
+
+def set_active_model(model):
+    """Model whose counter estimate_tokens() uses"""
+    global _active_model
+    _active_model = model or ""
+
+def count(text, model=None):
+    """Token count for text, memoized by hash"""
+    if not text:
+        return 0
+    counter = get_counter(model)
+    memo_key = (counter.key, hashlib.sha1(text.encode('utf-8')).hexdigest())
+    with _lock:
+        tokens = _memo.get(memo_key)
+        if tokens is not None:
+            _memo.move_to_end(memo_key)
+            return tokens
+
+    tokens = counter.count(text)
+    with _lock:
+        _memo[memo_key] = tokens
+        while len(_memo) > MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return tokens
+
+# === CALIBRATION ===
+def _ratios_file():
+    cache_dir = _base_directory() / 'cache'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / 'token_ratios.json'
+
+def _load_ratios():
+    global _ratios
+    if _ratios is None:
+        _ratios = {}
+        try:
+            with open(_ratios_file(), 'r', encoding='utf-8') as f:
+                _ratios = {model: float(ratio) for model, ratio in json.load(f).items()}
+        except (OSError, ValueError):
+            pass
+    return _ratios
+
+def get_ratio(model):
+    """Learned characters per token for model"""
+    with _lock:
+        return _load_ratios().get(model, DEFAULT_CHARS_PER_TOKEN)
+
+def prompt_text(payload):
+    """Prompt text of an /api/generate or /api/chat payload (None if it carries a context)"""
+    if "messages" in payload:
+        return "\n".join(message.get("content", "") for message in payload["messages"])
+    if "context" in payload:
+        return None  # Most of the prompt is in the context tokens
+    return payload.get("prompt", "")
+
+def note_evaluated(model, payload, answer=""):
+    """Ollama evaluated payload (and generated answer) with model - its prefix cache holds that now"""
+    text = prompt_text(payload)
+    if text is None:
+        _evaluated.pop(model, None)
+        return
+    if answer:
+        text += "\n" + answer if "messages" in payload else answer
+    _evaluated[model] = (text, (payload.get("options") or {}).get("num_ctx"))
+
+def forget_evaluated(model):
+    """Something we can't follow ran on model (summary, cancelled or external request)"""
+    _evaluated.pop(model, None)
+
+def calibrate(model, payload, answer, result):
+    """Update the model's ratio from one finished request (new prompt text vs. Ollama's count)"""
+    text = prompt_text(payload)
+    previous = _evaluated.get(model)
+    note_evaluated(model, payload, answer)
+    prompt_eval_count = result.get("prompt_eval_count")
+    if not model or text is None or not prompt_eval_count:
+        return
+    # Ollama only evaluates what follows the prefix still in its cache - nothing is cached after
+    # a load (which a different num_ctx also causes)
+    loaded = result.get("load_duration", 0) / 1e9 > LOAD_SECONDS
+    if loaded or (previous is not None and previous[1] != (payload.get("options") or {}).get("num_ctx")):
+        cached = 0
+    elif previous is not None:
+        cached = len(os.path.commonprefix([previous[0], text]))
+    else:
+        return  # No idea what the model has cached
+    prompt_chars = len(text) - cached
+    if prompt_chars < MIN_CALIBRATION_CHARS:
+        return
+    sample = prompt_chars / prompt_eval_count
+    if not MIN_CHARS_PER_TOKEN <= sample <= MAX_CHARS_PER_TOKEN:
+        return
+    with _lock:
+        ratios = _load_ratios()
+        old = ratios.get(model)
+        ratio = sample if old is None else old + (sample - old) * CALIBRATION_WEIGHT
+        ratios[model] = round(ratio, 3)
+        snapshot = dict(ratios)
+    try:
+        ratios_file = _ratios_file()
+        tmp_file = ratios_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_file, ratios_file)
+    except Exception as e:
+        print(f"Advanced AI: Could not save token ratio: {e}")
+
+def describe(model=None):
+    """Short description of how tokens are counted for the panel"""
+    counter = get_counter(model)
+    if isinstance(counter, TokenizerCounter):
+        return f"Tokens: {model_family(counter.model)} tokenizer"
+    return f"Tokens: ~{get_ratio(counter.model):.2f} chars/token"
@@ -1,5 +1,8 @@
 import bpy
 
+from . import request_queue, response_cache, semantic_cache, token_counter, summarizer, sessions, context_budget, prefill, residency
+from . import get_conversation_store, get_model_inventory
+
 def draw_text_multiline(layout, text, width=50):
     """Draw text with word wrapping (from original ai_chat)"""
     if not text:
@@ -70,11 +73,19 @@ class ADVANCEDAI_PT_MainPanel(bpy.types.Panel):
         # Ollama status and controls
         status_row = ollama_box.row(align=True)
         status_row.label(text=props.ollama_status)
+        if props.manage_residency:
+            resident_row = ollama_box.row(align=True)
+            resident_row.scale_y = 0.8
+            resident_row.label(text=residency.describe(props), icon='MEMORY')
         
         controls_row = ollama_box.row(align=True)
         controls_row.operator("advanced_ai.start_ollama", text="Launch Ollama App", icon='PLAY')
         controls_row.operator("advanced_ai.stop_ollama", text="Stop App", icon='PAUSE')
         
+        check_row = ollama_box.row(align=True)
+        check_row.operator("advanced_ai.check_model_status", text="Model Status", icon='INFO')
+        check_row.operator("advanced_ai.test_model_connection", text="Test Model", icon='CHECKMARK')
+        
         layout.separator(factor=0.5)
         
         # === MESSAGE INPUT SECTION (Enhanced from ai_chat) ===
@@ -89,6 +100,22 @@ class ADVANCEDAI_PT_MainPanel(bpy.types.Panel):
         row.operator("advanced_ai.send_message", text="Send", icon='RIGHTARROW_THIN')
         row.operator("advanced_ai.clear_message", text="Clear", icon='X')
         
+        # Stop / queue controls while a generation is running
+        if request_queue.is_busy():
+            stop_row = col.row(align=True)
+            stop_row.operator("advanced_ai.stop_generation", text="Stop Generating", icon='CANCEL')
+            waiting = request_queue.pending_count()
+            if waiting:
+                op = stop_row.operator("advanced_ai.stop_generation", text=f"Stop + Clear {waiting} Queued", icon='TRASH')
+                op.clear_queue = True
+        option_row = col.row(align=True)
+        option_row.prop(props, "stream_responses", text="Stream tokens live")
+        if props.response_cache_enabled:
+            option_row.prop(props, "bypass_cache_once", text="Skip cache")
+        col.prop(props, "prefill_while_typing")
+        if props.prefill_while_typing:
+            prefill.on_panel_drawn()  # Panel is open - warm the prefix if it changed
+        
         # Auto-refresh controls from Simple Chat
         layout.separator(factor=1.0)
         
@@ -197,7 +224,12 @@ class ADVANCEDAI_PT_SettingsPanel(bpy.types.Panel):
         box.label(text="Model Management:", icon='PREFERENCES')
         
         col = box.column(align=True)
+        # Installed models with their size (from the cached inventory - no scan while drawing)
+        col.operator_menu_enum("advanced_ai.choose_model", "model", text=props.selected_model or "Choose Model", icon='DOWNARROW_HLT')
         col.prop(props, "selected_model", text="Model Name")
+        details = get_model_inventory().describe(props.selected_model)
+        if details:
+            col.label(text=f"Size: {details}", icon='INFO')
         
         # Browse models in directory
         col.separator()
@@ -232,6 +264,42 @@ class ADVANCEDAI_PT_SettingsPanel(bpy.types.Panel):
         
         col.prop(props, "auto_run_ollama", text="Auto-run script")
         
+        # Model residency
+        col.separator()
+        col.prop(props, "supervise_ollama", text="Keep Ollama Running")
+        col.prop(props, "warm_up_model", text="Warm Up Selected Model")
+        col.prop(props, "manage_residency", text="Manage Model Memory")
+        if props.manage_residency:
+            col.prop(props, "ram_budget_gb", text="RAM Budget (GB)")
+            col.prop(props, "idle_unload_minutes", text="Unload After (min)")
+
+        # Response cache
+        col.separator()
+        col.prop(props, "response_cache_enabled", text="Response Cache")
+        if props.response_cache_enabled:
+            col.prop(props, "cache_with_memory", text="Use cache with memory on")
+            col.prop(props, "cache_ttl_days", text="Keep answers (days)")
+            col.label(text=response_cache.describe_stats(), icon='INFO')
+            col.prop(props, "semantic_cache_enabled", text="Match reworded questions")
+            if props.semantic_cache_enabled:
+                col.prop(props, "embedding_model", text="Embedding Model")
+                col.prop(props, "semantic_threshold", text="Similarity", slider=True)
+                col.label(text=semantic_cache.describe_stats(), icon='INFO')
+            col.operator("advanced_ai.clear_response_cache", text="Clear Response Cache", icon='TRASH')
+        
+        # Generation mode
+        col.separator()
+        col.label(text="Generation Mode:")
+        col.prop(props, "generation_mode", expand=True)
+        
+        # Chat worker (long-lived process)
+        col.separator()
+        col.prop(props, "use_chat_worker", text="Use Chat Worker")
+        worker_row = col.row(align=True)
+        worker_row.operator("advanced_ai.start_chat_worker", text="Start Worker", icon='PLAY')
+        worker_row.operator("advanced_ai.stop_chat_worker", text="Stop Worker", icon='PAUSE')
+        col.label(text=props.chat_worker_status)
+
         # UI Settings from Simple Chat
         layout.separator()
         box = layout.box()
@@ -310,8 +378,41 @@ class ADVANCEDAI_PT_MemoryPanel(bpy.types.Panel):
         if props.memory_enabled:
             col = box.column(align=True)
             col.separator()
+            
+            # Conversation sessions
+            col.label(text="Session:", icon='OUTLINER_COLLECTION')
+            session_row = col.row(align=True)
+            session_row.operator_menu_enum("advanced_ai.switch_session", "session", text=sessions.active_session())
+            session_row.operator("advanced_ai.new_session", text="", icon='ADD')
+            session_row.operator("advanced_ai.delete_session", text="", icon='REMOVE')
+            col.prop(props, "session_follows_blend")
+            col.separator()
             col.label(text="Token Limit:", icon='SETTINGS')
             col.prop(props, "memory_token_limit", text="")
+            col.label(text="Memory Mode:")
+            col.row().prop(props, "memory_mode", expand=True)
+            if props.memory_mode == 'RETRIEVAL':
+                col.prop(props, "retrieval_top_k", text="Relevant Exchanges")
+                col.prop(props, "embedding_model", text="Embedding Model")
+            col.label(text="Prompt Format:")
+            col.prop(props, "prompt_format", text="")
+            col.label(text=token_counter.describe(props.selected_model), icon='INFO')
+            col.prop(props, "auto_num_ctx")
+            if props.auto_num_ctx:
+                col.prop(props, "output_tokens")
+                if context_budget.last_plan is not None:
+                    col.label(text=context_budget.last_plan.describe(), icon='INFO')
+            
+            # Rolling summary of old history
+            col.separator()
+            col.prop(props, "summarize_history", text="Summarize old history")
+            if props.summarize_history:
+                col.prop(props, "summary_model", text="Model")
+                summary_tokens = get_conversation_store().summary_tokens()
+                if summarizer.is_running():
+                    col.label(text="Summarizing in background...", icon='SORTTIME')
+                elif summary_tokens:
+                    col.label(text=f"Summary: {summary_tokens} tokens", icon='TEXT')
             
             # Memory info
             col.separator()
@@ -344,6 +445,18 @@ class ADVANCEDAI_PT_MemoryPanel(bpy.types.Panel):
             clear_row.scale_y = 1.2
             clear_row.operator("advanced_ai.clear_memory", text="Clear Memory", icon='TRASH')
             
+            # Archived (compressed) history - counted from the index only
+            archived = get_conversation_store().archived_count()
+            if archived:
+                archive_row = col.row(align=True)
+                archive_row.label(text=f"Archived: {archived} exchanges", icon='FILE_ARCHIVE')
+                archive_row.operator("advanced_ai.search_archive", text="", icon='VIEWZOOM')
+            
+            # Text import/export (memory/conversation_history.txt)
+            io_row = col.row(align=True)
+            io_row.operator("advanced_ai.export_history", text="Export", icon='EXPORT')
+            io_row.operator("advanced_ai.import_history", text="Import", icon='IMPORT')
+            
         else:
             # Show help when disabled
             col = box.column(align=True)
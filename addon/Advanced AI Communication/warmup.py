@@ -0,0 +1,124 @@
+"""Model warm-up - load the selected model before the first message
+
+Loading an 8B model from a network drive takes 10-40 s, which used to land
+on the first message after opening Blender. With "Warm Up Model" on, the
+selected model is loaded in the background shortly after the add-on is
+registered and whenever another model is selected (debounced, since the
+model name can be typed). The load is an /api/generate request without a
+prompt, so nothing is generated; it uses the num_ctx the next chat request
+will use (a different one makes Ollama load the model again) and the
+residency keep_alive. The Ollama status shows when the model is ready.
+
+The warm-up is skipped while Blender renders, while a message is being
+answered (that loads the model anyway) and when there is not enough free
+RAM for the model.
+"""
+
+import time
+
+from . import ollama_client
+
+DEBOUNCE = 2.0  # Seconds after the last change of the model name
+RAM_HEADROOM = 2 * 1024 ** 3  # Free memory left for Blender after loading
+
+_due = 0.0
+_warming = None  # Model being loaded right now
+
+def schedule(delay=DEBOUNCE):
+    """(Re)start the warm-up timer - called at register and when the model changes"""
+    global _due
+    import bpy
+    _due = time.monotonic() + delay
+    if not bpy.app.timers.is_registered(_fire):
+        bpy.app.timers.register(_fire, first_interval=delay)
+
+def reset():
+    """Stop the timer (add-on unregistered)"""
+    import bpy
+    if bpy.app.timers.is_registered(_fire):
+        bpy.app.timers.unregister(_fire)
+
+def is_rendering():
+    import bpy
+    # is_job_running exists since Blender 3.0
+    return hasattr(bpy.app, "is_job_running") and bpy.app.is_job_running('RENDER')
+
+def skip_reason(props, model):
+    """Why the warm-up should not run now (None if it should)"""
+    import bpy
+    from . import request_queue, streaming, residency
+
+    if bpy.app.background:
+        return "Blender runs in the background"
+    if is_rendering():
+        return "Blender is rendering"
+    if request_queue.is_busy() or streaming.is_streaming():
+        return "a message is being answered"
+    if model in residency.resident_models():
+        return "already loaded"
+    available = residency.available_memory()
+    if available is not None and available < residency.footprint(model) + RAM_HEADROOM:
+        return f"only {available / 1024 ** 3:.1f} GB RAM free"
+    return None
+
+def warm_up(model, options, keep_alive):
+    """Load model without generating (background thread) - returns the seconds it took"""
+    started = time.time()
+    ollama_client.preload_model(model, keep_alive, options)
+    return time.time() - started
+
+def _fire():
+    """Timer - start the warm-up once the model name has settled"""
+    global _warming
+    import bpy
+    from . import chat_request, context_budget, estimate_tokens, prefill, residency, token_counter
+
+    remaining = _due - time.monotonic()
+    if remaining > 0:
+        return remaining
+    props = bpy.context.window_manager.advanced_ai_props
+    model = props.selected_model.strip()
+    if not props.warm_up_model or not model or model == _warming:
+        return None
+
+    reason = skip_reason(props, model)
+    if reason:
+        print(f"Advanced AI: Skipped warm-up of {model} - {reason}")
+        if reason == "already loaded":
+            props.ollama_status = f"Model ready: {model}"
+            ollama_client.redraw_panels()
+        return None
+
+    # Same num_ctx as the next chat request (also fetches the model's context length)
+    options = None
+    if props.auto_num_ctx:
+        budget = context_budget.plan(model, int(props.memory_token_limit), props.output_tokens)
+        # The known part of the next prompt (restores the bucket of a saved context) and the message
+        prefix = prefill.build_prefix_request(props)[1]
+        prompt_tokens = chat_request.estimate_payload_tokens(prefix) + estimate_tokens(props.message)
+        options = {"num_ctx": budget.finish(prompt_tokens).num_ctx}
+    keep_alive = None
+    if props.manage_residency:
+        residency.make_room(model, props)
+        keep_alive = residency.keep_alive_for(model, props)
+
+    def on_done(seconds, error):
+        global _warming
+        _warming = None
+        props = bpy.context.window_manager.advanced_ai_props
+        if error:
+            props.ollama_status = f"Warm-up failed: {model}"
+            print(f"Advanced AI: Warm-up of {model} failed: {error}")
+        else:
+            props.ollama_status = f"Model ready: {model} (loaded in {seconds:.1f}s)"
+            print(f"Advanced AI: Warmed up {model} in {seconds:.1f}s")
+            token_counter.note_evaluated(model, {"model": model, "prompt": "", "options": options})
+            residency.refresh()
+        ollama_client.redraw_panels()
+
+    _warming = model
+    props.ollama_status = f"Warming up: {model}..."
+    print(f"Advanced AI: Warming up {model}" + (f" (num_ctx {options['num_ctx']})" if options else ""))
+    ollama_client.run_async(warm_up, on_done, model, options, keep_alive)
+    ollama_client.redraw_panels()
+    return None
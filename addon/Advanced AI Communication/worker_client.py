@@ -0,0 +1,119 @@
+"""Client for the long-lived chat worker (chat_worker.py in the a_astitnet folder)
+
+Messages are sent as length-prefixed JSON frames over a local socket, so a send
+costs one socket write instead of spawning a new Python process per prompt.
+"""
+
+import json
+import socket
+import struct
+import subprocess
+from pathlib import Path
+
+WORKER_HOST = "127.0.0.1"
+WORKER_PORT = 11450
+CONNECT_TIMEOUT = 0.5  # Local socket - if it takes longer the worker is not there
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+def send_frame(sock, payload):
+    """Send one length-prefixed JSON frame"""
+    data = json.dumps(payload).encode('utf-8')
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+def _recv_exact(sock, size):
+    """Read exactly size bytes or raise ConnectionError"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def recv_frame(sock):
+    """Receive one length-prefixed JSON frame"""
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame too large: {size} bytes")
+    return json.loads(_recv_exact(sock, size).decode('utf-8'))
+
+def worker_request(payload, timeout=5.0):
+    """Send one request to the worker and return its reply (None if unreachable)"""
+    try:
+        with socket.create_connection((WORKER_HOST, WORKER_PORT), timeout=CONNECT_TIMEOUT) as sock:
+            sock.settimeout(timeout)
+            send_frame(sock, payload)
+            return recv_frame(sock)
+    except (OSError, ValueError) as e:
+        print(f"Advanced AI: Chat worker not reachable: {e}")
+        return None
+
+def is_worker_running():
+    """Check if the chat worker answers a ping"""
+    reply = worker_request({"op": "ping"}, timeout=1.0)
+    return bool(reply and reply.get("ok"))
+
+def submit_chat(model, prompt=None, messages=None, options=None, keep_alive=None, job_id=None):
+    """Queue a prompt (or /api/chat messages) on the worker - returns True if accepted"""
+    request = {"op": "chat", "model": model}
+    if job_id is not None:
+        request["id"] = job_id
+    if options:
+        request["options"] = options
+    if keep_alive is not None:
+        request["keep_alive"] = keep_alive
+    if messages is not None:
+        request["messages"] = messages
+    else:
+        request["prompt"] = prompt
+    reply = worker_request(request)
+    if reply and reply.get("ok"):
+        print(f"Advanced AI: Sent to chat worker (queue length {reply.get('queued', '?')})")
+        return True
+    if reply:
+        print(f"Advanced AI: Chat worker rejected request: {reply.get('error')}")
+    return False
+
+def start_worker(base_path):
+    """Launch start_chat_worker.bat (or chat_worker.py) in the background"""
+    base_path = Path(base_path)
+    batch_file = base_path / 'start_chat_worker.bat'
+    script_file = base_path / 'chat_worker.py'
+
+    if batch_file.exists():
+        cmd = f'"{batch_file}"'
+    elif script_file.exists():
+        portable_python = base_path / 'python_portable' / 'python.exe'
+        python_cmd = str(portable_python) if portable_python.exists() else 'python'
+        cmd = f'"{python_cmd}" "{script_file}"'
+    else:
+        print(f"Advanced AI: Chat worker not found in {base_path}")
+        return False
+
+    try:
+        process = subprocess.Popen(
+            cmd,
+            cwd=str(base_path),
+            shell=True,
+            creationflags=getattr(subprocess, 'CREATE_NEW_CONSOLE', 0)
+        )
+        print(f"Advanced AI: Chat worker started with PID: {process.pid}")
+        return True
+    except Exception as e:
+        print(f"Advanced AI: Failed to start chat worker: {e}")
+        return False
+
+def cancel_generation(job_id=None):
+    """Abort job_id on the worker (running or still queued), or whatever it generates if None"""
+    request = {"op": "cancel"}
+    if job_id is not None:
+        request["id"] = job_id
+    reply = worker_request(request, timeout=2.0)
+    return bool(reply and reply.get("cancelled"))
+
+def stop_worker():
+    """Ask the worker to shut down"""
+    reply = worker_request({"op": "shutdown"}, timeout=2.0)
+    return bool(reply and reply.get("ok"))
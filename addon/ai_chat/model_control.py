@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Model Control
+Loads, unloads and lists Ollama models over its HTTP API.
+
+Used by model_manager.py and the AI Chat add-on (which carries a copy of
+this file). Replaces `ollama run/stop/ps` subprocesses and taskkill/pkill:
+
+    list_models()   /api/tags   installed models
+    list_running()  /api/ps     models in memory
+    load(model)     /api/generate with no prompt - loads it, generates nothing
+    unload(model)   /api/generate with keep_alive 0 - frees it, server keeps running
+    show(model)     /api/show   details, parameters and context length
+
+Switching models is a load of the new one (plus an unload of the old one
+if wanted) instead of killing the server. Every call blocks, so UI code runs
+them through run_async().
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+OLLAMA_URL = "http://localhost:11434"
+DEFAULT_KEEP_ALIVE = "5m"
+LOAD_TIMEOUT = 300  # Loading a big model from disk can take minutes
+
+def _request(path, payload=None, timeout=10):
+    """JSON response of a GET (payload None) or POST to the Ollama API"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(f"{OLLAMA_URL}{path}", data=data,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.load(response)
+
+def server_running(timeout=2):
+    """True if the Ollama server answers"""
+    try:
+        _request("/api/version", timeout=timeout)
+        return True
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+
+def list_models():
+    """Installed models (/api/tags)"""
+    return _request("/api/tags").get("models", [])
+
+def list_running():
+    """Models currently loaded in memory (/api/ps)"""
+    return _request("/api/ps").get("models", [])
+
+def running_names():
+    return [model.get("name", "") for model in list_running()]
+
+def is_running(model):
+    return model in running_names()
+
+def load(model, keep_alive=DEFAULT_KEEP_ALIVE, timeout=LOAD_TIMEOUT):
+    """Load model into memory without generating - returns the seconds it took"""
+    result = _request("/api/generate", {"model": model, "keep_alive": keep_alive}, timeout=timeout)
+    return result.get("load_duration", 0) / 1e9
+
+def unload(model):
+    """Free model's memory right away"""
+    _request("/api/generate", {"model": model, "keep_alive": 0}, timeout=30)
+
+def unload_all():
+    """Unload every loaded model - returns their names"""
+    names = running_names()
+    for name in names:
+        unload(name)
+    return names
+
+def switch(model, previous=None, keep_alive=DEFAULT_KEEP_ALIVE):
+    """Load model and free previous (if another one) - returns the load seconds"""
+    if previous and previous != model:
+        unload(previous)
+    return load(model, keep_alive)
+
+def show(model):
+    """Model details (/api/show)"""
+    return _request("/api/show", {"model": model}, timeout=30)
+
+def run_async(func, on_done=None, *args):
+    """Run func(*args) on a background thread; on_done(result, error) runs on that thread"""
+    def worker():
+        try:
+            result, error = func(*args), None
+        except Exception as e:
+            result, error = None, e
+        if on_done:
+            on_done(result, error)
+
+    threading.Thread(target=worker, daemon=True).start()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Model Inventory
+Shared, cached list of the local Ollama models with their size and details.
+
+Used by model_manager.py and the Blender add-ons (each add-on carries a copy
+of this file). Models are read from Ollama's manifest files instead of
+running `ollama list`:
+
+    ai mode/manifests/registry.ollama.ai/library/<model>/<tag>   manifest JSON
+    ai mode/blobs/sha256-<digest>                                config blob JSON
+
+A manifest lists the layer digests and sizes (the total is what the model
+needs on disk and roughly in RAM); the config blob names the family and the
+quantization. Everything is cached in a_astitnet/cache/model_inventory.json
+together with the directory mtimes it was read at, so a refresh only parses
+manifests in folders that changed. Models only the running server knows
+(/api/tags) are merged in when it answers.
+"""
+
+import json
+import os
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+CACHE_VERSION = 1
+OLLAMA_URL = "http://localhost:11434"
+SERVER_TIMEOUT = 2
+
+_inventories = {}
+
+def format_size(size):
+    """Bytes as a short human readable size"""
+    if not size:
+        return "?"
+    if size >= 1024 ** 3:
+        return f"{size / 1024 ** 3:.1f} GB"
+    return f"{size / 1024 ** 2:.0f} MB"
+
+def default_cache_file(manifests_dir):
+    """a_astitnet/cache/model_inventory.json for an 'a_astitnet/ai mode/manifests/...' directory"""
+    manifests_dir = Path(manifests_dir)
+    for parent in manifests_dir.parents:
+        if parent.name == 'ai mode':
+            return parent.parent / 'cache' / 'model_inventory.json'
+    return Path(__file__).parent / 'cache' / 'model_inventory.json'
+
+class ModelInventory:
+    """Models of one manifests directory, cached in memory and on disk"""
+
+    def __init__(self, manifests_dir, cache_file=None):
+        self.manifests_dir = Path(manifests_dir)
+        self.cache_file = Path(cache_file) if cache_file else default_cache_file(manifests_dir)
+        self.blobs_dir = self._find_blobs_dir()
+        self.lock = threading.Lock()
+        self.dirs = {}  # directory -> mtime_ns it was scanned at
+        self.entries = {}  # model name -> details
+        self.refreshing = False
+        self.refreshed_at = 0.0
+        self._load_cache()
+
+    def _find_blobs_dir(self):
+        for parent in self.manifests_dir.parents:
+            if parent.name == 'manifests':
+                return parent.parent / 'blobs'
+        return self.manifests_dir / 'blobs'
+
+    # --- Cache ---
+    def _load_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return
+        if cache.get("version") != CACHE_VERSION or cache.get("manifests_dir") != str(self.manifests_dir):
+            return
+        self.dirs = cache.get("dirs", {})
+        self.entries = cache.get("models", {})
+
+    def _save_cache(self):
+        cache = {
+            "version": CACHE_VERSION,
+            "manifests_dir": str(self.manifests_dir),
+            "dirs": self.dirs,
+            "models": self.entries,
+        }
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_file, self.cache_file)
+
+    # --- Reading ---
+    def models(self):
+        """Model details sorted by name (from the cache - never touches the disk)"""
+        with self.lock:
+            return [self.entries[name] for name in sorted(self.entries)]
+
+    def names(self):
+        with self.lock:
+            return sorted(self.entries)
+
+    def get(self, name):
+        with self.lock:
+            return self.entries.get(name)
+
+    def describe(self, name):
+        """'5.2 GB, Q4_K_M' style summary for a model"""
+        entry = self.get(name)
+        if not entry:
+            return ""
+        parts = [format_size(entry.get("size"))]
+        if entry.get("quantization"):
+            parts.append(entry["quantization"])
+        return ", ".join(parts)
+
+    # --- Refreshing ---
+    def _parse_manifest(self, name, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        layers = manifest.get("layers", [])
+        model_layer = next((layer for layer in layers if layer.get("mediaType", "").endswith(".model")), None)
+        entry = {
+            "name": name,
+            "source": "manifest",
+            "manifest": str(path),
+            "mtime": path.stat().st_mtime_ns,
+            "size": sum(layer.get("size", 0) for layer in layers),
+            "digest": (model_layer or {}).get("digest", ""),
+            "layers": [layer.get("digest", "") for layer in layers],
+            "family": "",
+            "quantization": "",
+            "parameters": "",
+        }
+
+        # The config blob names the family and quantization
+        config_digest = manifest.get("config", {}).get("digest", "")
+        if config_digest:
+            try:
+                with open(self.blobs_dir / config_digest.replace(':', '-'), 'r', encoding='utf-8') as f:
+                    config = json.load(f)
+                entry["family"] = config.get("model_family", "")
+                entry["quantization"] = config.get("file_type", "")
+                entry["parameters"] = config.get("model_type", "")
+            except (OSError, ValueError):
+                pass
+        return entry
+
+    def _scan_manifests(self):
+        """Re-read manifests in folders whose mtime changed - returns True if anything changed"""
+        changed = False
+        seen_dirs = {}
+        seen_models = set()
+        if not self.manifests_dir.exists():
+            return False
+
+        for model_dir in self.manifests_dir.iterdir():
+            if not model_dir.is_dir():
+                continue
+            key = str(model_dir)
+            mtime = model_dir.stat().st_mtime_ns
+            seen_dirs[key] = mtime
+            cached = [name for name, entry in self.entries.items()
+                      if entry.get("source") == "manifest" and Path(entry.get("manifest", "")).parent == model_dir]
+            if self.dirs.get(key) == mtime and cached:
+                seen_models.update(cached)
+                continue  # Nothing added, removed or replaced in this folder
+
+            for tag in model_dir.iterdir():
+                name = f"{model_dir.name}:{tag.name}"
+                seen_models.add(name)
+                entry = self.entries.get(name)
+                if tag.is_dir():
+                    # Older layouts kept one folder per variant - no details available
+                    if entry is None:
+                        self.entries[name] = {"name": name, "source": "manifest", "manifest": str(tag / name),
+                                              "size": 0, "digest": "", "layers": [], "family": model_dir.name,
+                                              "quantization": "", "parameters": ""}
+                        changed = True
+                    continue
+                if entry and entry.get("mtime") == tag.stat().st_mtime_ns:
+                    continue
+                try:
+                    self.entries[name] = self._parse_manifest(name, tag)
+                    changed = True
+                except (OSError, ValueError) as e:
+                    print(f"Model inventory: Skipping unreadable manifest {tag}: {e}")
+
+        # Models whose manifest is gone
+        for name in [name for name, entry in self.entries.items()
+                     if entry.get("source") == "manifest" and name not in seen_models]:
+            del self.entries[name]
+            changed = True
+        if seen_dirs != self.dirs:
+            self.dirs = seen_dirs
+            changed = True
+        return changed
+
+    def _fetch_server_models(self):
+        """Models the running server lists (None if it isn't running)"""
+        try:
+            with urllib.request.urlopen(f"{OLLAMA_URL}/api/tags", timeout=SERVER_TIMEOUT) as response:
+                return json.load(response).get("models", [])
+        except Exception:
+            return None  # Server not running - the manifests are enough
+
+    def _merge_server_models(self, models):
+        """Add models the running server knows but the manifests folder doesn't"""
+        changed = False
+        listed = {model.get("name", "") for model in models}
+        for name in [name for name, entry in self.entries.items()
+                     if entry.get("source") == "server" and name not in listed]:
+            del self.entries[name]  # Removed with `ollama rm`
+            changed = True
+        for model in models:
+            name = model.get("name", "")
+            if not name or self.entries.get(name, {}).get("source") == "manifest":
+                continue
+            details = model.get("details") or {}
+            entry = {
+                "name": name,
+                "source": "server",
+                "size": model.get("size", 0),
+                "digest": model.get("digest", ""),
+                "layers": [],
+                "family": details.get("family", ""),
+                "quantization": details.get("quantization_level", ""),
+                "parameters": details.get("parameter_size", ""),
+            }
+            if self.entries.get(name) != entry:
+                self.entries[name] = entry
+                changed = True
+        return changed
+
+    def refresh(self, query_server=True):
+        """Bring the inventory up to date - returns True if it changed"""
+        # Ask the server first - the lock is only held for quick local work
+        server_models = self._fetch_server_models() if query_server else None
+        with self.lock:
+            changed = self._scan_manifests()
+            if server_models is not None:
+                changed = self._merge_server_models(server_models) or changed
+            if changed:
+                try:
+                    self._save_cache()
+                except OSError as e:
+                    print(f"Model inventory: Could not save cache: {e}")
+            self.refreshed_at = time.time()
+        return changed
+
+    def refresh_async(self, on_done=None, query_server=True):
+        """Refresh on a background thread; on_done(changed) runs on that thread"""
+        if self.refreshing:
+            return False
+        self.refreshing = True
+
+        def worker():
+            changed = False
+            try:
+                changed = self.refresh(query_server)
+            except Exception as e:
+                print(f"Model inventory: Refresh failed: {e}")
+            finally:
+                self.refreshing = False
+            if on_done:
+                on_done(changed)
+
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+def get_inventory(manifests_dir, cache_file=None):
+    """Shared inventory for manifests_dir (one instance per directory)"""
+    key = str(manifests_dir)
+    inventory = _inventories.get(key)
+    if inventory is None:
+        inventory = ModelInventory(manifests_dir, cache_file)
+        _inventories[key] = inventory
+    return inventory
+
+def main():
+    """Print the inventory of a manifests directory"""
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: model_inventory.py <manifests/registry.ollama.ai/library>")
+        return
+    inventory = get_inventory(sys.argv[1])
+    started = time.time()
+    inventory.refresh()
+    for entry in inventory.models():
+        print(f"  {entry['name']:<30} {format_size(entry.get('size')):>9}  {entry.get('quantization', '')}  {entry.get('family', '')}")
+    print(f"{len(inventory.models())} models in {time.time() - started:.3f}s")
+
+if __name__ == "__main__":
+    main()
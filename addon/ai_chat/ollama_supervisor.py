@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Ollama Supervisor
+Finds or starts the Ollama server, waits until it answers and restarts it
+if it goes away.
+
+Used by model_manager.py and the Blender add-ons (each add-on carries a copy
+of this file). Instead of launching `ollama serve` and sleeping a guessed
+number of seconds, ensure_running() probes /api/version with a short
+exponential backoff and returns as soon as the server is up. A watcher
+thread keeps probing; if a server that was up stops answering it is started
+again (unless it was stopped on purpose with stop()). Callers that hit a
+connection error can wait_ready() for the restart instead of failing.
+
+States: UNKNOWN, STOPPED, STARTING, READY, RESTARTING, FAILED.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+OLLAMA_URL = "http://localhost:11434"
+PROBE_TIMEOUT = 1.0
+FIRST_BACKOFF = 0.05  # Seconds before the second probe, doubled each time
+MAX_BACKOFF = 1.0
+START_TIMEOUT = 60.0  # A cold start with a big model folder can be slow
+WATCH_INTERVAL = 5.0
+
+UNKNOWN, STOPPED, STARTING, READY, RESTARTING, FAILED = (
+    "UNKNOWN", "STOPPED", "STARTING", "READY", "RESTARTING", "FAILED")
+
+_supervisor = None
+
+def find_executable(configured=None):
+    """Ollama executable: the configured path, PATH, or the default install folders"""
+    if configured and Path(configured).exists():
+        return Path(configured)
+    found = shutil.which("ollama")
+    if found:
+        return Path(found)
+    candidates = []
+    if os.environ.get("LOCALAPPDATA"):
+        candidates.append(Path(os.environ["LOCALAPPDATA"]) / "Programs" / "Ollama" / "ollama.exe")
+    candidates += [Path("/usr/local/bin/ollama"), Path("/usr/bin/ollama"),
+                   Path("/Applications/Ollama.app/Contents/Resources/ollama")]
+    return next((path for path in candidates if path.exists()), None)
+
+class OllamaSupervisor:
+    """Keeps one Ollama server reachable at url"""
+
+    def __init__(self, executable=None, url=OLLAMA_URL):
+        self.executable = executable
+        self.url = url
+        self.state = UNKNOWN
+        self.last_error = ""
+        self.ready_since = None
+        self.wanted = True  # False after stop() - no restarts then
+        self.process = None  # Server (or desktop app) we started ourselves
+        self.serving = False  # process is `ollama serve` itself, so its exit means the server is gone
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._watcher = None
+        self._listeners = []
+
+    # --- State ---
+    def _set_state(self, state, error=""):
+        if state == self.state and error == self.last_error:
+            return
+        self.state = state
+        self.last_error = error
+        if state == READY:
+            self.ready_since = time.time()
+            self._ready.set()
+        else:
+            self._ready.clear()
+        print(f"Ollama supervisor: {state}" + (f" - {error}" if error else ""))
+        for listener in list(self._listeners):
+            try:
+                listener(state)
+            except Exception as e:
+                print(f"Ollama supervisor: Listener failed: {e}")
+
+    def add_listener(self, listener):
+        """listener(state) is called on the thread that changed the state"""
+        self._listeners.append(listener)
+
+    def describe(self):
+        if self.state == READY:
+            return "Ollama: Running"
+        if self.state in (STARTING, RESTARTING):
+            return f"Ollama: {self.state.capitalize()}..."
+        if self.state == FAILED:
+            return f"Ollama: Not available ({self.last_error})" if self.last_error else "Ollama: Not available"
+        return f"Ollama: {self.state.capitalize()}"
+
+    # --- Probing ---
+    def probe(self, timeout=PROBE_TIMEOUT):
+        """True if the server answers right now"""
+        try:
+            with urllib.request.urlopen(f"{self.url}/api/version", timeout=timeout):
+                return True
+        except (urllib.error.URLError, OSError, ValueError):
+            return False
+
+    def _wait_for_server(self, timeout):
+        """Probe with exponential backoff until the server answers or timeout passes"""
+        deadline = time.monotonic() + timeout
+        delay = FIRST_BACKOFF
+        while True:
+            if self.probe():
+                return True
+            if self.serving and self.process is not None and self.process.poll() is not None:
+                return False  # The server we started exited
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, MAX_BACKOFF)
+
+    def wait_ready(self, timeout=START_TIMEOUT):
+        """Block until the server is READY (for requests sent mid-restart) - True if it is"""
+        if self.state == READY:
+            return True
+        if self.state in (STOPPED, FAILED) or not self.wanted:
+            return False
+        return self._ready.wait(timeout)
+
+    # --- Control ---
+    def _launch(self):
+        executable = find_executable(self.executable)
+        if executable is None:
+            raise FileNotFoundError("Ollama executable not found")
+        # The desktop app starts its own server; the CLI needs `serve`
+        command = [str(executable)] if "app" in executable.stem.lower() else [str(executable), "serve"]
+        kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+        if os.name == 'nt':
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        print(f"Ollama supervisor: Starting {' '.join(command)}")
+        self.process = subprocess.Popen(command, **kwargs)
+        self.serving = len(command) > 1
+
+    def ensure_running(self, timeout=START_TIMEOUT, restarting=False):
+        """Find or start the server and wait until it answers - returns True when READY"""
+        self.wanted = True
+        with self._start_lock:
+            if self.probe():
+                self._set_state(READY)
+                return True
+            self._set_state(RESTARTING if restarting else STARTING)
+            started = time.monotonic()
+            try:
+                if self.process is None or self.process.poll() is not None:
+                    self._launch()
+            except Exception as e:
+                self._set_state(FAILED, str(e))
+                return False
+            if self._wait_for_server(timeout):
+                print(f"Ollama supervisor: Server ready after {time.monotonic() - started:.2f}s")
+                self._set_state(READY)
+                return True
+            self._set_state(FAILED, "server did not answer")
+            return False
+
+    def stop(self):
+        """Stop supervising (and the server if we started it) - no restarts until ensure_running()"""
+        self.wanted = False
+        process = self.process
+        self.process = None
+        if process is not None and process.poll() is None:
+            process.terminate()
+        self._set_state(STOPPED)
+
+    # --- Watching ---
+    def start_watching(self, interval=WATCH_INTERVAL, auto_start=True):
+        """Probe in the background, starting the server now (auto_start) and after crashes"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(interval, auto_start), daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        self._watcher = None
+
+    @property
+    def watching(self):
+        return self._watcher is not None
+
+    def _watch(self, interval, auto_start):
+        me = threading.current_thread()
+        if auto_start and self.wanted:
+            self.ensure_running()
+        while self._watcher is me:
+            if self.probe():
+                self._set_state(READY)
+            elif self.wanted and self.ready_since is not None:
+                # It was up and went away - bring it back (retried every interval)
+                self.ensure_running(restarting=True)
+            elif self.state in (UNKNOWN, READY):
+                self._set_state(STOPPED)
+            time.sleep(interval)
+
+def get_supervisor(executable=None):
+    """Shared supervisor (the executable is updated on every call that names one)"""
+    global _supervisor
+    if _supervisor is None:
+        _supervisor = OllamaSupervisor(executable)
+    elif executable:
+        _supervisor.executable = executable
+    return _supervisor
+
+if __name__ == "__main__":
+    supervisor = get_supervisor()
+    started = time.time()
+    ok = supervisor.ensure_running()
+    print(f"{supervisor.describe()} ({time.time() - started:.2f}s)")
@@ -4,6 +4,34 @@ import os
 import re
 from pathlib import Path
 
+def latest_response_index(niout_dir):
+    """Highest response_N.txt number, read from niout/response_manifest.json
+
+    One small read plus a stat of the next file instead of listing the whole
+    archive; only scans the directory when no manifest has been written yet.
+    """
+    import json
+    seq = None
+    try:
+        with open(niout_dir / 'response_manifest.json', 'r', encoding='utf-8') as f:
+            seq = int(json.load(f).get("last_seq", 0))
+    except (OSError, ValueError):
+        pass
+
+    if seq is None:
+        seq = 0
+        pattern = re.compile(r"response_(\d+)\.txt$")
+        for p in niout_dir.iterdir():
+            m = pattern.match(p.name)
+            if m:
+                seq = max(seq, int(m.group(1)))
+        return seq
+
+    # Writers that don't update the manifest (the batch script) still get noticed
+    while (niout_dir / f"response_{seq + 1}.txt").exists():
+        seq += 1
+    return seq
+
 class AICHAT_OT_SendMessage(bpy.types.Operator):
     """Send message to AI"""
     bl_idname = "ai_chat.send_message"
@@ -239,16 +267,7 @@ class AICHAT_OT_SendMessage(bpy.types.Operator):
             if props.use_versioned_responses:
                 try:
                     niout_dir = Path(props.output_path).parent
-                    max_idx = 0
-                    pattern = re.compile(r"response_(\d+)\.txt$")
-                    if niout_dir.exists():
-                        for p in niout_dir.iterdir():
-                            if p.is_file():
-                                m = pattern.match(p.name)
-                                if m:
-                                    idx = int(m.group(1))
-                                    if idx > max_idx:
-                                        max_idx = idx
+                    max_idx = latest_response_index(niout_dir) if niout_dir.exists() else 0
                     props.last_seen_index = max_idx
                     print(f"AI Chat: Initialized last_seen_index={max_idx}")
                 except Exception as e:
@@ -349,16 +368,11 @@ class AICHAT_OT_SendMessage(bpy.types.Operator):
                 niout_dir = Path(props.output_path).parent
                 max_idx = props.last_seen_index
                 latest_file = None
-                pattern = re.compile(r"response_(\d+)\.txt$")
                 if niout_dir.exists():
-                    for p in niout_dir.iterdir():
-                        if p.is_file():
-                            m = pattern.match(p.name)
-                            if m:
-                                idx = int(m.group(1))
-                                if idx > max_idx:
-                                    max_idx = idx
-                                    latest_file = p
+                    idx = latest_response_index(niout_dir)
+                    if idx > max_idx:
+                        max_idx = idx
+                        latest_file = niout_dir / f"response_{idx}.txt"
                 if latest_file is not None:
                     with open(latest_file, 'r', encoding='utf-8') as f:
                         content = f.read().strip()
@@ -373,7 +387,7 @@ class AICHAT_OT_SendMessage(bpy.types.Operator):
                         print(f"AI Chat: Loaded {latest_file.name} (max_idx={max_idx})")
                         return None  # Stop timer
                 else:
-                    print(f"AI Chat: Scanned niout — max_idx={max_idx}, last_seen={props.last_seen_index}; no new response_N yet")
+                    print(f"AI Chat: Checked manifest — max_idx={max_idx}, last_seen={props.last_seen_index}; no new response_N yet")
                     # Fallback: if no versioned file detected, try response.txt
                     output_path = Path(props.output_path)
                     if output_path.exists():
@@ -461,6 +475,33 @@ class AICHAT_OT_RefreshResponse(bpy.types.Operator):
         
         return {'FINISHED'}
 
+_model_results = []  # (success, ok_text, fail_text) from background model tasks
+_model_tasks = 0
+
+def _run_model_task(context, busy_text, func, ok_text, fail_text, *args):
+    """Run a blocking model_manager call in the background and show its result"""
+    global _model_tasks
+    from . import model_control
+    
+    context.window_manager.ai_chat.model_status = busy_text
+    _model_tasks += 1
+    model_control.run_async(func, lambda success, error: _model_results.append((success and not error, ok_text, fail_text)), *args)
+    if not bpy.app.timers.is_registered(_apply_model_results):
+        bpy.app.timers.register(_apply_model_results, first_interval=0.2)
+
+def _apply_model_results():
+    """Timer - copy finished model task results into the panel (main thread)"""
+    global _model_tasks
+    while _model_results:
+        success, ok_text, fail_text = _model_results.pop(0)
+        _model_tasks -= 1
+        bpy.context.window_manager.ai_chat.model_status = ok_text if success else fail_text
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    return 0.2 if _model_tasks > 0 else None
+
 class AICHAT_OT_StopAllModels(bpy.types.Operator):
     """Stop all running AI models"""
     bl_idname = "ai_chat.stop_all_models"
@@ -472,12 +513,10 @@ class AICHAT_OT_StopAllModels(bpy.types.Operator):
         try:
             from . import model_manager
             
-            success = model_manager.stop_all_models()
-            
-            if success:
-                self.report({'INFO'}, "✅ All AI models stopped successfully")
-            else:
-                self.report({'WARNING'}, "⚠️ Some models may still be running")
+            # Unloading goes through Ollama's API in the background - the server keeps running
+            _run_model_task(context, "Stopping all models...", model_manager.stop_all_models,
+                            "✅ All AI models stopped", "⚠️ Some models may still be running")
+            self.report({'INFO'}, "Stopping all AI models...")
                 
         except Exception as e:
             self.report({'ERROR'}, f"❌ Failed to stop models: {e}")
@@ -512,13 +551,10 @@ class AICHAT_OT_StartSelectedModel(bpy.types.Operator):
         try:
             from . import model_manager
             
-            success = model_manager.start_model(model_name)
-            
-            if success:
-                self.report({'INFO'}, f"✅ Model {model_name} started successfully")
-            else:
-                self.report({'ERROR'}, f"❌ Failed to start model {model_name}")
-                return {'CANCELLED'}
+            # Loading a model can take a while - keep Blender responsive
+            _run_model_task(context, f"Starting {model_name}...", model_manager.start_model,
+                            f"✅ Model {model_name} started", f"❌ Failed to start model {model_name}", model_name)
+            self.report({'INFO'}, f"Starting model {model_name}...")
                 
         except Exception as e:
             self.report({'ERROR'}, f"❌ Failed to start model: {e}")
@@ -775,12 +811,17 @@ class AICHAT_OT_RefreshModels(bpy.types.Operator):
             from . import model_manager
             
             models = model_manager.get_available_models()
-            self.report({'INFO'}, f"🔍 Found {len(models)} models: {', '.join(models)}")
+            inventory = model_manager.get_inventory()
+            listed = [f"{name} ({inventory.describe(name)})" if inventory.get(name) else name for name in models]
+            self.report({'INFO'}, f"🔍 Found {len(models)} models: {', '.join(listed)}")
             
             # Optionally set first model as selected if none selected
             props = context.window_manager.ai_chat
             if not props.selected_model and models:
                 props.selected_model = models[0]
+            
+            if not bpy.app.timers.is_registered(_wait_for_models):
+                bpy.app.timers.register(_wait_for_models, first_interval=0.5)
                 
         except Exception as e:
             self.report({'ERROR'}, f"❌ Failed to refresh models: {e}")
@@ -788,6 +829,18 @@ class AICHAT_OT_RefreshModels(bpy.types.Operator):
         
         return {'FINISHED'}
 
+def _wait_for_models():
+    """Timer - redraw the panel once the background model scan is done"""
+    from . import model_manager
+    
+    if model_manager.get_inventory().refreshing:
+        return 0.5
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+    return None
+
 def register():
     bpy.utils.register_class(AICHAT_OT_SendMessage)
     bpy.utils.register_class(AICHAT_OT_ClearMessage)
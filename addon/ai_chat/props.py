@@ -186,6 +186,13 @@ class AICHAT_Properties(bpy.types.PropertyGroup):
         default="qwen3:4b"
     )
     
+    # Result of the last start/stop (they run in the background)
+    model_status: bpy.props.StringProperty(
+        name="Model Status",
+        description="Result of the last model start or stop",
+        default=""
+    )
+    
     # Model file path (for browsing to model files)
     model_file_path: bpy.props.StringProperty(
         name="Model File",
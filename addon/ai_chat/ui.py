@@ -156,6 +156,10 @@ class AICHAT_PT_SettingsPanel(bpy.types.Panel):
         
         # Model name input
         col.prop(props, "selected_model", text="Model Name")
+        from . import model_manager
+        details = model_manager.get_inventory().describe(props.selected_model)
+        if details:
+            col.label(text=f"Size: {details}", icon='INFO')
         
         # File browser method
         col.separator()
@@ -169,6 +173,8 @@ class AICHAT_PT_SettingsPanel(bpy.types.Panel):
         row = col.row(align=True)
         row.operator("ai_chat.start_selected_model", text="Start Model", icon='PLAY')
         row.operator("ai_chat.stop_all_models", text="Stop All", icon='PAUSE')
+        if props.model_status:
+            col.label(text=props.model_status)
 
 class AICHAT_PT_HelpPanel(bpy.types.Panel):
     """Help Panel"""
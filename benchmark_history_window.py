@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+History Window Benchmark
+Compares the old per-turn memory update (read the whole history text, append,
+re-split and trim it, rewrite the file) with the conversation store's
+append-only records and incremental exchange window.
+
+Runs without Blender:
+    python benchmark_history_window.py [exchanges ...]
+Defaults to 1,000 and 10,000 exchanges of history.
+"""
+
+import importlib.util
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+STORE_PATH = Path(__file__).parent / "addon" / "Advanced AI Communication" / "conversation_store.py"
+TOKEN_LIMIT = 200000  # The largest memory option
+TURNS = 20  # Timed turns per size
+
+def estimate_tokens(text):
+    """Rough token estimation (approximately 1 token per 4 characters)"""
+    return len(text) // 4
+
+def load_conversation_store():
+    """Load conversation_store.py on its own (it has no Blender imports)"""
+    spec = importlib.util.spec_from_file_location("conversation_store", STORE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def make_exchange(i):
+    user = f"How do I use modifier number {i} on a mesh in Blender?"
+    assistant = f"Add it from the Modifier Properties tab and adjust its settings. " * 6 + f"(answer {i})"
+    return user, assistant
+
+def legacy_trim_conversation_history(history, token_limit):
+    """Trim conversation history to stay within token limit
+    Enhanced to preserve important context and base prompt reminders
+    (copy of the add-on's original implementation, kept as the baseline)"""
+    if not history:
+        return history
+    
+    current_tokens = estimate_tokens(history)
+    if current_tokens <= token_limit:
+        return history
+    
+    # Split into exchanges (User: ... Assistant: ... pairs)
+    lines = history.split('\n')
+    exchanges = []
+    current_exchange = []
+    important_exchanges = []  # Track exchanges with base prompt reminders
+    
+    for line in lines:
+        if line.startswith('User: ') and current_exchange:
+            exchange_text = '\n'.join(current_exchange)
+            exchanges.append(exchange_text)
+            
+            # Mark exchanges that contain base prompt reminders as important
+            if 'Blender AI assistant' in exchange_text or 'what are you' in exchange_text.lower() or 'your purpose' in exchange_text.lower():
+                important_exchanges.append(len(exchanges) - 1)
+            
+            current_exchange = [line]
+        else:
+            current_exchange.append(line)
+    
+    if current_exchange:
+        exchange_text = '\n'.join(current_exchange)
+        exchanges.append(exchange_text)
+        
+        # Check if last exchange is important
+        if 'Blender AI assistant' in exchange_text or 'what are you' in exchange_text.lower() or 'your purpose' in exchange_text.lower():
+            important_exchanges.append(len(exchanges) - 1)
+    
+    # Prioritized trimming: keep important exchanges and most recent ones
+    trimmed = []
+    tokens_used = 0
+    
+    # First pass: include all important exchanges (base prompt reminders)
+    for i in important_exchanges:
+        if i < len(exchanges):
+            exchange = exchanges[i]
+            exchange_tokens = estimate_tokens(exchange)
+            if tokens_used + exchange_tokens <= token_limit * 0.3:  # Reserve 30% for important context
+                trimmed.append((i, exchange))
+                tokens_used += exchange_tokens
+    
+    # Second pass: fill remaining space with recent exchanges
+    for i, exchange in enumerate(reversed(exchanges)):
+        original_index = len(exchanges) - 1 - i
+        
+        # Skip if already included in important exchanges
+        if any(idx == original_index for idx, _ in trimmed):
+            continue
+        
+        exchange_tokens = estimate_tokens(exchange)
+        if tokens_used + exchange_tokens <= token_limit:
+            trimmed.append((original_index, exchange))
+            tokens_used += exchange_tokens
+        else:
+            break
+    
+    # Sort by original order and extract text
+    trimmed.sort(key=lambda x: x[0])
+    result_exchanges = [exchange for _, exchange in trimmed]
+    
+    result = '\n\n'.join(result_exchanges)
+    
+    # If we still have important context, add a summary note
+    if important_exchanges and not any(idx in [i for i, _ in trimmed] for idx in important_exchanges[-1:]):
+        result = f"[IMPORTANT: You are a Blender AI assistant with memory - this context was preserved]\n\n{result}"
+    
+    return result
+
+
+def bench_legacy(exchanges, history_file):
+    """Old path: whole-file read, append, trim, whole-file write per turn"""
+    history_file.write_text("\n\n".join(f"User: {u}\nAssistant: {a}" for u, a in exchanges), encoding="utf-8")
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        user, assistant = make_exchange(len(exchanges) + turn)
+        history = history_file.read_text(encoding="utf-8").strip()
+        updated = history + "\n\n" + f"User: {user}\nAssistant: {assistant}"
+        trimmed = legacy_trim_conversation_history(updated, TOKEN_LIMIT)
+        history_file.write_text(trimmed, encoding="utf-8")
+    return (time.perf_counter() - start) / TURNS
+
+def bench_store(store_module, exchanges, memory_dir):
+    """New path: append two records, move the window pointer"""
+    records = []
+    for user, assistant in exchanges:
+        records.append(store_module.ConversationStore._make_record(len(records), "user", user, "", False))
+        records.append(store_module.ConversationStore._make_record(len(records), "assistant", assistant, "", False))
+    store = store_module.ConversationStore(memory_dir)
+    store._rewrite(records)
+    store.trim(TOKEN_LIMIT)
+
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        user, assistant = make_exchange(len(exchanges) + turn)
+        store.append_exchange(user, assistant)
+        store.trim(TOKEN_LIMIT)
+    return (time.perf_counter() - start) / TURNS
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    store_module = load_conversation_store()
+    store_module.print = lambda *args, **kwargs: None  # Keep the trim messages out of the table
+
+    print(f"{'exchanges':>10} {'legacy ms/turn':>15} {'store ms/turn':>14} {'speedup':>8}")
+    for size in sizes:
+        exchanges = [make_exchange(i) for i in range(size)]
+        with tempfile.TemporaryDirectory() as tmp:
+            legacy = bench_legacy(exchanges, Path(tmp) / "conversation_history.txt")
+        with tempfile.TemporaryDirectory() as tmp:
+            store = bench_store(store_module, exchanges, Path(tmp))
+        print(f"{size:>10} {legacy * 1000:>15.2f} {store * 1000:>14.3f} {legacy / store:>7.0f}x")
+
+if __name__ == "__main__":
+    main()
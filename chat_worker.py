@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+AI Chat Worker
+Long-lived chat process for the Blender add-on.
+
+Started once (by the add-on or start_chat_worker.bat) and kept running, so a
+message costs one socket write instead of a fresh Python process per prompt.
+
+Protocol: every frame is a 4-byte big-endian length followed by that many
+bytes of UTF-8 JSON. The client sends one request frame and gets one reply
+frame back:
+    {"op": "ping"}                             -> {"ok": true, "pid": ...}
+    {"op": "chat", "prompt": ..., "model": ...} -> {"ok": true, "queued": n}
+    {"op": "chat", "messages": [...], "model": ...} -> same, sent to /api/chat
+    (either may carry "options", e.g. num_ctx / num_predict, and "keep_alive", passed to Ollama,
+    and an "id" to cancel it by)
+    {"op": "cancel"}                           -> {"ok": true, "cancelled": bool}
+    {"op": "cancel", "id": ...}                -> same, for that job only (running or still queued)
+    {"op": "shutdown"}                         -> {"ok": true}
+Chat replies are written to niout/response_N.txt (and response.txt), exactly
+like ollama_chat.py, and recorded in niout/response_manifest.json.
+"""
+
+import json
+import os
+import queue
+import socketserver
+import struct
+import threading
+import time
+from pathlib import Path
+
+import response_manifest
+
+WORKER_HOST = "127.0.0.1"
+WORKER_PORT = int(os.environ.get("AI_CHAT_WORKER_PORT", "11450"))
+OLLAMA_URL = "http://localhost:11434"
+DEFAULT_MODEL = "qwen3:8b"
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # 16 MB - prompts with 200K token history fit easily
+
+A_ASTITNET_PATH = Path(__file__).parent
+NIOUT_DIR = A_ASTITNET_PATH / "niout"
+
+# === FRAMING ===
+def send_frame(sock, payload):
+    """Send one length-prefixed JSON frame"""
+    data = json.dumps(payload).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+def _recv_exact(sock, size):
+    """Read exactly size bytes or raise ConnectionError"""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = sock.recv(min(remaining, 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def recv_frame(sock):
+    """Receive one length-prefixed JSON frame"""
+    (size,) = struct.unpack(">I", _recv_exact(sock, 4))
+    if size > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame too large: {size} bytes")
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+# === GENERATION ===
+def write_response(text, started=None):
+    """Write a finished reply to response_N.txt, response.txt and the response manifest"""
+    return response_manifest.write_response(NIOUT_DIR, text, started=started)
+
+class ChatWorker:
+    """Runs chat requests one at a time on a background thread"""
+
+    def __init__(self):
+        import requests  # Imported once for the life of the worker
+
+        self.session = requests.Session()
+        self.jobs = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()  # Orders cancels against starting and writing a job
+        self.busy = False
+        self.current = None  # Id of the job being generated
+        self.queued = set()  # Ids of jobs waiting in the queue
+        self.cancelled = set()  # Ids of queued jobs to skip
+        self._response = None  # Ollama response being streamed (closed to cancel)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, model, prompt=None, messages=None, options=None, keep_alive=None, job_id=None):
+        """Queue a prompt (or chat messages) and return the queue length"""
+        with self.lock:
+            if job_id is not None:
+                self.queued.add(job_id)
+            self.jobs.put((job_id, model or DEFAULT_MODEL, prompt, messages, options, keep_alive))
+        return self.jobs.qsize()
+
+    def cancel(self, job_id=None):
+        """Abort job_id (running or queued), or whatever runs if None - returns True if its answer won't be written"""
+        with self.lock:
+            if job_id is not None and job_id in self.queued:
+                self.queued.discard(job_id)
+                self.cancelled.add(job_id)
+                return True
+            if not self.busy or (job_id is not None and job_id != self.current):
+                return False  # Finished already (its answer is written) or never got here
+            self.cancel_event.set()
+            response = self._response  # Taken under the lock - never the next job's
+        # Closing the connection stops Ollama even while it is still prefilling
+        if response is not None:
+            try:
+                response.close()
+            except Exception:
+                pass
+        return True
+
+    def _generate(self, model, prompt, messages, options=None, keep_alive=None):
+        """Stream one answer from Ollama, stopping early if cancelled"""
+        if messages:
+            url, payload = f"{OLLAMA_URL}/api/chat", {"model": model, "messages": messages, "stream": True}
+        else:
+            url, payload = f"{OLLAMA_URL}/api/generate", {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        parts = []
+        try:
+            with self.session.post(url, json=payload, stream=True, timeout=(5, 600)) as response:
+                self._response = response
+                if self.cancel_event.is_set():
+                    return None  # Cancelled while connecting
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if self.cancel_event.is_set():
+                        return None  # Closing the stream makes Ollama stop generating
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    if "message" in chunk:
+                        parts.append(chunk["message"].get("content", ""))
+                    else:
+                        parts.append(chunk.get("response", ""))
+                    if chunk.get("done"):
+                        break
+        except Exception:
+            if self.cancel_event.is_set():
+                return None  # cancel() closed the connection under us
+            raise
+        finally:
+            self._response = None
+        return "".join(parts).strip()
+
+    def _run(self):
+        while True:
+            job_id, model, prompt, messages, options, keep_alive = self.jobs.get()
+            with self.lock:
+                self.queued.discard(job_id)
+                if job_id in self.cancelled:
+                    self.cancelled.discard(job_id)
+                    print(f"⏹️ Skipped cancelled job ({model})")
+                    continue
+                started = time.time()
+                self.cancel_event.clear()
+                self.current = job_id
+                self.busy = True
+            try:
+                text = self._generate(model, prompt, messages, options, keep_alive)
+            except Exception as e:
+                text = f"Error: could not get a response from {model}: {e}"
+            with self.lock:
+                # Written under the lock, so a cancel either stops the answer or comes after it is on disk
+                self.busy = False
+                self.current = None
+                if text is None or self.cancel_event.is_set():
+                    print(f"⏹️ Generation cancelled after {time.time() - started:.1f}s ({model})")
+                    continue
+                response_file = write_response(text, started=started)
+            print(f"✅ {response_file.name} written in {time.time() - started:.1f}s ({model})")
+
+class WorkerRequestHandler(socketserver.BaseRequestHandler):
+    """Handle one framed request per connection"""
+
+    def handle(self):
+        try:
+            request = recv_frame(self.request)
+            op = request.get("op")
+            if op == "ping":
+                send_frame(self.request, {"ok": True, "pid": os.getpid()})
+            elif op == "chat":
+                prompt = request.get("prompt") or ""
+                messages = request.get("messages")
+                if not prompt.strip() and not messages:
+                    send_frame(self.request, {"ok": False, "error": "Empty prompt"})
+                    return
+                queued = self.server.worker.submit(request.get("model"), prompt, messages, request.get("options"),
+                                                   request.get("keep_alive"), request.get("id"))
+                send_frame(self.request, {"ok": True, "queued": queued})
+            elif op == "cancel":
+                send_frame(self.request, {"ok": True, "cancelled": self.server.worker.cancel(request.get("id"))})
+            elif op == "shutdown":
+                send_frame(self.request, {"ok": True})
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+            else:
+                send_frame(self.request, {"ok": False, "error": f"Unknown op: {op}"})
+        except Exception as e:
+            print(f"❌ Bad request: {e}")
+
+class WorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    # Quick restarts on POSIX; on Windows SO_REUSEADDR would let a second worker bind the same port
+    allow_reuse_address = os.name != 'nt'
+
+def main():
+    """Start the worker and serve until shutdown"""
+    try:
+        server = WorkerServer((WORKER_HOST, WORKER_PORT), WorkerRequestHandler)
+    except OSError as e:
+        print(f"❌ Could not listen on {WORKER_HOST}:{WORKER_PORT} (already running?): {e}")
+        return
+    server.worker = ChatWorker()
+    print(f"AI Chat Worker listening on {WORKER_HOST}:{WORKER_PORT} (pid {os.getpid()})")
+    print(f"Writing responses to {NIOUT_DIR}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        print("AI Chat Worker stopped")
+
+if __name__ == "__main__":
+    main()
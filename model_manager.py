@@ -4,12 +4,14 @@ Ollama Model Manager
 Manages starting, stopping, and listing AI models
 """
 
-import subprocess
 import os
 import json
-import time
 from pathlib import Path
 
+import model_control
+import model_inventory
+import ollama_supervisor
+
 # Auto-detect odin_grab/a_astitnet directory structure for model path
 def find_a_astitnet_directory():
     """Find a_astitnet directory within Odin Grab structure"""
@@ -68,45 +70,16 @@ class OllamaModelManager:
         self.scan_models()
     
     def scan_models(self):
-        """Scan for available models in the manifests directory"""
-        self.models = []
-        
+        """Scan for available models (manifests plus the running server, cached on disk)"""
         try:
-            if MODEL_MANIFESTS_DIR.exists():
-                for model_dir in MODEL_MANIFESTS_DIR.iterdir():
-                    if model_dir.is_dir():
-                        model_name = model_dir.name
-                        # Check for variants/sizes
-                        for variant_dir in model_dir.iterdir():
-                            if variant_dir.is_dir():
-                                variant_name = variant_dir.name
-                                full_model_name = f"{model_name}:{variant_name}"
-                                self.models.append(full_model_name)
-                                print(f"Found model: {full_model_name}")
-            
-            # Also try to get models from ollama list command
-            try:
-                result = subprocess.run(
-                    ["ollama", "list"], 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    lines = result.stdout.strip().split('\n')[1:]  # Skip header
-                    for line in lines:
-                        if line.strip():
-                            model_name = line.split()[0]  # First column is model name
-                            if model_name not in self.models:
-                                self.models.append(model_name)
-                                print(f"Found running model: {model_name}")
-            except subprocess.TimeoutExpired:
-                print("Ollama list command timed out")
-            except Exception as e:
-                print(f"Could not run ollama list: {e}")
-        
+            inventory = model_inventory.get_inventory(MODEL_MANIFESTS_DIR)
+            inventory.refresh()
+            self.models = inventory.names()
+            for entry in inventory.models():
+                print(f"Found model: {entry['name']} ({inventory.describe(entry['name'])})")
         except Exception as e:
             print(f"Error scanning models: {e}")
+            self.models = []
         
         if not self.models:
             # Fallback to default models
@@ -121,44 +94,11 @@ class OllamaModelManager:
         return self.models
     
     def stop_all_models(self):
-        """Stop all running Ollama models/processes"""
+        """Unload all models from memory (the Ollama server keeps running)"""
         try:
             print("Stopping all Ollama models...")
-            
-            # Method 1: Try ollama stop (if it exists)
-            try:
-                subprocess.run(["ollama", "stop"], timeout=10, check=False)
-            except:
-                pass
-            
-            # Method 2: Kill ollama processes
-            if os.name == 'nt':  # Windows
-                try:
-                    subprocess.run(
-                        ["taskkill", "/F", "/IM", "ollama.exe"], 
-                        timeout=10, 
-                        check=False,
-                        capture_output=True
-                    )
-                    subprocess.run(
-                        ["taskkill", "/F", "/IM", "ollama_llama_server.exe"], 
-                        timeout=10, 
-                        check=False,
-                        capture_output=True
-                    )
-                except Exception as e:
-                    print(f"Windows process kill error: {e}")
-            else:  # Linux/Mac
-                try:
-                    subprocess.run(
-                        ["pkill", "-f", "ollama"], 
-                        timeout=10, 
-                        check=False
-                    )
-                except Exception as e:
-                    print(f"Unix process kill error: {e}")
-            
-            print("✅ All Ollama models stopped")
+            names = model_control.unload_all()
+            print(f"✅ Unloaded {', '.join(names) if names else 'nothing - no model was loaded'}")
             return True
             
         except Exception as e:
@@ -166,53 +106,30 @@ class OllamaModelManager:
             return False
     
     def start_model(self, model_name):
-        """Start a specific model"""
+        """Load a specific model into memory"""
         try:
             print(f"Starting model: {model_name}")
             
-            # Start ollama serve first (in background)
-            try:
-                subprocess.Popen(
-                    ["ollama", "serve"],
-                    creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-                )
-                time.sleep(2)  # Give it time to start
-            except Exception as e:
-                print(f"Ollama serve might already be running: {e}")
-            
-            # Pull/start the specific model
-            result = subprocess.run(
-                ["ollama", "run", model_name, "Hello"], 
-                timeout=30,
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode == 0:
-                print(f"✅ Model {model_name} started successfully")
-                return True
-            else:
-                print(f"❌ Error starting {model_name}: {result.stderr}")
+            # Find or start the server - returns as soon as it answers
+            supervisor = ollama_supervisor.get_supervisor()
+            if not supervisor.ensure_running():
+                print(f"❌ {supervisor.describe()}")
                 return False
+            
+            # Load the model without generating anything
+            seconds = model_control.load(model_name)
+            print(f"✅ Model {model_name} started successfully ({seconds:.1f}s)")
+            return True
                 
-        except subprocess.TimeoutExpired:
-            print(f"❌ Timeout starting model {model_name}")
-            return False
         except Exception as e:
             print(f"❌ Error starting model {model_name}: {e}")
             return False
     
     def is_model_running(self, model_name):
-        """Check if a specific model is running"""
+        """Check if a specific model is loaded"""
         try:
-            result = subprocess.run(
-                ["ollama", "ps"], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            return model_name in result.stdout
-        except:
+            return model_control.is_running(model_name)
+        except Exception:
             return False
 
 def main():
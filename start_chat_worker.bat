@@ -0,0 +1,7 @@
+@echo off
+REM AI Chat Worker Launcher (stays running, the add-on talks to it over a local socket)
+set PYTHON_PATH=F:\odin_grab\a_astitnet\python_portable
+set PATH=%PYTHON_PATH%;%PYTHON_PATH%\Scripts;%PATH%
+
+REM Run chat_worker.py with portable Python
+"%PYTHON_PATH%\python.exe" "%~dp0chat_worker.py" %*